@@ -1,4 +1,3 @@
-import json
 import os
 import django
 
@@ -6,24 +5,10 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skillswap.settings')
 django.setup()
 
+from skills.catalog_import import import_skill_catalog
 from skills.models import Skill
 
-# Load JSON
-with open('skills/skills.json', 'r') as f:
-    skills_data = json.load(f)
+result = import_skill_catalog('skills/skills.json')
+print(f"✓ {result}")
 
-# Clear existing (optional)
-# Skill.objects.all().delete()
-
-# Load skills
-for item in skills_data:
-    Skill.objects.get_or_create(
-        name=item['name'],
-        defaults={
-            'category': item.get('category', ''),
-            'subcategory': item.get('subcategory', '')
-        }
-    )
-    print(f"✓ {item['name']}")
-
-print(f"\nTotal skills in database: {Skill.objects.count()}")
\ No newline at end of file
+print(f"\nTotal skills in database: {Skill.objects.count()}")
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from .models import Skill, UserSkill, Match, CustomUser, Conversation, Message
 from django.contrib.auth.admin import UserAdmin
-from .models import UserActivity, VideoCall
+from .models import UserActivity, VideoCall, CallStats, RevokedToken, SkillCatalogImport
+from .models import SkillStats, SkillGroupStats, Category, Subcategory
 
 # Register your models here
 admin.site.register(Skill)
+admin.site.register(Category)
+admin.site.register(Subcategory)
 admin.site.register(UserSkill)
 admin.site.register(Match)
 
@@ -49,7 +52,39 @@ class VideoCallAdmin(admin.ModelAdmin):
     list_display = ['caller', 'receiver', 'status', 'created_at', 'duration']
     list_filter = ['status', 'created_at']
     search_fields = ['caller__username', 'receiver__username']
-    readonly_fields = ['created_at', 'started_at', 'ended_at']
+    readonly_fields = ['session_id', 'created_at', 'started_at', 'ended_at']
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('caller', 'receiver')
\ No newline at end of file
+        return super().get_queryset(request).select_related('caller', 'receiver')
+
+@admin.register(CallStats)
+class CallStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_calls', 'accepted_calls', 'total_duration', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['jti', 'expires_at', 'created_at']
+    search_fields = ['jti']
+
+
+@admin.register(SkillCatalogImport)
+class SkillCatalogImportAdmin(admin.ModelAdmin):
+    list_display = ['source', 'content_hash', 'created', 'updated', 'deleted', 'imported_at']
+    readonly_fields = ['imported_at']
+
+
+@admin.register(SkillStats)
+class SkillStatsAdmin(admin.ModelAdmin):
+    list_display = ['skill', 'teach_count', 'learn_count', 'demand_ratio']
+    search_fields = ['skill__name']
+    ordering = ['-demand_ratio']
+
+
+@admin.register(SkillGroupStats)
+class SkillGroupStatsAdmin(admin.ModelAdmin):
+    list_display = ['level', 'group', 'teach_count', 'learn_count', 'demand_ratio']
+    list_filter = ['level']
+    ordering = ['-demand_ratio']
@@ -0,0 +1,535 @@
+# backend/skills/cache_backends.py
+"""
+Two-tier cache backend.
+
+TwoTierCache keeps a small LRU in each process (L1) in front of a cache
+shared by every worker (L2): Redis when REDIS_URL is set, otherwise
+SQLiteCache, a sqlite file shared by the processes on one host. Writes go
+to both tiers and publish the written keys; other processes drop those keys
+from their L1 when the message arrives (Redis pub/sub, or polling an
+invalidation table in the sqlite file). L1 entries also expire after
+L1_TIMEOUT seconds, which bounds staleness if a message is ever missed.
+Hits and misses are counted per tier; see TwoTierCache.stats().
+
+SQLiteCache values are pickled, so anyone who can write the file can run
+code in the workers. The file is created owner-only and a file (or WAL/SHM
+sidecar) owned by another user is refused.
+"""
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import stat
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CLEAR_ALL = '*'
+_MISSING = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    key TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+# ==================== SQLite L2 ====================
+
+class SQLiteCache(BaseCache):
+    """Cache in a sqlite file (WAL mode), shared by the processes on one host"""
+    cull_every = 200
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._writes = 0
+        self._checked = False
+
+    def _check_path(self):
+        """Create the file owner-only, and refuse one another user could have written"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+        except FileExistsError:
+            pass
+        for path in (self.path, f'{self.path}-wal', f'{self.path}-shm'):
+            try:
+                info = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                raise ImproperlyConfigured(f'SQLiteCache: {path} is not a regular file')
+            if hasattr(os, 'geteuid') and info.st_uid != os.geteuid():
+                raise ImproperlyConfigured(f'SQLiteCache: {path} is owned by another user')
+        self._checked = True
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if not self._checked:
+                self._check_path()
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _read(self, connection, key):
+        row = connection.execute(
+            'SELECT value, expires FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return _MISSING, None
+        return pickle.loads(row[0]), row[1]
+
+    def _write(self, connection, key, value, expires):
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires),
+        )
+
+    def get(self, key, default=None, version=None):
+        value, _ = self._read(self._connection(), self.make_and_validate_key(key, version))
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        connection = self._connection()
+        for key in keys:
+            value, _ = self._read(connection, self.make_and_validate_key(key, version))
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._write(self._connection(), key, value, self.get_backend_timeout(timeout))
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        with self._transaction() as connection:
+            for key, value in data.items():
+                self._write(connection, self.make_and_validate_key(key, version), value, expires)
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        with self._transaction() as connection:
+            if self._read(connection, key)[0] is not _MISSING:
+                return False
+            self._write(connection, key, value, self.get_backend_timeout(timeout))
+        self._maybe_cull()
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version)
+        with self._transaction() as connection:
+            value, expires = self._read(connection, key)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            self._write(connection, key, value, expires)
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._read(self._connection(), key)[0] is not _MISSING
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests
+        pass
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every:
+            return
+        connection = self._connection()
+        connection.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            # Soonest-expiring first; entries without a timeout go last
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,),
+            )
+
+    # Invalidation messages for SQLiteInvalidationBus
+
+    def publish_invalidations(self, origin, keys):
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT INTO cache_invalidations (origin, key, created) VALUES (?, ?, ?)',
+                [(origin, key, now) for key in keys],
+            )
+
+    def invalidations_after(self, last_id):
+        return self._connection().execute(
+            'SELECT id, origin, key FROM cache_invalidations WHERE id > ? ORDER BY id', (last_id,)
+        ).fetchall()
+
+    def last_invalidation_id(self):
+        return self._connection().execute(
+            'SELECT COALESCE(MAX(id), 0) FROM cache_invalidations'
+        ).fetchone()[0]
+
+    def prune_invalidations(self, older_than):
+        self._connection().execute(
+            'DELETE FROM cache_invalidations WHERE created < ?', (time.time() - older_than,)
+        )
+
+
+# ==================== Invalidation Messages ====================
+
+class SQLiteInvalidationBus:
+    """Invalidations stored in the sqlite file and picked up by polling on reads"""
+    prune_every = 100
+
+    def __init__(self, l2, origin, on_message, poll_interval, retention):
+        self.l2 = l2
+        self.origin = origin
+        self.on_message = on_message
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_id = l2.last_invalidation_id()
+        self._next_poll = 0
+        self._published = 0
+        self._lock = threading.Lock()
+
+    def publish(self, keys):
+        self.l2.publish_invalidations(self.origin, keys)
+        self._published += 1
+        if self._published % self.prune_every == 0:
+            # Older messages only concern L1 entries that have expired anyway
+            self.l2.prune_invalidations(self.retention)
+
+    def poll(self):
+        now = time.monotonic()
+        if now < self._next_poll or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = now + self.poll_interval
+            rows = self.l2.invalidations_after(self._last_id)
+            if rows:
+                self._last_id = rows[-1][0]
+                keys = [key for _, origin, key in rows if origin != self.origin]
+                if keys:
+                    self.on_message(keys)
+        finally:
+            self._lock.release()
+
+
+class RedisInvalidationBus:
+    """Invalidations over Redis pub/sub, applied by a listener thread"""
+
+    def __init__(self, client, channel, origin, on_message):
+        self.client = client
+        self.channel = channel
+        self.origin = origin
+        self.on_message = on_message
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._receive})
+        self._thread = self._pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=self._error
+        )
+
+    def _receive(self, message):
+        payload = json.loads(message['data'])
+        if payload['origin'] != self.origin:
+            self.on_message(payload['keys'])
+
+    def _error(self, exc, pubsub, thread):
+        # Messages may have been lost while disconnected
+        logger.warning(f"Cache invalidation listener error, clearing L1: {exc}")
+        self.on_message([CLEAR_ALL])
+
+    def publish(self, keys):
+        self.client.publish(self.channel, json.dumps({'origin': self.origin, 'keys': keys}))
+
+    def poll(self):
+        pass
+
+
+# ==================== Two-tier Backend ====================
+
+class _TwoTierState:
+    """One process's L1, L2 client, invalidation bus and counters for a cache"""
+
+    def __init__(self, name, options):
+        l2_config = dict(options.get('L2') or {})
+        if 'BACKEND' not in l2_config:
+            raise ImproperlyConfigured('TwoTierCache needs OPTIONS["L2"] with a BACKEND')
+        backend = import_string(l2_config.pop('BACKEND'))
+        self.l2 = backend(l2_config.pop('LOCATION', ''), l2_config)
+        self.l1 = TTLCache(
+            maxsize=int(options.get('L1_MAX_ENTRIES', 1000)),
+            ttl=float(options.get('L1_TIMEOUT', 10)),
+        )
+        self.origin = uuid.uuid4().hex
+        self.counters = dict.fromkeys(
+            ('l1_hits', 'l1_misses', 'l2_hits', 'l2_misses', 'published', 'received'), 0
+        )
+        # Bumped whenever messages arrive, so a read racing an invalidation
+        # doesn't put the old value back into L1
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.bus = self._make_bus(name, options)
+
+    def _make_bus(self, name, options):
+        if isinstance(self.l2, SQLiteCache):
+            return SQLiteInvalidationBus(
+                self.l2, self.origin, self.receive,
+                poll_interval=float(options.get('POLL_INTERVAL', 0.2)),
+                retention=self.l1.ttl * 2,
+            )
+        client_factory = getattr(getattr(self.l2, '_cache', None), 'get_client', None)
+        if client_factory is not None:
+            return RedisInvalidationBus(
+                client_factory(write=True), f'cache-invalidations:{name}', self.origin, self.receive
+            )
+        logger.warning(f"No invalidation channel for {type(self.l2).__name__}; L1 relies on L1_TIMEOUT")
+        return None
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def receive(self, keys):
+        if CLEAR_ALL in keys:
+            self.l1.clear()
+        else:
+            for key in keys:
+                self.l1.delete(key)
+        with self._lock:
+            self.counters['received'] += len(keys)
+            self.generation += 1
+
+    def publish(self, keys):
+        if self.bus is not None and keys:
+            self.bus.publish(keys)
+            self.count('published', len(keys))
+
+    def poll(self):
+        if self.bus is not None:
+            self.bus.poll()
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Per-process LRU (L1) in front of a shared cache (L2).
+
+    OPTIONS: L2 (a CACHES-style dict for the shared backend), L1_MAX_ENTRIES,
+    L1_TIMEOUT (seconds) and, for the sqlite L2, POLL_INTERVAL (seconds).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        name = location or 'default'
+        # Django builds a backend instance per thread; the tiers are per process
+        with _states_lock:
+            if name not in _states:
+                _states[name] = _TwoTierState(name, params.get('OPTIONS', {}))
+            self._state = _states[name]
+
+    @property
+    def l2(self):
+        return self._state.l2
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_store(self, key, value, timeout):
+        timeout = self._l2_timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._state.l1.delete(key)
+            return
+        ttl = self._state.l1.ttl if timeout is None else min(self._state.l1.ttl, timeout)
+        self._state.l1.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl=ttl)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        state = self._state
+        state.poll()
+        value = state.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            state.count('l1_hits')
+            return pickle.loads(value)
+        state.count('l1_misses')
+
+        generation = state.generation
+        value = state.l2.get(key, _MISSING)
+        if value is _MISSING:
+            state.count('l2_misses')
+            return default
+        state.count('l2_hits')
+        if state.generation == generation:
+            self._l1_store(key, value, None)
+        return value
+
+    def get_many(self, keys, version=None):
+        state = self._state
+        state.poll()
+        found = {}
+        missing = {}
+        for key in keys:
+            cache_key = self.make_and_validate_key(key, version)
+            value = state.l1.get(cache_key, _MISSING)
+            if value is _MISSING:
+                missing[cache_key] = key
+            else:
+                found[key] = pickle.loads(value)
+        state.count('l1_hits', len(found))
+        state.count('l1_misses', len(missing))
+        if missing:
+            generation = state.generation
+            fetched = state.l2.get_many(list(missing))
+            state.count('l2_hits', len(fetched))
+            state.count('l2_misses', len(missing) - len(fetched))
+            for cache_key, value in fetched.items():
+                found[missing[cache_key]] = value
+                if state.generation == generation:
+                    self._l1_store(cache_key, value, None)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._state.l2.set(key, value, self._l2_timeout(timeout))
+        self._l1_store(key, value, timeout)
+        self._state.publish([key])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        data = {self.make_and_validate_key(key, version): value for key, value in data.items()}
+        failed = self._state.l2.set_many(data, self._l2_timeout(timeout))
+        for key, value in data.items():
+            self._l1_store(key, value, timeout)
+        self._state.publish(list(data))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        if not self._state.l2.add(key, value, self._l2_timeout(timeout)):
+            return False
+        self._l1_store(key, value, timeout)
+        self._state.publish([key])
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        # The L1 copy may outlive a shortened timeout; reload it on next read
+        self._state.l1.delete(key)
+        return self._state.l2.touch(key, self._l2_timeout(timeout))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version)
+        value = self._state.l2.incr(key, delta)
+        self._state.l1.delete(key)
+        self._state.publish([key])
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._state.l1.delete(key)
+        deleted = self._state.l2.delete(key)
+        self._state.publish([key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version) for key in keys]
+        for key in keys:
+            self._state.l1.delete(key)
+        self._state.l2.delete_many(keys)
+        self._state.publish(keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._state.poll()
+        if self._state.l1.get(key, _MISSING) is not _MISSING:
+            return True
+        return self._state.l2.has_key(key)
+
+    def clear(self):
+        self._state.l1.clear()
+        self._state.l2.clear()
+        self._state.publish([CLEAR_ALL])
+
+    def close(self, **kwargs):
+        self._state.l2.close(**kwargs)
+
+    def stats(self):
+        """This process's hit/miss counters per tier"""
+        state = self._state
+        with state._lock:
+            counters = dict(state.counters)
+        return {
+            'l1': {
+                'hits': counters['l1_hits'],
+                'misses': counters['l1_misses'],
+                'entries': len(state.l1),
+                'max_entries': state.l1.maxsize,
+            },
+            'l2': {
+                'backend': type(state.l2).__name__,
+                'hits': counters['l2_hits'],
+                'misses': counters['l2_misses'],
+            },
+            'invalidations': {
+                'published': counters['published'],
+                'received': counters['received'],
+            },
+        }
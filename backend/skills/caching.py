@@ -0,0 +1,192 @@
+# backend/skills/caching.py
+"""
+Caches for authenticated principals.
+
+Users are cached as a projection of the fields the API actually reads and
+rebuilt as deferred model instances, so touching any other field loads it
+from the database on demand. Lookups go to a process-local cache first and
+then to the shared Django cache. Entries are evicted on user save/delete by
+the handlers in signals.py, which also replace the user's version in the
+shared cache. Process-local entries carry the version they were loaded
+under and are dropped once it changes. This way a deactivation or staff
+change made on one worker applies on every worker straight away.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+
+User = get_user_model()
+
+# Fields kept for cached users; anything else is deferred
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'bio', 'location', 'date_joined',
+)
+# Model.from_db expects values in model field order
+_PROJECTION = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname in PRINCIPAL_FIELDS
+)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = TTLCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+token_cache = TTLCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 30),
+)
+
+
+def token_key(token):
+    if isinstance(token, str):
+        token = token.encode()
+    return hashlib.sha256(token).hexdigest()
+
+
+def get_cached_token_user_id(token):
+    """User id of a previously decoded, still unexpired token"""
+    entry = token_cache.get(token_key(token))
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at is not None and expires_at <= time.time():
+        token_cache.delete(token_key(token))
+        return None
+    return user_id
+
+
+def cache_token_user_id(token, user_id, expires_at=None):
+    """Remember a decoded token, never past its own expiry"""
+    ttl = token_cache.ttl
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        token_cache.set(token_key(token), (user_id, expires_at), ttl=ttl)
+
+
+def user_projection(user):
+    return tuple(getattr(user, field) for field in _PROJECTION)
+
+
+def user_from_projection(values):
+    """Rebuild a user whose non-projected fields load lazily from the database"""
+    return User.from_db(router.db_for_read(User), _PROJECTION, values)
+
+
+def shared_user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def user_version_key(user_id):
+    return f"auth:user-version:{user_id}"
+
+
+def get_user_version(user_id):
+    """The user's current version in the shared cache"""
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so a concurrent invalidation isn't overwritten
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_cached_user(user_id):
+    entry = user_cache.get(user_id)
+    if entry is None:
+        return None
+    version, values = entry
+    # is_active/is_staff may have changed through another worker
+    if version != cache.get(user_version_key(user_id)):
+        user_cache.delete(user_id)
+        return None
+    return user_from_projection(values)
+
+
+def cache_user(user, version):
+    values = user_projection(user)
+    user_cache.set(user.pk, (version, values))
+    cache.set(shared_user_key(user.pk), values, getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+
+
+def load_user(user_id):
+    """
+    Resolve a user from the shared cache, then the database.
+    Raises User.DoesNotExist like a normal lookup.
+    """
+    # Read before the values: an entry tagged with an older version is never trusted
+    version = get_user_version(user_id)
+    values = cache.get(shared_user_key(user_id))
+    if values is not None:
+        user_cache.set(user_id, (version, values))
+        return user_from_projection(values)
+    user = User.objects.only(*_PROJECTION).get(pk=user_id)
+    cache_user(user, version)
+    return user
+
+
+def resolve_user(user_id):
+    """Cached user for an id, hitting the database only on a full miss"""
+    user = get_cached_user(user_id)
+    if user is None:
+        user = load_user(user_id)
+    return user
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+    cache.delete(shared_user_key(user_id))
+    cache.set(user_version_key(user_id), uuid.uuid4().hex, None)
@@ -0,0 +1,615 @@
+# backend/skills/calls.py
+"""
+In-memory registry of live video calls.
+
+The signaling consumer keeps call state here and validates transitions
+against it. The VideoCall row is inserted when a call is created, before
+the invite goes out, so every worker can look it up. Settling a ring
+(answer, decline, hangup or timeout) is a conditional UPDATE of that row,
+because those events can race on different workers. Later changes are
+written behind the registry in batches by CallWriter. Ring/abandon
+timeouts are driven by a TimerWheel, and a busy registry stops users from
+being rung twice.
+"""
+import asyncio
+import atexit
+import logging
+import math
+import uuid
+from collections import Counter, OrderedDict
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CallStats, VideoCall
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Allowed status transitions for a live call
+TRANSITIONS = {
+    'pending': {'accepted', 'declined', 'ended', 'missed'},
+    'accepted': {'ended'},
+}
+TERMINAL_STATUSES = {'declined', 'ended', 'missed'}
+# Statuses a row must be in for a write of each status to apply
+SOURCE_STATUSES = {}
+for _source, _targets in TRANSITIONS.items():
+    for _target in _targets:
+        SOURCE_STATUSES.setdefault(_target, set()).add(_source)
+
+PERSISTED_FIELDS = ['status', 'started_at', 'ended_at', 'duration']
+
+
+class InvalidTransition(Exception):
+    """Raised when a call cannot move to the requested status"""
+
+
+class UserBusy(Exception):
+    """Raised when a participant of a new call is already on another one"""
+
+    def __init__(self, user_id):
+        super().__init__(f"User {user_id} is already in a call")
+        self.user_id = user_id
+
+
+class LiveCall:
+    """Live state of a single call, mirrored to a VideoCall row"""
+    __slots__ = (
+        'call_id', 'pk', 'caller_id', 'receiver_id', 'status',
+        'created_at', 'started_at', 'ended_at', 'duration', 'failed_writes',
+    )
+
+    def __init__(self, call_id, caller_id, receiver_id, status='pending', pk=None,
+                 created_at=None, started_at=None, ended_at=None, duration=None):
+        self.call_id = call_id
+        self.pk = pk
+        self.caller_id = caller_id
+        self.receiver_id = receiver_id
+        self.status = status
+        self.created_at = created_at or timezone.now()
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.duration = duration
+        self.failed_writes = 0
+
+    @classmethod
+    def from_model(cls, call):
+        return cls(
+            call.session_id or str(call.pk),
+            call.caller_id,
+            call.receiver_id,
+            status=call.status,
+            pk=call.pk,
+            created_at=call.created_at,
+            started_at=call.started_at,
+            ended_at=call.ended_at,
+            duration=call.duration,
+        )
+
+    @property
+    def is_terminal(self):
+        return self.status in TERMINAL_STATUSES
+
+    def involves(self, user_id):
+        return user_id in (self.caller_id, self.receiver_id)
+
+    def next_state(self, status, now):
+        """The persisted fields that change when this call moves to ``status``"""
+        state = {'status': status}
+        if status == 'accepted' and not self.started_at:
+            state['started_at'] = now
+        elif status == 'ended' and not self.ended_at:
+            state['ended_at'] = now
+            if self.started_at:
+                state['duration'] = int((now - self.started_at).total_seconds())
+        return state
+
+    def snapshot(self):
+        """Copy of the persisted fields, safe to hand to a worker thread"""
+        return {
+            'call_id': self.call_id,
+            'pk': self.pk,
+            'caller_id': self.caller_id,
+            'receiver_id': self.receiver_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'ended_at': self.ended_at,
+            'duration': self.duration,
+        }
+
+
+class CallWriter:
+    """Write-behind buffer that persists live calls to VideoCall in batches"""
+
+    def __init__(self, flush_interval=0.5, batch_size=100, max_failed_writes=3):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_failed_writes = max_failed_writes
+        self._dirty = {}
+        self._task = None
+        self._wake = None
+
+    def enqueue(self, call):
+        """Mark a call dirty; repeated changes before a flush coalesce into one write"""
+        self._dirty[call.call_id] = call
+        self._ensure_running()
+        if len(self._dirty) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while self._dirty:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Persist every dirty call in a single transaction"""
+        if not self._dirty:
+            return
+        calls = list(self._dirty.values())
+        self._dirty.clear()
+        snapshots = [call.snapshot() for call in calls]
+
+        try:
+            await database_sync_to_async(self._persist)(snapshots)
+        except Exception as e:
+            logger.error(f"Error persisting {len(calls)} calls: {e}")
+            for call in calls:
+                call.failed_writes += 1
+                if call.failed_writes < self.max_failed_writes:
+                    self._dirty.setdefault(call.call_id, call)
+                else:
+                    logger.error(f"Dropping call {call.call_id} after {call.failed_writes} failed writes")
+            return
+        logger.debug(f"Persisted {len(calls)} calls")
+
+    def flush_pending(self):
+        """Synchronously persist whatever is still buffered (used at shutdown)"""
+        if not self._dirty:
+            return
+        calls = list(self._dirty.values())
+        self._dirty.clear()
+        try:
+            self._persist([call.snapshot() for call in calls])
+        except Exception as e:
+            logger.error(f"Error persisting {len(calls)} calls at shutdown: {e}")
+
+    def _persist(self, snapshots):
+        return write_transitions(_as_row(snap) for snap in snapshots)
+
+
+def _as_row(snap, **state):
+    """Unsaved VideoCall carrying a snapshot's values (plus ``state``) for write_transitions"""
+    values = {name: snap[name] for name in PERSISTED_FIELDS}
+    values.update(state)
+    return VideoCall(pk=snap['pk'], caller_id=snap['caller_id'], receiver_id=snap['receiver_id'], **values)
+
+
+def write_transitions(calls):
+    """
+    Write call states (VideoCall instances carrying the new values) whose row
+    is still in a status they can be reached from. Rows the registry, the
+    REST API or expire_calls already moved on are left alone, and CallStats
+    only counts the calls this write finished. Returns the pks written.
+    """
+    calls = {call.pk: call for call in calls}
+    if not calls:
+        return set()
+    with transaction.atomic():
+        current = dict(
+            VideoCall.objects.select_for_update().filter(pk__in=calls).values_list('pk', 'status')
+        )
+        written = [
+            call for pk, call in calls.items()
+            if current.get(pk) in SOURCE_STATUSES.get(call.status, ())
+        ]
+        if written:
+            VideoCall.objects.bulk_update(written, PERSISTED_FIELDS)
+            CallStats.record_calls(call for call in written if call.status in TERMINAL_STATUSES)
+    if len(written) < len(calls):
+        logger.info(f"Skipped {len(calls) - len(written)} call writes for rows already moved on")
+    return {call.pk for call in written}
+
+
+def settle_call(call, status):
+    """
+    Move a VideoCall row to ``status`` outside the signaling consumer;
+    False (and ``call`` untouched) if the row can no longer reach it
+    """
+    state = LiveCall.from_model(call).next_state(status, timezone.now())
+    update = VideoCall(pk=call.pk, caller_id=call.caller_id, receiver_id=call.receiver_id)
+    for name in PERSISTED_FIELDS:
+        setattr(update, name, state.get(name, getattr(call, name)))
+    if not write_transitions([update]):
+        return False
+    for name, value in state.items():
+        setattr(call, name, value)
+    return True
+
+
+class TimerWheel:
+    """Hashed timer wheel running every timeout from a single asyncio task"""
+
+    def __init__(self, tick=1.0, slots=512):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._where = {}
+        self._cursor = 0
+        self._task = None
+
+    def __len__(self):
+        return len(self._where)
+
+    def schedule(self, key, delay, callback):
+        """Run the coroutine function ``callback`` after ``delay`` seconds, replacing any timer for ``key``"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        index = (self._cursor + ticks) % len(self._slots)
+        self._slots[index][key] = [(ticks - 1) // len(self._slots), callback]
+        self._where[key] = index
+        self._ensure_running()
+
+    def cancel(self, key):
+        index = self._where.pop(key, None)
+        if index is not None:
+            self._slots[index].pop(key, None)
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while self._where:
+            await asyncio.sleep(self.tick)
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            due = []
+            for key, entry in list(slot.items()):
+                if entry[0] > 0:
+                    entry[0] -= 1
+                    continue
+                del slot[key]
+                del self._where[key]
+                due.append(entry[1])
+            for callback in due:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.error(f"Error running call timer: {e}")
+
+
+class LocalBusyRegistry:
+    """Which users are on a call, for a single worker process"""
+
+    def __init__(self):
+        self._active = {}
+
+    async def claim(self, user_ids, call_id):
+        """Mark all users busy with ``call_id``; returns the first busy user id instead if any"""
+        for user_id in user_ids:
+            if self._active.get(user_id, call_id) != call_id:
+                return user_id
+        for user_id in user_ids:
+            self._active[user_id] = call_id
+        return None
+
+    async def refresh(self, user_ids, call_id):
+        pass
+
+    async def release(self, user_ids, call_id):
+        for user_id in user_ids:
+            if self._active.get(user_id) == call_id:
+                del self._active[user_id]
+
+
+class RedisBusyRegistry:
+    """Busy markers kept in Redis so every worker sees the same state"""
+
+    # Only delete the marker if it still belongs to this call
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, url, ttl, prefix='skillswap:busy:'):
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = None
+        self._loop = None
+
+    def _redis(self):
+        # redis.asyncio connections are bound to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio
+            self._client = redis.asyncio.Redis.from_url(self.url)
+            self._loop = loop
+        return self._client
+
+    async def claim(self, user_ids, call_id):
+        client = self._redis()
+        claimed = []
+        for user_id in user_ids:
+            if await client.set(f"{self.prefix}{user_id}", call_id, nx=True, ex=self.ttl):
+                claimed.append(user_id)
+                continue
+            await self.release(claimed, call_id)
+            return user_id
+        return None
+
+    async def refresh(self, user_ids, call_id):
+        client = self._redis()
+        for user_id in user_ids:
+            await client.set(f"{self.prefix}{user_id}", call_id, xx=True, ex=self.ttl)
+
+    async def release(self, user_ids, call_id):
+        client = self._redis()
+        for user_id in user_ids:
+            await client.eval(self.RELEASE_SCRIPT, 1, f"{self.prefix}{user_id}", call_id)
+
+
+def busy_registry_from_settings():
+    """Share busy state through Redis when the channel layer already uses it"""
+    layer = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {})
+    if layer.get('BACKEND', '').startswith('channels_redis.'):
+        host = layer.get('CONFIG', {}).get('hosts', [None])[0]
+        if isinstance(host, str):
+            return RedisBusyRegistry(host, ttl=getattr(settings, 'VIDEO_CALL_BUSY_TTL', 120))
+    return LocalBusyRegistry()
+
+
+class CallRegistry:
+    """Process-local registry of live calls keyed by call id"""
+
+    def __init__(self, writer, timers, busy, ring_timeout=45, abandon_grace=30,
+                 known_users_size=10000):
+        self.writer = writer
+        self.timers = timers
+        self.busy = busy
+        self.ring_timeout = ring_timeout
+        self.abandon_grace = abandon_grace
+        self.heartbeat_interval = max(1, getattr(busy, 'ttl', 120) // 3)
+        self.known_users_size = known_users_size
+        self._calls = {}
+        self._user_calls = {}
+        self._connections = Counter()
+        self._known_users = OrderedDict()
+
+    async def create(self, caller_id, receiver_id):
+        """Register a new call, or raise UserBusy if either side is already on one"""
+        call = LiveCall(uuid.uuid4().hex, int(caller_id), int(receiver_id))
+        busy_user_id = await self.busy.claim((call.caller_id, call.receiver_id), call.call_id)
+        if busy_user_id is not None:
+            raise UserBusy(busy_user_id)
+        try:
+            # Written before the invite goes out so any worker can look the call up
+            call.pk, call.created_at = await self._insert_call(call)
+        except Exception:
+            await self.busy.release((call.caller_id, call.receiver_id), call.call_id)
+            raise
+        self._register(call)
+        self.timers.schedule(
+            ('ring', call.call_id), self.ring_timeout, lambda: self._expire_ring(call.call_id)
+        )
+        return call
+
+    def calls_for_user(self, user_id):
+        return [self._calls[call_id] for call_id in self._user_calls.get(user_id, ())]
+
+    def _register(self, call):
+        self._calls[call.call_id] = call
+        for user_id in (call.caller_id, call.receiver_id):
+            self._user_calls.setdefault(user_id, set()).add(call.call_id)
+
+    def _unregister(self, call):
+        self._calls.pop(call.call_id, None)
+        self.timers.cancel(('ring', call.call_id))
+        self.timers.cancel(('busy', call.call_id))
+        for user_id in (call.caller_id, call.receiver_id):
+            call_ids = self._user_calls.get(user_id)
+            if call_ids is not None:
+                call_ids.discard(call.call_id)
+                if not call_ids:
+                    del self._user_calls[user_id]
+
+    def get(self, call_id):
+        return self._calls.get(str(call_id))
+
+    async def lookup(self, call_id):
+        """Find a live call, falling back to the database for calls started elsewhere"""
+        call = self.get(call_id)
+        if call is not None:
+            return call
+        call = await self._fetch_call(str(call_id))
+        if call is not None and not call.is_terminal:
+            self._register(call)
+        return call
+
+    async def transition(self, call, status):
+        """Move a call to a new status; settling a ring is written at once, the rest behind"""
+        if status not in TRANSITIONS.get(call.status, ()):
+            raise InvalidTransition(f"Call {call.call_id} cannot go from {call.status} to {status}")
+
+        state = call.next_state(status, timezone.now())
+        settling = call.status == 'pending'
+        if settling:
+            current = await self._settle(call, state)
+            if current is not None:
+                # Another worker or the REST API got there first; re-check against its state
+                await self._adopt(call, current)
+                return await self.transition(call, status)
+
+        for name, value in state.items():
+            setattr(call, name, value)
+
+        if call.is_terminal:
+            self._unregister(call)
+            await self.busy.release((call.caller_id, call.receiver_id), call.call_id)
+        else:
+            self.timers.cancel(('ring', call.call_id))
+            self._schedule_heartbeat(call)
+        if not settling:
+            self.writer.enqueue(call)
+        return call
+
+    async def _adopt(self, call, current):
+        """Take over the persisted state of a call that moved on elsewhere"""
+        for name in PERSISTED_FIELDS:
+            setattr(call, name, getattr(current, name))
+        if call.is_terminal:
+            self._unregister(call)
+            await self.busy.release((call.caller_id, call.receiver_id), call.call_id)
+
+    def _schedule_heartbeat(self, call):
+        """Keep a live call's busy markers from expiring while it lasts"""
+        async def heartbeat():
+            if self.get(call.call_id) is call:
+                await self.busy.refresh((call.caller_id, call.receiver_id), call.call_id)
+                self._schedule_heartbeat(call)
+
+        self.timers.schedule(('busy', call.call_id), self.heartbeat_interval, heartbeat)
+
+    def user_connected(self, user_id):
+        self._connections[user_id] += 1
+        self.timers.cancel(('abandon', user_id))
+
+    def user_disconnected(self, user_id):
+        self._connections[user_id] -= 1
+        if self._connections[user_id] > 0:
+            return
+        del self._connections[user_id]
+        if user_id in self._user_calls:
+            self.timers.schedule(
+                ('abandon', user_id), self.abandon_grace, lambda: self._expire_abandoned(user_id)
+            )
+
+    async def _expire_ring(self, call_id):
+        """Unanswered ring: mark the call missed and tell both sides"""
+        call = self.get(call_id)
+        if call is None or call.status != 'pending':
+            return
+        try:
+            await self.transition(call, 'missed')
+        except InvalidTransition as e:
+            # Answered, declined or hung up through another worker
+            logger.info(f"Ring timeout of call {call_id} skipped: {e}")
+            return
+        logger.info(f"Call {call_id} was not answered within {self.ring_timeout}s")
+        await self._notify_ended(call, 'timeout')
+
+    async def _expire_abandoned(self, user_id):
+        """A participant left and did not come back: close their live calls"""
+        if self._connections[user_id] > 0:
+            return
+        for call in self.calls_for_user(user_id):
+            try:
+                await self.transition(call, 'missed' if call.status == 'pending' else 'ended')
+            except InvalidTransition as e:
+                logger.info(f"Abandon timeout of call {call.call_id} skipped: {e}")
+                continue
+            logger.info(f"Call {call.call_id} abandoned by user {user_id}")
+            await self._notify_ended(call, 'abandoned')
+
+    async def _notify_ended(self, call, reason):
+        channel_layer = get_channel_layer()
+        for user_id in (call.caller_id, call.receiver_id):
+            await channel_layer.group_send(
+                f"video_call_user_{user_id}",
+                {
+                    'type': 'call_ended',
+                    'call_id': call.call_id,
+                    'ended_by': None,
+                    'reason': reason,
+                }
+            )
+
+    async def user_exists(self, user_id):
+        """Check a user id, remembering positive answers so repeat calls skip the DB"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        if user_id in self._known_users:
+            self._known_users.move_to_end(user_id)
+            return True
+        if not await self._user_exists(user_id):
+            return False
+        self._known_users[user_id] = True
+        if len(self._known_users) > self.known_users_size:
+            self._known_users.popitem(last=False)
+        return True
+
+    def forget_user(self, user_id):
+        self._known_users.pop(user_id, None)
+
+    @database_sync_to_async
+    def _user_exists(self, user_id):
+        return User.objects.filter(id=user_id).exists()
+
+    @database_sync_to_async
+    def _insert_call(self, call):
+        row = VideoCall.objects.create(
+            session_id=call.call_id,
+            caller_id=call.caller_id,
+            receiver_id=call.receiver_id,
+            status=call.status,
+        )
+        return row.pk, row.created_at
+
+    @database_sync_to_async
+    def _settle(self, call, state):
+        """
+        Move a ringing call's row if it is still in the status this copy
+        holds: None if it was written, otherwise the row as it now stands
+        """
+        with transaction.atomic():
+            current = VideoCall.objects.select_for_update().filter(pk=call.pk).first()
+            if current is None:
+                raise InvalidTransition(f"Call {call.call_id} no longer exists")
+            if current.status != call.status:
+                return LiveCall.from_model(current)
+            write_transitions([_as_row(call.snapshot(), **state)])
+        return None
+
+    @database_sync_to_async
+    def _fetch_call(self, call_id):
+        try:
+            # Legacy clients may still send the numeric row id
+            if call_id.isdigit() and len(call_id) < 20:
+                lookup = {'pk': int(call_id)}
+            else:
+                lookup = {'session_id': call_id}
+            call = VideoCall.objects.filter(**lookup).first()
+        except Exception as e:
+            logger.error(f"Error getting call: {e}")
+            return None
+        return LiveCall.from_model(call) if call else None
+
+
+call_registry = CallRegistry(
+    CallWriter(
+        flush_interval=getattr(settings, 'VIDEO_CALL_FLUSH_INTERVAL', 0.5),
+        batch_size=getattr(settings, 'VIDEO_CALL_FLUSH_BATCH_SIZE', 100),
+    ),
+    TimerWheel(),
+    busy_registry_from_settings(),
+    ring_timeout=getattr(settings, 'VIDEO_CALL_RING_TIMEOUT', 45),
+    abandon_grace=getattr(settings, 'VIDEO_CALL_ABANDON_GRACE', 30),
+)
+atexit.register(call_registry.writer.flush_pending)
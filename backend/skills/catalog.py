@@ -0,0 +1,107 @@
+# backend/skills/catalog.py
+"""
+Pre-encoded skill catalog.
+
+The full skill list is serialized once per catalog version into JSON bytes
+plus a gzip copy. The version lives in the Django cache and is bumped from
+signals.py whenever a Skill is saved or deleted (and by bulk loaders), so
+serving the catalog never touches the ORM. ETags are derived from the
+version alone, which lets If-None-Match be answered without building or
+even loading the payload.
+"""
+import gzip
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .renderers import dumps
+
+VERSION_KEY = 'skills:catalog:version'
+
+
+class CatalogPayload:
+    """Encoded catalog for one version"""
+    __slots__ = ('version', 'body', 'gzip_body', 'etag', 'gzip_etag')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+        self.etag, self.gzip_etag = catalog_etags(version)
+
+
+def catalog_etags(version):
+    """Plain and gzip ETags for a catalog version"""
+    return f'"{version}"', f'"{version}-gzip"'
+
+
+def etag_matches(if_none_match, version):
+    """True if an If-None-Match header names either encoding of this version"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return not tags.isdisjoint(catalog_etags(version))
+
+
+def accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip with a non-zero q-value"""
+    wildcard = None
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding in ('gzip', 'x-gzip'):
+            return quality > 0
+        if coding == '*':
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+_payload = None
+_lock = threading.Lock()
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = bump_catalog_version()
+    return version
+
+
+def bump_catalog_version():
+    """Mark every cached catalog payload stale"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def get_catalog_payload(version=None):
+    """Catalog payload for a version (default: current), rebuilt only when it has moved"""
+    global _payload
+    if version is None:
+        version = get_catalog_version()
+    payload = _payload
+    if payload is not None and payload.version == version:
+        return payload
+    with _lock:
+        if _payload is None or _payload.version != version:
+            _payload = CatalogPayload(version, _render_catalog())
+        return _payload
+
+
+def _render_catalog():
+    from .models import Skill
+    from .serializers import SkillSerializer
+
+    skills = Skill.objects.all().order_by('name')
+    return dumps(SkillSerializer(skills, many=True).data)
@@ -0,0 +1,227 @@
+# backend/skills/catalog_import.py
+"""
+Skill catalog import.
+
+A catalog file is a JSON array of {"name", "category", "subcategory"}
+objects. It is parsed one entry at a time, diffed against the Skill table
+in a single query and applied with bulk inserts/updates. Bulk writes skip
+model signals, so the catalog version is bumped here, which also
+invalidates the search index and taxonomy built from it.
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Category, Skill, SkillCatalogImport, SkillGroupStats, SkillStats, Subcategory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent / 'skills.json'
+READ_SIZE = 64 * 1024
+BATCH_SIZE = 500
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+class ImportResult:
+    """Counts for one import run"""
+
+    def __init__(self, content_hash):
+        self.content_hash = content_hash
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.skipped = False
+
+    def __str__(self):
+        if self.skipped:
+            return 'catalog unchanged since the last import'
+        return (
+            f'{self.created} created, {self.updated} updated, '
+            f'{self.deleted} deleted, {self.unchanged} unchanged'
+        )
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_json_array(f):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace, the opening bracket and separators
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','
+                                     or (not started and buffer[pos] == '[')):
+            started = started or buffer[pos] == '['
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                raise CatalogImportError('Catalog must be a JSON array')
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise CatalogImportError(f'Invalid JSON: {e}') from e
+            else:
+                yield item
+                pos = end
+                continue
+        if eof:
+            raise CatalogImportError('Unexpected end of catalog file')
+        chunk = f.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def _clean(value):
+    return (value or '').strip()
+
+
+def read_entries(path):
+    """name -> (category, subcategory); later duplicates win"""
+    entries = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for item in iter_json_array(f):
+            if not isinstance(item, dict) or not _clean(item.get('name')):
+                logger.warning(f"Skipping catalog entry without a name: {item!r}")
+                continue
+            name = _clean(item['name'])
+            if name in entries:
+                logger.warning(f"Duplicate catalog entry for {name}, using the last one")
+            entries[name] = (_clean(item.get('category')), _clean(item.get('subcategory')))
+    return entries
+
+
+def _resolve_groups(pairs):
+    """
+    Map (category, subcategory) names to Skill FK values, creating missing
+    Category/Subcategory rows in bulk
+    """
+    pairs = set(pairs)
+    categories = dict(Category.objects.values_list('name', 'id'))
+    missing = {category for category, _ in pairs if category and category not in categories}
+    if missing:
+        Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+        categories = dict(Category.objects.values_list('name', 'id'))
+
+    subcategories = {
+        (category_id, name): subcategory_id
+        for subcategory_id, category_id, name in Subcategory.objects.values_list('id', 'category_id', 'name')
+    }
+    wanted = {
+        (categories.get(category), subcategory)
+        for category, subcategory in pairs if subcategory
+    }
+    missing = wanted - subcategories.keys()
+    if missing:
+        Subcategory.objects.bulk_create(
+            [Subcategory(category_id=category_id, name=name) for category_id, name in missing],
+            ignore_conflicts=True,
+        )
+        subcategories = {
+            (category_id, name): subcategory_id
+            for subcategory_id, category_id, name in Subcategory.objects.values_list('id', 'category_id', 'name')
+        }
+
+    resolved = {}
+    for category, subcategory in pairs:
+        category_id = categories.get(category)
+        resolved[(category, subcategory)] = {
+            'category_id': category_id,
+            'subcategory_id': subcategories.get((category_id, subcategory)) if subcategory else None,
+        }
+    return resolved
+
+
+def import_skill_catalog(path=DEFAULT_CATALOG_PATH, delete=False, force=False, dry_run=False):
+    """
+    Bring the Skill table in line with a catalog file.
+    Skills missing from the file are only removed with delete=True, which
+    also removes the UserSkill rows pointing at them.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise CatalogImportError(f'File not found: {path}')
+
+    result = ImportResult(file_hash(path))
+    last = SkillCatalogImport.objects.first()
+    if not force and last is not None and last.content_hash == result.content_hash:
+        result.skipped = True
+        return result
+
+    entries = read_entries(path)
+    existing = {
+        name: (skill_id, category, subcategory)
+        for skill_id, name, category, subcategory in Skill.objects.values_list(
+            'id', 'name', 'category__name', 'subcategory__name'
+        )
+    }
+
+    to_create = []
+    to_update = []
+    for name, groups in entries.items():
+        current = existing.get(name)
+        if current is None:
+            to_create.append(name)
+        elif (_clean(current[1]), _clean(current[2])) != groups:
+            to_update.append((current[0], name))
+        else:
+            result.unchanged += 1
+    stale_ids = [skill_id for name, (skill_id, _, _) in existing.items() if name not in entries] if delete else []
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.deleted = len(stale_ids)
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        group_ids = _resolve_groups(entries[name] for name in to_create + [n for _, n in to_update])
+        Skill.objects.bulk_create(
+            [Skill(name=name, **group_ids[entries[name]]) for name in to_create],
+            batch_size=BATCH_SIZE,
+        )
+        Skill.objects.bulk_update(
+            [Skill(id=skill_id, name=name, **group_ids[entries[name]]) for skill_id, name in to_update],
+            ['category', 'subcategory'],
+            batch_size=BATCH_SIZE,
+        )
+        if stale_ids:
+            Skill.objects.filter(id__in=stale_ids).delete()
+        if to_update:
+            # Category/subcategory moves change the rollups
+            SkillGroupStats.rebuild()
+        # bulk_create skips the signals that give new skills and groups their stats rows
+        SkillStats.create_missing()
+        SkillCatalogImport.objects.create(
+            source=str(path),
+            content_hash=result.content_hash,
+            created=result.created,
+            updated=result.updated,
+            deleted=result.deleted,
+        )
+
+    if to_create or to_update or stale_ids:
+        bump_catalog_version()
+    logger.info(f"Imported skill catalog from {path}: {result}")
+    return result
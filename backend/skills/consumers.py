@@ -1,13 +1,32 @@
+import asyncio
 import json
+import re
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import UserActivity, VideoCall
+from .models import UserActivity
+from .calls import call_registry, InvalidTransition, UserBusy
 from django.utils import timezone
 import logging
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
+# Both raise a ValueError subclass on malformed input
+_json_loads = orjson.loads if orjson else json.loads
+
+# Clients serialize webrtc_signal frames with a fixed key order, which lets the
+# relay pick out the target and forward the signal body exactly as sent; the
+# body is only parsed to check it is a single JSON value, never re-encoded
+RAW_SIGNAL_FRAME = re.compile(r'\{"type":"webrtc_signal","target_user_id":"?(\d+)"?,"signal_data":')
+ICE_CANDIDATE_PREFIX = '{"type":"ice-candidate"'
+ICE_BATCH_WINDOW = getattr(settings, 'VIDEO_CALL_ICE_BATCH_WINDOW', 0.05)
 
 class ActivityConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -127,6 +146,8 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
             return
             
         self.user_group_name = f"video_call_user_{self.user.id}"
+        self.pending_candidates = {}
+        self.candidate_flushes = {}
         
         # Join user's personal group
         await self.channel_layer.group_add(
@@ -135,9 +156,13 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        call_registry.user_connected(self.user.id)
         logger.info(f"User {self.user.username} connected to video call system")
 
     async def disconnect(self, close_code):
+        for target_user_id in list(getattr(self, 'pending_candidates', {})):
+            await self.flush_candidates(target_user_id)
+
         if hasattr(self, 'user_group_name'):
             await self.channel_layer.group_discard(
                 self.user_group_name,
@@ -145,9 +170,27 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
             )
         
         if hasattr(self, 'user') and not self.user.is_anonymous:
+            call_registry.user_disconnected(self.user.id)
             logger.info(f"User {self.user.username} disconnected from video call system")
 
     async def receive(self, text_data):
+        # Fast path: relay signaling frames without re-encoding the signal body
+        if text_data.startswith('{"type":"webrtc_signal"'):
+            match = RAW_SIGNAL_FRAME.match(text_data)
+            raw_signal = text_data[match.end():-1] if match and text_data.endswith('}') else ''
+            # The slice must be exactly one JSON value; extra top-level keys or
+            # malformed JSON fail to parse and take the decoding path below
+            try:
+                signal_data = _json_loads(raw_signal) if raw_signal else None
+            except ValueError:
+                signal_data = None
+            if signal_data:
+                try:
+                    await self.relay_signal(int(match.group(1)), raw_signal)
+                except Exception as e:
+                    logger.error(f"Error sending WebRTC signal: {e}")
+                return
+
         try:
             data = json.loads(text_data)
             message_type = data.get('type')
@@ -190,24 +233,35 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
             
         try:
             # Check if receiver exists
-            receiver_exists = await self.check_user_exists(receiver_id)
+            receiver_exists = await call_registry.user_exists(receiver_id)
             if not receiver_exists:
                 await self.send(text_data=json.dumps({
                     'type': 'error',
                     'message': 'Receiver not found'
                 }))
                 return
+            # Clients may send the id as a string; echo it back as the int the server uses
+            receiver_id = int(receiver_id)
             
-            # Create call record
-            call = await self.create_call(self.user.id, receiver_id)
-            logger.info(f"Created call {call.id} from {self.user.username} to user {receiver_id}")
+            # Register the call; its VideoCall row is inserted before the invite goes out
+            try:
+                call = await self.create_call(self.user.id, receiver_id)
+            except UserBusy as e:
+                logger.info(f"Call from {self.user.username} to user {receiver_id} rejected: {e}")
+                await self.send(text_data=json.dumps({
+                    'type': 'busy',
+                    'receiver_id': receiver_id,
+                    'busy_user_id': e.user_id
+                }))
+                return
+            logger.info(f"Created call {call.call_id} from {self.user.username} to user {receiver_id}")
             
             # Send call invitation to receiver
             await self.channel_layer.group_send(
                 f"video_call_user_{receiver_id}",
                 {
                     'type': 'incoming_call',
-                    'call_id': call.id,
+                    'call_id': call.call_id,
                     'caller_id': self.user.id,
                     'caller_username': self.user.username,
                 }
@@ -216,7 +270,7 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
             # Confirm to caller that call was initiated
             await self.send(text_data=json.dumps({
                 'type': 'call_initiated',
-                'call_id': call.id,
+                'call_id': call.call_id,
                 'receiver_id': receiver_id
             }))
             
@@ -245,17 +299,33 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
                 }))
                 return
                 
+            if call.receiver_id != self.user.id:
+                logger.warning(f"User {self.user.username} tried to answer call {call_id} they did not receive")
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Not authorized'
+                }))
+                return
+                
             # Update call status
             status = 'accepted' if accepted else 'declined'
-            await self.update_call_status(call_id, status)
+            try:
+                await self.update_call_status(call, status)
+            except InvalidTransition as e:
+                logger.warning(str(e))
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Call is no longer ringing'
+                }))
+                return
             logger.info(f"Call {call_id} {status} by {self.user.username}")
             
             # Notify caller
             await self.channel_layer.group_send(
-                f"video_call_user_{call.caller.id}",
+                f"video_call_user_{call.caller_id}",
                 {
                     'type': 'call_response',
-                    'call_id': call_id,
+                    'call_id': call.call_id,
                     'accepted': accepted,
                     'responder_id': self.user.id,
                     'responder_username': self.user.username
@@ -270,26 +340,72 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
         
         if target_user_id and signal_data:
             try:
-                await self.channel_layer.group_send(
-                    f"video_call_user_{target_user_id}",
-                    {
-                        'type': 'webrtc_signal',
-                        'signal_data': signal_data,
-                        'from_user_id': self.user.id
-                    }
-                )
-                logger.debug(f"Sent WebRTC signal from {self.user.id} to {target_user_id}")
+                raw_signal = json.dumps(signal_data, separators=(',', ':'))
+                await self.relay_signal(int(target_user_id), raw_signal)
             except Exception as e:
                 logger.error(f"Error sending WebRTC signal: {e}")
 
+    async def relay_signal(self, target_user_id, raw_signal):
+        """Forward a raw signal body, coalescing trickle-ICE candidates per target"""
+        if ICE_BATCH_WINDOW > 0 and raw_signal.startswith(ICE_CANDIDATE_PREFIX):
+            pending = self.pending_candidates.setdefault(target_user_id, [])
+            pending.append(raw_signal)
+            if len(pending) == 1:
+                self.candidate_flushes[target_user_id] = asyncio.create_task(
+                    self.flush_candidates_later(target_user_id)
+                )
+            return
+
+        # Offers and answers must not overtake candidates already queued
+        await self.flush_candidates(target_user_id)
+        await self.channel_layer.group_send(
+            f"video_call_user_{target_user_id}",
+            {
+                'type': 'webrtc_signal',
+                'raw_signal': raw_signal,
+                'from_user_id': self.user.id
+            }
+        )
+        logger.debug(f"Sent WebRTC signal from {self.user.id} to {target_user_id}")
+
+    async def flush_candidates_later(self, target_user_id):
+        await asyncio.sleep(ICE_BATCH_WINDOW)
+        self.candidate_flushes.pop(target_user_id, None)
+        try:
+            await self.flush_candidates(target_user_id)
+        except Exception as e:
+            logger.error(f"Error sending ICE candidates: {e}")
+
+    async def flush_candidates(self, target_user_id):
+        """Send any queued ICE candidates for a target as one frame"""
+        task = self.candidate_flushes.pop(target_user_id, None)
+        if task is not None:
+            task.cancel()
+        raw_signals = self.pending_candidates.pop(target_user_id, None)
+        if not raw_signals:
+            return
+
+        if len(raw_signals) == 1:
+            event = {'type': 'webrtc_signal', 'raw_signal': raw_signals[0]}
+        else:
+            event = {'type': 'webrtc_signal_batch', 'raw_signals': raw_signals}
+        event['from_user_id'] = self.user.id
+        await self.channel_layer.group_send(f"video_call_user_{target_user_id}", event)
+        logger.debug(f"Sent {len(raw_signals)} ICE candidates from {self.user.id} to {target_user_id}")
+
     async def handle_call_end(self, data):
         call_id = data.get('call_id')
         target_user_id = data.get('target_user_id')
         
         try:
             if call_id:
-                await self.update_call_status(call_id, 'ended')
-                logger.info(f"Call {call_id} ended by {self.user.username}")
+                call = await self.get_call(call_id)
+                if call and call.involves(self.user.id):
+                    try:
+                        await self.update_call_status(call, 'ended')
+                        logger.info(f"Call {call_id} ended by {self.user.username}")
+                    except InvalidTransition as e:
+                        logger.info(str(e))
             
             if target_user_id:
                 await self.channel_layer.group_send(
@@ -322,62 +438,40 @@ class VideoCallConsumer(AsyncWebsocketConsumer):
         }))
 
     async def webrtc_signal(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'webrtc_signal',
-            'signal_data': event['signal_data'],
-            'from_user_id': event['from_user_id']
-        }))
+        raw_signal = event.get('raw_signal')
+        if raw_signal is None:
+            raw_signal = json.dumps(event['signal_data'])
+        # Server keys come after the raw body so they win over anything smuggled into it
+        await self.send(text_data=(
+            f'{{"signal_data":{raw_signal},'
+            f'"type":"webrtc_signal","from_user_id":{int(event["from_user_id"])}}}'
+        ))
+
+    async def webrtc_signal_batch(self, event):
+        await self.send(text_data=(
+            f'{{"signals":[{",".join(event["raw_signals"])}],'
+            f'"type":"webrtc_signal_batch","from_user_id":{int(event["from_user_id"])}}}'
+        ))
 
     async def call_ended(self, event):
         await self.send(text_data=json.dumps({
             'type': 'call_ended',
             'call_id': event['call_id'],
-            'ended_by': event['ended_by']
+            'ended_by': event['ended_by'],
+            'reason': event.get('reason', 'hangup')
         }))
 
-    @database_sync_to_async
-    def check_user_exists(self, user_id):
-        try:
-            return User.objects.filter(id=user_id).exists()
-        except Exception:
-            return False
+    async def create_call(self, caller_id, receiver_id):
+        return await call_registry.create(caller_id, receiver_id)
 
-    @database_sync_to_async
-    def create_call(self, caller_id, receiver_id):
+    async def get_call(self, call_id):
         try:
-            return VideoCall.objects.create(
-                caller_id=caller_id,
-                receiver_id=receiver_id,
-                status='pending'
-            )
-        except Exception as e:
-            logger.error(f"Error creating call: {e}")
-            raise
-
-    @database_sync_to_async
-    def get_call(self, call_id):
-        try:
-            return VideoCall.objects.select_related('caller', 'receiver').get(id=call_id)
-        except VideoCall.DoesNotExist:
-            return None
+            return await call_registry.lookup(call_id)
         except Exception as e:
             logger.error(f"Error getting call: {e}")
             return None
 
-    @database_sync_to_async
-    def update_call_status(self, call_id, status):
-        try:
-            call = VideoCall.objects.filter(id=call_id).first()
-            if call:
-                call.status = status
-                if status == 'accepted' and not call.started_at:
-                    call.started_at = timezone.now()
-                elif status == 'ended' and not call.ended_at:
-                    call.ended_at = timezone.now()
-                    if call.started_at:
-                        duration = (call.ended_at - call.started_at).total_seconds()
-                        call.duration = int(duration)
-                call.save()
-                logger.info(f"Updated call {call_id} status to {status}")
-        except Exception as e:
-            logger.error(f"Error updating call status: {e}")
\ No newline at end of file
+    async def update_call_status(self, call, status):
+        call = await call_registry.transition(call, status)
+        logger.info(f"Updated call {call.call_id} status to {status}")
+        return call
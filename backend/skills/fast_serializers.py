@@ -0,0 +1,271 @@
+# backend/skills/fast_serializers.py
+"""
+Plain-dict serializers for hot list endpoints.
+
+MatchSerializer, MessageSerializer and ConversationListSerializer run DRF's
+field machinery on every row. For plain list requests (no ?fields=,
+?expand= or ?format=normalized) FastListMixin instead reads exactly the
+needed columns with one .values() join and builds the response dicts
+directly. The output is identical to the DRF serializers; tests.py checks
+this, and `manage.py benchmark_serializers` measures the difference.
+Set API_FAST_SERIALIZERS=False to serve every list through DRF.
+"""
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .fieldsets import context_fieldset
+from .models import Category, Message, Subcategory
+from .renderers import dumps
+from .serializers import (
+    MATCH_TIER_DISPLAY, CustomUserSerializer, match_quality, message_preview
+)
+from .streaming import STREAM_CONTENT_TYPES
+from .taxonomy import get_taxonomy
+
+USER_FIELDS = tuple(CustomUserSerializer.Meta.fields)
+
+
+def datetime_formatter():
+    """
+    DRF's DateTimeField rendering as a plain function, with the output
+    format and timezone looked up once instead of per value
+    """
+    field = serializers.DateTimeField()
+    output_format = api_settings.DATETIME_FORMAT
+    current_timezone = field.default_timezone()
+    if not isinstance(output_format, str) or output_format.lower() != ISO_8601 or current_timezone is None:
+        return lambda value: None if value is None else field.to_representation(value)
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return format_datetime
+
+
+def _user_columns(prefix):
+    return tuple(f'{prefix}__{field}' for field in USER_FIELDS)
+
+
+def _skill_columns(prefix):
+    return (f'{prefix}__id', f'{prefix}__name', f'{prefix}__category', f'{prefix}__subcategory')
+
+
+def _group_name(lookup, model, group_id):
+    # Same fallback as SkillSerializer when the taxonomy is behind
+    if group_id is None:
+        return None
+    return lookup(group_id) or model.objects.get(pk=group_id).name
+
+
+def _skill(row, prefix, taxonomy):
+    """SkillSerializer output from a row's prefixed skill columns"""
+    if row[f'{prefix}__id'] is None:
+        return None
+    return {
+        'id': row[f'{prefix}__id'],
+        'name': row[f'{prefix}__name'],
+        'category': _group_name(taxonomy.category_name, Category, row[f'{prefix}__category']),
+        'subcategory': _group_name(
+            taxonomy.subcategory_name, Subcategory, row[f'{prefix}__subcategory']
+        ),
+    }
+
+
+class FastSerializer(ABC):
+    """Builds one serializer's list output from .values() rows"""
+    columns = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def values(self, queryset, extra=()):
+        """The queryset as rows of exactly the needed columns (plus extra, e.g. cursor keys)"""
+        return queryset.values(*dict.fromkeys(self.columns + tuple(extra)))
+
+    def serialize(self, rows):
+        self.format_datetime = datetime_formatter()
+        self._users = {}
+        return [self.to_representation(row) for row in rows]
+
+    def user(self, row, prefix):
+        """CustomUserSerializer output from a row's prefixed user columns, built once per user"""
+        user_id = row[f'{prefix}__id']
+        if user_id is None:
+            return None
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = {field: row[f'{prefix}__{field}'] for field in USER_FIELDS}
+            user['date_joined'] = self.format_datetime(user['date_joined'])
+        return user
+
+    @abstractmethod
+    def to_representation(self, row):
+        """One row's output dict"""
+
+
+class FastMatchSerializer(FastSerializer):
+    """MatchSerializer output"""
+    columns = (
+        'id', 'match_tier', 'is_mutual', 'created_at',
+        *_user_columns('learner'), *_user_columns('teacher'),
+        *_skill_columns('skill'), *_skill_columns('teacher_skill'),
+    )
+
+    def serialize(self, rows):
+        self.taxonomy = get_taxonomy()
+        return super().serialize(rows)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'learner': self.user(row, 'learner'),
+            'teacher': self.user(row, 'teacher'),
+            'skill': _skill(row, 'skill', self.taxonomy),
+            'teacher_skill': _skill(row, 'teacher_skill', self.taxonomy),
+            'match_tier': row['match_tier'],
+            'match_tier_display': MATCH_TIER_DISPLAY.get(row['match_tier'], 'Match'),
+            'match_quality': match_quality(row['match_tier'], row['is_mutual']),
+            'is_mutual': row['is_mutual'],
+            'created_at': self.format_datetime(row['created_at']),
+        }
+
+
+class FastMessageSerializer(FastSerializer):
+    """MessageSerializer output"""
+    columns = ('id', 'conversation', 'content', 'created_at', 'is_read', *_user_columns('sender'))
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'conversation': row['conversation'],
+            'sender': self.user(row, 'sender'),
+            'sender_id': row['sender__id'],
+            'sender_username': row['sender__username'],
+            'content': row['content'],
+            'created_at': self.format_datetime(row['created_at']),
+            'is_read': row['is_read'],
+        }
+
+
+class FastConversationListSerializer(FastSerializer):
+    """
+    ConversationListSerializer output. Last messages and unread counts are
+    read for the whole page at once instead of two queries per conversation.
+    """
+    columns = (
+        'id', 'created_at', 'updated_at', 'last_message_id',
+        'user1_id', 'user1__username', 'user1__email',
+        'user2_id', 'user2__username', 'user2__email',
+    )
+
+    def values(self, queryset, extra=()):
+        last_message = Message.objects.filter(
+            conversation=OuterRef('pk')
+        ).order_by('-created_at').values('id')[:1]
+        return super().values(queryset.annotate(last_message_id=Subquery(last_message)), extra)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        request = self.context.get('request')
+        self.request_user = request.user if request else None
+        self.last_messages = {
+            message['id']: message
+            for message in Message.objects.filter(
+                id__in=[row['last_message_id'] for row in rows if row['last_message_id']]
+            ).values('id', 'content', 'sender_id', 'created_at', 'is_read')
+        }
+        self.unread = defaultdict(int)
+        if self.request_user:
+            self.unread.update(
+                Message.objects.filter(
+                    conversation_id__in=[row['id'] for row in rows], is_read=False
+                ).exclude(
+                    sender=self.request_user
+                ).values_list('conversation_id').annotate(count=Count('id')).order_by()
+            )
+        return super().serialize(rows)
+
+    def to_representation(self, row):
+        other_user = None
+        if self.request_user:
+            other = 'user2' if self.request_user.pk == row['user1_id'] else 'user1'
+            other_user = {
+                'id': row[f'{other}_id'],
+                'username': row[f'{other}__username'],
+                'email': row[f'{other}__email'],
+            }
+        preview = None
+        message = self.last_messages.get(row['last_message_id'])
+        if message:
+            preview = {
+                'id': message['id'],
+                'preview': message_preview(message['content']),
+                'sender_id': message['sender_id'],
+                'created_at': message['created_at'],
+                'is_read': message['is_read'],
+            }
+        return {
+            'id': row['id'],
+            'other_user': other_user,
+            'last_message_preview': preview,
+            'unread_count': self.unread[row['id']],
+            'created_at': self.format_datetime(row['created_at']),
+            'updated_at': self.format_datetime(row['updated_at']),
+        }
+
+
+class FastListMixin:
+    """Serves plain list requests (paged or streamed) through fast_serializer_class"""
+    fast_serializer_class = None
+
+    def get_fast_serializer(self):
+        if self.fast_serializer_class is None or not settings.API_FAST_SERIALIZERS:
+            return None
+        if self.action != 'list':
+            return None
+        context = self.get_serializer_context()
+        # Sparse and normalized output need the DRF serializer
+        if context_fieldset(context) is not None:
+            return None
+        return self.fast_serializer_class(context)
+
+    def _fast_rows(self, fast, queryset):
+        # Cursor pagination reads its position back off the rows
+        ordering = [name.lstrip('-') for name in getattr(self, 'cursor_ordering', ())]
+        return fast.values(queryset, ordering)
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        if fast is None or request.query_params.get('stream') in STREAM_CONTENT_TYPES:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self._fast_rows(fast, self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(fast.serialize(queryset))
+        return self.get_paginated_response(fast.serialize(page))
+
+    def _stream_rows(self, queryset):
+        fast = self.get_fast_serializer()
+        if fast is None:
+            yield from super()._stream_rows(queryset)
+            return
+        rows = self._fast_rows(fast, queryset).iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                return
+            for row in fast.serialize(chunk):
+                yield dumps(row)
@@ -0,0 +1,174 @@
+# backend/skills/fieldsets.py
+"""
+Sparse fieldsets.
+
+GET requests can trim a response with ?fields=id,skill,learner.username and
+choose which nested objects are embedded with ?expand=learner,skill. Without
+?expand every nested object is embedded as before; with it, nested objects
+that are not listed (and not named in a dotted field) render as their id.
+Fields are pruned from the serializer before any row is read, and the view
+mixin narrows select_related()/only() to the columns the pruned serializer
+still renders. Unknown names are ignored.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+NARROWED_ACTIONS = ('list', 'retrieve')
+
+
+def parse_fields(value):
+    """'id,learner.username' -> {'id': {}, 'learner': {'username': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def requested_fieldset(request):
+    """(fields tree or None, expand set or None), or None if the request asks for neither"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if 'fields' not in params and 'expand' not in params:
+        return None
+    fields = parse_fields(params['fields']) if 'fields' in params else None
+    expand = set(parse_fields(params['expand'])) if 'expand' in params else None
+    return fields or None, expand
+
+
+def _collapse(field):
+    """Replace an embedded serializer with the related object's id"""
+    return serializers.PrimaryKeyRelatedField(
+        source=field.source,
+        read_only=True,
+        many=isinstance(field, serializers.ListSerializer),
+    )
+
+
+def apply_fieldset(fields, tree, expand):
+    if tree:
+        fields = {name: field for name, field in fields.items() if name in tree}
+    for name, field in list(fields.items()):
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(nested, serializers.BaseSerializer):
+            continue
+        subtree = tree.get(name) if tree else None
+        if expand is not None and name not in expand and not subtree:
+            fields[name] = _collapse(field)
+        elif subtree:
+            nested._fieldset = (subtree, None)
+    return fields
+
+
+def context_fieldset(context):
+    """
+    The fieldset for a serializer context; views set collapse_relations to
+    render every nested object as its id
+    """
+    fieldset = requested_fieldset(context.get('request'))
+    if context.get('collapse_relations'):
+        return (fieldset[0] if fieldset else None), set()
+    return fieldset
+
+
+class SparseFieldsetMixin:
+    """Serializer side of ?fields= and ?expand=; only the outermost serializer reads the request"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = getattr(self, '_fieldset', None)
+        if fieldset is None and self._is_outermost():
+            fieldset = context_fieldset(self.context)
+        if fieldset is None:
+            return fields
+        return apply_fieldset(fields, *fieldset)
+
+    def _is_outermost(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+def _model_path(model, attrs):
+    """(joined relations, only() path) for a dotted serializer source, or None if it is not a column"""
+    relations = []
+    for depth, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        if depth < len(attrs) - 1:
+            if not field.is_relation:
+                return None
+            relations.append('__'.join(attrs[:depth + 1]))
+            model = field.related_model
+    return relations, '__'.join(attrs)
+
+
+def _collect(serializer, model, prefix, only, related):
+    """Fill only/related for one serializer level; False if a field's columns are unknown"""
+    sources = getattr(serializer, 'fieldset_sources', {})
+    only.append(prefix + model._meta.pk.name)
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.ListSerializer):
+            return False
+        if isinstance(field, serializers.BaseSerializer):
+            relation = prefix + field.source
+            related.append(relation)
+            only.append(relation)
+            nested_only = []
+            # A nested level that can't be narrowed is loaded whole
+            if _collect(field, model._meta.get_field(field.source).related_model,
+                        relation + '__', nested_only, related):
+                only.extend(nested_only)
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in sources:
+                return False
+            paths = [path.split('.') for path in sources[name]]
+        elif field.source == '*':
+            return False
+        else:
+            paths = [field.source_attrs]
+        for attrs in paths:
+            resolved = _model_path(model, attrs)
+            if resolved is None:
+                return False
+            relations, path = resolved
+            related.extend(prefix + relation for relation in relations)
+            only.append(prefix + path)
+    return True
+
+
+class SparseFieldsetViewMixin:
+    """Narrows list/retrieve querysets to what a ?fields=/?expand= response renders"""
+
+    def filter_queryset(self, queryset):
+        # filter_queryset rather than get_queryset, which every view overrides
+        queryset = super().filter_queryset(queryset)
+        if self.action not in NARROWED_ACTIONS:
+            return queryset
+        context = self.get_serializer_context()
+        if context_fieldset(context) is None:
+            return queryset
+
+        serializer = self.get_serializer(context=context)
+        only = []
+        related = []
+        if not _collect(serializer, queryset.model, '', only, related):
+            return queryset
+        # Cursor pagination reads its ordering columns back off the last row
+        for ordering in getattr(self, 'cursor_ordering', ()):
+            name = ordering.lstrip('-')
+            if _model_path(queryset.model, [name]) is not None:
+                only.append(name)
+        return queryset.select_related(None).select_related(
+            *dict.fromkeys(related)
+        ).only(*dict.fromkeys(only))
@@ -0,0 +1,68 @@
+# backend/skills/management/commands/benchmark_json.py
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from skills import renderers
+from skills.models import Match
+from skills.serializers import MatchSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the stock and orjson renderers/parsers on real MatchSerializer output'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Matches to serialize')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson is not installed; nothing to compare')
+
+        matches = Match.objects.select_related(
+            'learner', 'teacher', 'skill', 'teacher_skill'
+        ).order_by('-created_at')[:options['limit']]
+        data = MatchSerializer(matches, many=True).data
+        if not data:
+            raise CommandError('No matches in the database to benchmark with')
+
+        stock_body = JSONRenderer().render(data)
+        fast_body = renderers.FastJSONRenderer().render(data)
+        if json.loads(stock_body) != json.loads(fast_body):
+            raise CommandError('Renderers disagree on the payload')
+
+        iterations = options['iterations']
+        self.stdout.write(
+            f'{len(data)} matches, {len(stock_body) / 1024:.1f} KiB, {iterations} iterations'
+        )
+        self._compare(
+            'render',
+            lambda: JSONRenderer().render(data),
+            lambda: renderers.FastJSONRenderer().render(data),
+            iterations,
+        )
+        self._compare(
+            'parse',
+            lambda: JSONParser().parse(io.BytesIO(stock_body)),
+            lambda: renderers.FastJSONParser().parse(io.BytesIO(stock_body)),
+            iterations,
+        )
+
+    def _compare(self, label, stock, fast, iterations):
+        stock_ms = self._time(stock, iterations)
+        fast_ms = self._time(fast, iterations)
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: stock {stock_ms:.3f} ms, orjson {fast_ms:.3f} ms '
+            f'({stock_ms / fast_ms:.1f}x)'
+        ))
+
+    def _time(self, fn, iterations):
+        fn()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - started) * 1000 / iterations
@@ -0,0 +1,86 @@
+# backend/skills/management/commands/benchmark_serializers.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from skills.fast_serializers import (
+    FastConversationListSerializer, FastMatchSerializer, FastMessageSerializer
+)
+from skills.models import Conversation, Match, Message
+from skills.renderers import dumps
+from skills.serializers import ConversationListSerializer, MatchSerializer, MessageSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the DRF and plain-dict list serializers per 1k rows on real data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Rows to serialize per model')
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        conversation = Conversation.objects.order_by('-updated_at').first()
+        if not Match.objects.exists() and conversation is None:
+            raise CommandError('No matches or conversations in the database to benchmark with')
+
+        cases = [
+            (
+                'matches', MatchSerializer, FastMatchSerializer,
+                Match.objects.select_related('learner', 'teacher', 'skill', 'teacher_skill')
+                .order_by('-created_at', '-id')[:limit],
+                {},
+            ),
+            (
+                'messages', MessageSerializer, FastMessageSerializer,
+                Message.objects.select_related('sender').order_by('created_at', 'id')[:limit],
+                {},
+            ),
+        ]
+        if conversation is not None:
+            # Conversation lists are per user; use the most recently active one
+            user = conversation.user1
+            request = Request(APIRequestFactory().get('/api/conversations/'))
+            request.user = user
+            cases.append((
+                'conversations', ConversationListSerializer, FastConversationListSerializer,
+                Conversation.objects.filter(Q(user1=user) | Q(user2=user))
+                .select_related('user1', 'user2').order_by('-updated_at', '-id')[:limit],
+                {'request': request},
+            ))
+
+        for label, serializer_class, fast_class, queryset, context in cases:
+            self._compare(label, serializer_class, fast_class, queryset, context, options['iterations'])
+
+    def _compare(self, label, serializer_class, fast_class, queryset, context, iterations):
+        def stock():
+            return serializer_class(list(queryset), many=True, context=context).data
+
+        def fast():
+            serializer = fast_class(context)
+            return serializer.serialize(serializer.values(queryset))
+
+        data = stock()
+        if not data:
+            self.stdout.write(f'{label}: no rows, skipped')
+            return
+        if dumps(data) != dumps(fast()):
+            raise CommandError(f'{label}: fast serializer output differs from {serializer_class.__name__}')
+
+        per_1k = 1000 / len(data)
+        stock_ms = self._time(stock, iterations) * per_1k
+        fast_ms = self._time(fast, iterations) * per_1k
+        self.stdout.write(self.style.SUCCESS(
+            f'{label} ({len(data)} rows): DRF {stock_ms:.1f} ms/1k rows, '
+            f'fast {fast_ms:.1f} ms/1k rows ({stock_ms / fast_ms:.1f}x)'
+        ))
+
+    def _time(self, fn, iterations):
+        fn()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - started) * 1000 / iterations
@@ -0,0 +1,70 @@
+# backend/skills/management/commands/expire_calls.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from skills.calls import PERSISTED_FIELDS, write_transitions
+from skills.models import VideoCall
+
+
+class Command(BaseCommand):
+    help = 'Close video calls left pending or open by workers that went away'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ring-timeout',
+            type=int,
+            default=getattr(settings, 'VIDEO_CALL_RING_TIMEOUT', 45) * 2,
+            help='Mark pending calls older than this many seconds as missed',
+        )
+        parser.add_argument(
+            '--max-duration',
+            type=int,
+            default=6 * 60 * 60,
+            help='End accepted calls that started more than this many seconds ago',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many calls would be closed',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+
+        unanswered = VideoCall.objects.filter(
+            status='pending',
+            created_at__lt=now - timedelta(seconds=options['ring_timeout']),
+        )
+        # The real end time of an abandoned call is unknown, so duration stays empty
+        abandoned = VideoCall.objects.filter(
+            status='accepted',
+            ended_at__isnull=True,
+            started_at__lt=now - timedelta(seconds=options['max_duration']),
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would mark {unanswered.count()} calls missed and end {abandoned.count()} abandoned calls'
+            )
+            return
+
+        # Conditional writes: calls a live worker settles in the meantime are
+        # skipped, and only the calls closed here are added to CallStats
+        missed = list(unanswered.only('pk', 'caller', 'receiver', *PERSISTED_FIELDS))
+        for call in missed:
+            call.status = 'missed'
+        missed_count = len(write_transitions(missed))
+        ended = list(abandoned.only('pk', 'caller', 'receiver', *PERSISTED_FIELDS))
+        for call in ended:
+            call.status = 'ended'
+            call.ended_at = now
+        ended_count = len(write_transitions(ended))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Marked {missed_count} calls missed and ended {ended_count} abandoned calls'
+            )
+        )
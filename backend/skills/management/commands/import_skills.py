@@ -0,0 +1,56 @@
+# backend/skills/management/commands/import_skills.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from skills.catalog_import import CatalogImportError, DEFAULT_CATALOG_PATH, import_skill_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Import the skill catalog from a JSON array of {name, category, subcategory}. '
+        'Inserts and updates are applied in bulk; unchanged files are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(DEFAULT_CATALOG_PATH),
+            help='Catalog file (default: skills/skills.json)',
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete skills missing from the file (and the user skills using them)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Import even if the file matches the last imported version',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            result = import_skill_catalog(
+                options['path'],
+                delete=options['delete'],
+                force=options['force'],
+                dry_run=options['dry_run'],
+            )
+        except CatalogImportError as e:
+            raise CommandError(str(e))
+
+        if result.skipped:
+            self.stdout.write(f'Skipped: {result} (use --force to re-import)')
+            return
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(
+            self.style.SUCCESS(f'{prefix}{result} in {time.monotonic() - started:.2f}s')
+        )
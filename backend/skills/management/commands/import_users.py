@@ -0,0 +1,253 @@
+# backend/skills/management/commands/import_users.py
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from skills.models import Skill, SkillStats, UserSkill
+
+User = get_user_model()
+
+MIN_PASSWORD_LENGTH = 6
+# Checked with the model field validators RegisterSerializer uses (username
+# characters, email format, max lengths), so one bad row can't abort a chunk
+VALIDATED_FIELDS = ('username', 'email', 'bio', 'location')
+
+
+def _init_worker(settings_module):
+    # Needed when worker processes are spawned rather than forked
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def _validation_error(values):
+    for name in VALIDATED_FIELDS:
+        try:
+            User._meta.get_field(name).run_validators(values[name])
+        except ValidationError as e:
+            return f'{name}: {" ".join(e.messages)}'
+    return None
+
+
+def _skill_names(value):
+    """Teach/learn skills come as a list (NDJSON) or a ';'-separated string (CSV)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [name.strip() for name in value if name and name.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import users with their teach/learn skills from a CSV or NDJSON file. '
+        'Columns/keys: username, email, password, bio, location, teach, learn. '
+        'Matches are not generated for imported skills.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'ndjson'],
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes used for password hashing',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and hash but do not write anything',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'ndjson')
+
+        self.dry_run = options['dry_run']
+        self.workers = max(1, options['workers'])
+        self.skill_ids = dict(Skill.objects.values_list('name', 'id'))
+        self.unknown_skills = set()
+        totals = {'created': 0, 'skipped': 0, 'skills': 0}
+        started = time.monotonic()
+
+        with open(path, newline='', encoding='utf-8') as f, ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'skillswap.settings'),),
+        ) as executor:
+            rows = self._read_rows(f, fmt)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                created, skipped, skills = self._import_chunk(chunk, executor)
+                totals['created'] += created
+                totals['skipped'] += skipped
+                totals['skills'] += skills
+
+                elapsed = time.monotonic() - started
+                processed = totals['created'] + totals['skipped']
+                self.stdout.write(
+                    f'{processed} rows processed: {totals["created"]} created, '
+                    f'{totals["skipped"]} skipped ({processed / elapsed:.0f} rows/s)'
+                )
+
+        if self.unknown_skills:
+            self.stdout.write(self.style.WARNING(
+                f'Ignored unknown skills: {", ".join(sorted(self.unknown_skills))}'
+            ))
+        elapsed = time.monotonic() - started
+        verb = 'Would import' if self.dry_run else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {totals["created"]} users and {totals["skills"]} user skills '
+                f'in {elapsed:.1f}s ({totals["skipped"]} rows skipped)'
+            )
+        )
+
+    def _read_rows(self, f, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                self.stderr.write(f'Line {line_number}: invalid JSON ({e})')
+
+    def _import_chunk(self, chunk, executor):
+        """Validate, hash and insert one chunk; returns (created, skipped, user skills)"""
+        valid = []
+        seen_usernames = set()
+        seen_emails = set()
+        skipped = 0
+        for row in chunk:
+            username = (row.get('username') or '').strip()
+            email = (row.get('email') or '').strip()
+            password = row.get('password') or None
+            error = None
+            if not username or not email:
+                error = 'username and email are required'
+            elif password is not None and len(password) < MIN_PASSWORD_LENGTH:
+                error = f'password shorter than {MIN_PASSWORD_LENGTH} characters'
+            elif username in seen_usernames or email in seen_emails:
+                error = 'duplicate in file'
+            else:
+                error = _validation_error({
+                    'username': username,
+                    'email': email,
+                    'bio': row.get('bio') or '',
+                    'location': row.get('location') or '',
+                })
+            if error:
+                self.stderr.write(f'Skipping {username or "<missing username>"}: {error}')
+                skipped += 1
+                continue
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            valid.append((username, email, password, row))
+
+        # One query for uniqueness against existing users
+        taken = User.objects.filter(
+            Q(username__in=seen_usernames) | Q(email__in=seen_emails)
+        ).values_list('username', 'email')
+        taken_usernames = {username for username, _ in taken}
+        taken_emails = {email for _, email in taken}
+        rows = []
+        for username, email, password, row in valid:
+            if username in taken_usernames or email in taken_emails:
+                self.stderr.write(f'Skipping {username}: username or email already exists')
+                skipped += 1
+                continue
+            rows.append((username, email, password, row))
+
+        if not rows:
+            return 0, skipped, 0
+
+        # A missing password makes an unusable one, as with set_unusable_password()
+        hashes = executor.map(
+            make_password,
+            [password for _, _, password, _ in rows],
+            chunksize=max(1, len(rows) // (self.workers * 4)),
+        )
+        users = [
+            User(
+                username=username,
+                email=email,
+                password=password_hash,
+                bio=row.get('bio') or '',
+                location=row.get('location') or '',
+            )
+            for (username, email, _, row), password_hash in zip(rows, hashes)
+        ]
+
+        if self.dry_run:
+            return len(users), skipped, sum(
+                len(self._skill_rows(None, row)) for _, _, _, row in rows
+            )
+
+        with transaction.atomic():
+            # Users registered since the uniqueness check are skipped, not fatal
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            # Ids of the rows actually inserted: the salted hash tells ours apart
+            hashes = {user.username: user.password for user in users}
+            inserted = {
+                username: pk
+                for username, pk, password in User.objects.filter(
+                    username__in=hashes
+                ).values_list('username', 'id', 'password')
+                if hashes[username] == password
+            }
+            for username in hashes.keys() - inserted.keys():
+                self.stderr.write(f'Skipping {username}: username already exists')
+            skipped += len(hashes) - len(inserted)
+
+            user_skills = []
+            for user, (_, _, _, row) in zip(users, rows):
+                if user.username in inserted:
+                    user.pk = inserted[user.username]
+                    user_skills.extend(self._skill_rows(user, row))
+            UserSkill.objects.bulk_create(user_skills, ignore_conflicts=True)
+            # bulk_create skips the signals that maintain SkillStats; count
+            # what is in the table for the new users, not what was sent
+            deltas = {}
+            added = UserSkill.objects.filter(user_id__in=inserted.values()).values_list('skill_id', 'type')
+            for skill_id, skill_type in added:
+                delta = deltas.setdefault(skill_id, [0, 0])
+                delta[0 if skill_type == 'teach' else 1] += 1
+            SkillStats.apply(deltas)
+
+        return len(inserted), skipped, len(added)
+
+    def _skill_rows(self, user, row):
+        user_skills = []
+        for skill_type in ('teach', 'learn'):
+            for name in dict.fromkeys(_skill_names(row.get(skill_type))):
+                skill_id = self.skill_ids.get(name)
+                if skill_id is None:
+                    self.unknown_skills.add(name)
+                    continue
+                user_skills.append(UserSkill(user=user, skill_id=skill_id, type=skill_type))
+        return user_skills
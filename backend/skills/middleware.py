@@ -7,18 +7,32 @@ from channels.db import database_sync_to_async
 from urllib.parse import parse_qs
 import logging
 
+from .caching import cache_token_user_id, get_cached_token_user_id, resolve_user
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-@database_sync_to_async
-def get_user_from_token(token):
-    """Get user from JWT token"""
+def decode_token(token):
+    """Decode a JWT to its user id, reusing recent decodes of the same token"""
+    user_id = get_cached_token_user_id(token)
+    if user_id is not None:
+        return user_id
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+    user_id = payload.get('user_id')
+    if user_id:
+        cache_token_user_id(token, user_id, payload.get('exp'))
+    return user_id
+
+
+async def get_user_from_token(token):
+    """Get user from JWT token; cache hits never touch the database"""
+    user_id = None
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        user_id = payload.get('user_id')
+        user_id = decode_token(token)
         
         if user_id:
-            user = User.objects.get(id=user_id)
+            # Even a cache hit checks the shared version, so resolve off the event loop
+            user = await database_sync_to_async(resolve_user)(user_id)
             logger.info(f"✅ WebSocket authenticated user: {user.username}")
             return user
         else:
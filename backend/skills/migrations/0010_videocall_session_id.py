@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0009_alter_match_options_alter_useractivity_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videocall',
+            name='session_id',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0010_videocall_session_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videocall',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('ended', 'Ended'), ('missed', 'Missed')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='videocall',
+            index=models.Index(fields=['status', 'created_at'], name='skills_vide_status_48f1b6_idx'),
+        ),
+    ]
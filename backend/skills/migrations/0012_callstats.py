@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_call_stats(apps, schema_editor):
+    # Same rules as CallStats.record_calls, over the calls that already finished
+    VideoCall = apps.get_model('skills', 'VideoCall')
+    CallStats = apps.get_model('skills', 'CallStats')
+
+    totals = {}
+    for caller_id, receiver_id, started_at, duration in VideoCall.objects.filter(
+        status__in=['declined', 'ended', 'missed']
+    ).values_list('caller_id', 'receiver_id', 'started_at', 'duration').iterator():
+        accepted = started_at is not None and duration is not None
+        seconds = duration or 0
+        for user_id, partner_id in ((caller_id, receiver_id), (receiver_id, caller_id)):
+            stats = totals.setdefault(user_id, CallStats(user_id=user_id, partner_seconds={}))
+            stats.total_calls += 1
+            stats.accepted_calls += int(accepted)
+            stats.total_duration += seconds
+            if seconds:
+                partner_key = str(partner_id)
+                stats.partner_seconds[partner_key] = stats.partner_seconds.get(partner_key, 0) + seconds
+
+    CallStats.objects.bulk_create(totals.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0011_videocall_missed_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CallStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_calls', models.PositiveIntegerField(default=0)),
+                ('accepted_calls', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.PositiveIntegerField(default=0)),
+                ('partner_seconds', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='call_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Call Stats',
+            },
+        ),
+        migrations.RunPython(backfill_call_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0013_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillCatalogImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('deleted', models.PositiveIntegerField(default=0)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-imported_at'],
+            },
+        ),
+    ]
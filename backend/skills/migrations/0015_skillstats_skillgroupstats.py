@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_skill_stats(apps, schema_editor):
+    UserSkill = apps.get_model('skills', 'UserSkill')
+    SkillStats = apps.get_model('skills', 'SkillStats')
+    SkillGroupStats = apps.get_model('skills', 'SkillGroupStats')
+
+    counts = {}
+    groups = {}
+    for skill_id, skill_type, category, subcategory in UserSkill.objects.values_list(
+        'skill_id', 'type', 'skill__category', 'skill__subcategory'
+    ).iterator():
+        index = 0 if skill_type == 'teach' else 1
+        counts.setdefault(skill_id, [0, 0])[index] += 1
+        for key in (('subcategory', subcategory), ('category', category)):
+            if key[1]:
+                groups.setdefault(key, [0, 0])[index] += 1
+
+    SkillStats.objects.bulk_create([
+        SkillStats(skill_id=skill_id, teach_count=teach, learn_count=learn,
+                   demand_ratio=learn / (teach + 1))
+        for skill_id, (teach, learn) in counts.items()
+    ], batch_size=500)
+    SkillGroupStats.objects.bulk_create([
+        SkillGroupStats(level=level, name=name, teach_count=teach, learn_count=learn,
+                        demand_ratio=learn / (teach + 1))
+        for (level, name), (teach, learn) in groups.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0014_skillcatalogimport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillStats',
+            fields=[
+                ('skill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='skills.skill')),
+                ('teach_count', models.PositiveIntegerField(default=0)),
+                ('learn_count', models.PositiveIntegerField(default=0)),
+                ('demand_ratio', models.FloatField(db_index=True, default=0.0)),
+            ],
+            options={
+                'verbose_name_plural': 'Skill Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillGroupStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('subcategory', 'Subcategory'), ('category', 'Category')], max_length=11)),
+                ('name', models.CharField(max_length=255)),
+                ('teach_count', models.PositiveIntegerField(default=0)),
+                ('learn_count', models.PositiveIntegerField(default=0)),
+                ('demand_ratio', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name_plural': 'Skill Group Stats',
+                'indexes': [models.Index(fields=['level', 'demand_ratio'], name='skills_skil_level_19db56_idx')],
+                'unique_together': {('level', 'name')},
+            },
+        ),
+        migrations.RunPython(backfill_skill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    """Create Category/Subcategory rows from the old strings and point skills at them"""
+    Skill = apps.get_model('skills', 'Skill')
+    Category = apps.get_model('skills', 'Category')
+    Subcategory = apps.get_model('skills', 'Subcategory')
+
+    categories = {}
+    subcategories = {}
+    skills = list(Skill.objects.all())
+    for skill in skills:
+        category_name = (skill.category or '').strip()
+        subcategory_name = (skill.subcategory or '').strip()
+        category = None
+        if category_name:
+            category = categories.get(category_name)
+            if category is None:
+                category = categories[category_name] = Category.objects.create(name=category_name)
+        skill.category_ref = category
+        skill.subcategory_ref = None
+        if subcategory_name:
+            key = (category.pk if category else None, subcategory_name)
+            subcategory = subcategories.get(key)
+            if subcategory is None:
+                subcategory = subcategories[key] = Subcategory.objects.create(
+                    category=category, name=subcategory_name
+                )
+            skill.subcategory_ref = subcategory
+    Skill.objects.bulk_update(skills, ['category_ref', 'subcategory_ref'], batch_size=500)
+
+
+def backwards(apps, schema_editor):
+    Skill = apps.get_model('skills', 'Skill')
+    skills = list(Skill.objects.select_related('category_ref', 'subcategory_ref'))
+    for skill in skills:
+        skill.category = skill.category_ref.name if skill.category_ref else None
+        skill.subcategory = skill.subcategory_ref.name if skill.subcategory_ref else None
+    Skill.objects.bulk_update(skills, ['category', 'subcategory'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0015_skillstats_skillgroupstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Subcategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subcategories', to='skills.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Subcategories',
+                'ordering': ['name'],
+                'unique_together': {('category', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='skills.category'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='subcategory_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='skills.subcategory'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Replace the old category/subcategory strings with the FKs backfilled in
+    0016_category_subcategory. Kept apart from that data migration so the
+    backfill commits first: PostgreSQL refuses to ALTER a table with
+    pending trigger events in the same transaction.
+    """
+
+    dependencies = [
+        ('skills', '0016_category_subcategory'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='skill',
+            name='category',
+        ),
+        migrations.RemoveField(
+            model_name='skill',
+            name='subcategory',
+        ),
+        migrations.RenameField(
+            model_name='skill',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.RenameField(
+            model_name='skill',
+            old_name='subcategory_ref',
+            new_name='subcategory',
+        ),
+        migrations.AlterField(
+            model_name='skill',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='skills', to='skills.category'),
+        ),
+        migrations.AlterField(
+            model_name='skill',
+            name='subcategory',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='skills', to='skills.subcategory'),
+        ),
+    ]
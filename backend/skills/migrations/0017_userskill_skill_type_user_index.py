@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0016_swap_skill_category_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userskill',
+            index=models.Index(fields=['skill', 'type', 'user'], name='skills_user_skill_i_076568_idx'),
+        ),
+    ]
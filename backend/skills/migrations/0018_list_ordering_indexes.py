@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0017_userskill_skill_type_user_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['updated_at'], name='skills_conv_updated_1a9dde_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['user', 'created_at'], name='skills_feed_user_id_179f3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at'], name='skills_mess_convers_c09171_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['is_online', 'last_seen'], name='skills_user_is_onli_080cc8_idx'),
+        ),
+    ]
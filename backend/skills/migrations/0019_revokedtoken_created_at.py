@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0018_list_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedtoken',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def rebuild_group_stats(apps, schema_editor):
+    # The old rows were keyed by name; re-derive them from SkillStats
+    SkillStats = apps.get_model('skills', 'SkillStats')
+    SkillGroupStats = apps.get_model('skills', 'SkillGroupStats')
+    SkillGroupStats.objects.all().delete()
+    rows = []
+    for level in ('subcategory', 'category'):
+        field = f'skill__{level}'
+        totals = SkillStats.objects.exclude(**{f'{field}__isnull': True}).values(
+            field
+        ).annotate(teach=Sum('teach_count'), learn=Sum('learn_count'))
+        rows.extend(
+            SkillGroupStats(
+                level=level,
+                **{f'{level}_id': row[field]},
+                teach_count=row['teach'],
+                learn_count=row['learn'],
+                demand_ratio=row['learn'] / (row['teach'] + 1),
+            )
+            for row in totals
+        )
+    SkillGroupStats.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0019_revokedtoken_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='skillgroupstats',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='skillgroupstats',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.category'),
+        ),
+        migrations.AddField(
+            model_name='skillgroupstats',
+            name='subcategory',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.subcategory'),
+        ),
+        migrations.AddConstraint(
+            model_name='skillgroupstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('level', 'category')), fields=('category',), name='unique_category_group_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='skillgroupstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('level', 'subcategory')), fields=('subcategory',), name='unique_subcategory_group_stats'),
+        ),
+        migrations.RemoveField(
+            model_name='skillgroupstats',
+            name='name',
+        ),
+        migrations.RunPython(rebuild_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:44
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def backfill_rank(apps, schema_editor):
+    Match = apps.get_model('skills', 'Match')
+    tiers = {'exact': 1, 'subcategory': 2, 'category': 3}
+    Match.objects.update(
+        rank=Case(
+            *[When(match_tier=tier, then=Value(rank)) for tier, rank in tiers.items()],
+            default=Value(99),
+        ) + Case(When(is_mutual=True, then=Value(0)), default=Value(100))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0020_skillgroupstats_group_fks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['learner', 'rank', '-id'], name='match_learner_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['teacher', 'rank', '-id'], name='match_teacher_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocall',
+            index=models.Index(fields=['caller', '-created_at', '-id'], name='videocall_caller_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videocall',
+            index=models.Index(fields=['receiver', '-created_at', '-id'], name='videocall_receiver_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:10
+
+from django.db import migrations
+
+
+def create_missing_stats_rows(apps, schema_editor):
+    """SkillStats.apply only updates rows, so every skill and group needs one"""
+    Skill = apps.get_model('skills', 'Skill')
+    SkillStats = apps.get_model('skills', 'SkillStats')
+    SkillGroupStats = apps.get_model('skills', 'SkillGroupStats')
+
+    SkillStats.objects.bulk_create(
+        [SkillStats(skill_id=skill_id) for skill_id in Skill.objects.filter(stats__isnull=True).values_list('id', flat=True)],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    for level in ('subcategory', 'category'):
+        model = apps.get_model('skills', level)
+        existing = SkillGroupStats.objects.filter(level=level).values_list(f'{level}_id', flat=True)
+        SkillGroupStats.objects.bulk_create(
+            [
+                SkillGroupStats(level=level, **{f'{level}_id': group_id})
+                for group_id in model.objects.exclude(id__in=existing).values_list('id', flat=True)
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0021_match_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_stats_rows, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 # backend/skills/models.py
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Greatest
 from django.utils import timezone
 
 
@@ -13,16 +15,68 @@ class CustomUser(AbstractUser):
         return self.username
 
 
+class RevokedToken(models.Model):
+    """Refresh token ids revoked on rotation, kept until the token would expire anyway"""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class Category(models.Model):
+    """Top level of the skill taxonomy"""
+    name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "Categories"
+
+    def __str__(self):
+        return self.name
+
+
+class Subcategory(models.Model):
+    """Second level of the skill taxonomy"""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='subcategories', null=True, blank=True)
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('category', 'name')
+        ordering = ['name']
+        verbose_name_plural = "Subcategories"
+
+    def __str__(self):
+        return self.name
+
+
 class Skill(models.Model):
     """Skills that can be taught or learned"""
     name = models.CharField(max_length=255, unique=True)
-    category = models.CharField(max_length=255, blank=True, null=True)
-    subcategory = models.CharField(max_length=255, blank=True, null=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, related_name='skills', null=True, blank=True)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.SET_NULL, related_name='skills', null=True, blank=True)
 
     def __str__(self):
         return self.name
 
 
+class SkillCatalogImport(models.Model):
+    """One applied run of import_skills; the latest hash lets unchanged files be skipped"""
+    source = models.CharField(max_length=500)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-imported_at']
+
+    def __str__(self):
+        return f"{self.source} ({self.content_hash[:12]})"
+
+
 class UserSkill(models.Model):
     """Links users to skills they can teach or want to learn"""
     SKILL_TYPE_CHOICES = (
@@ -37,11 +91,185 @@ class UserSkill(models.Model):
     class Meta:
         unique_together = ('user', 'skill', 'type')
         ordering = ['skill__name']
+        indexes = [
+            # Users by skill, e.g. the ?skill= directory filter
+            models.Index(fields=['skill', 'type', 'user']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.type} - {self.skill.name}"
 
 
+def _counter_update(teach, learn):
+    """Atomic increment of teach/learn counts that also refreshes demand_ratio"""
+    teach_count = Greatest(F('teach_count') + teach, 0)
+    learn_count = Greatest(F('learn_count') + learn, 0)
+    return {
+        'teach_count': teach_count,
+        'learn_count': learn_count,
+        'demand_ratio': Cast(learn_count, FloatField()) / (teach_count + 1),
+    }
+
+
+def _stat_counts(teach, learn):
+    """Field values for absolute teach/learn counts"""
+    return {'teach_count': teach, 'learn_count': learn, 'demand_ratio': learn / (teach + 1)}
+
+
+class SkillStats(models.Model):
+    """Teach/learn counts per skill, kept current as user skills are added and removed"""
+    skill = models.OneToOneField(Skill, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    teach_count = models.PositiveIntegerField(default=0)
+    learn_count = models.PositiveIntegerField(default=0)
+    # learners per teacher (+1 so skills nobody teaches still rank)
+    demand_ratio = models.FloatField(default=0.0, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Skill Stats"
+
+    def __str__(self):
+        return f"{self.skill.name} - {self.teach_count} teach / {self.learn_count} learn"
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        Add {skill_id: (teach_delta, learn_delta)} to the per-skill counters
+        and their subcategory/category rollups. Only existing rows are
+        updated: rows are created with their skill or group (see
+        create_missing), so a delta for a skill that is being deleted can
+        never re-insert its row.
+        """
+        deltas = {skill_id: delta for skill_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+        groups = {}
+        for skill_id, category_id, subcategory_id in Skill.objects.filter(
+            id__in=deltas
+        ).values_list('id', 'category_id', 'subcategory_id'):
+            teach, learn = deltas[skill_id]
+            for key in (('subcategory', subcategory_id), ('category', category_id)):
+                if key[1]:
+                    group = groups.setdefault(key, [0, 0])
+                    group[0] += teach
+                    group[1] += learn
+
+        with transaction.atomic():
+            for skill_id, (teach, learn) in deltas.items():
+                cls.objects.filter(skill_id=skill_id).update(**_counter_update(teach, learn))
+            for (level, group_id), (teach, learn) in groups.items():
+                SkillGroupStats.objects.filter(level=level, **{f'{level}_id': group_id}).update(
+                    **_counter_update(teach, learn)
+                )
+
+    @classmethod
+    def create_missing(cls):
+        """Zero rows for skills and groups that have none yet, e.g. after bulk inserts"""
+        missing = Skill.objects.filter(stats__isnull=True).values_list('id', flat=True)
+        cls.objects.bulk_create(
+            [cls(skill_id=skill_id) for skill_id in missing], batch_size=500, ignore_conflicts=True
+        )
+        SkillGroupStats.create_missing()
+
+    @classmethod
+    def rebuild(cls):
+        """Recount everything from UserSkill; for backfills and bulk imports"""
+        counts = Skill.objects.values('id').annotate(
+            teach=Count('user_skills', filter=Q(user_skills__type='teach')),
+            learn=Count('user_skills', filter=Q(user_skills__type='learn')),
+        )
+        rows = [cls(skill_id=row['id'], **_stat_counts(row['teach'], row['learn'])) for row in counts]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=500)
+            SkillGroupStats.rebuild()
+
+
+class SkillGroupStats(models.Model):
+    """SkillStats rolled up to a subcategory or category"""
+    LEVEL_CHOICES = (
+        ('subcategory', 'Subcategory'),
+        ('category', 'Category'),
+    )
+
+    level = models.CharField(max_length=11, choices=LEVEL_CHOICES)
+    # The group this row counts; only the field named by level is set
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    teach_count = models.PositiveIntegerField(default=0)
+    learn_count = models.PositiveIntegerField(default=0)
+    demand_ratio = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category'], condition=Q(level='category'), name='unique_category_group_stats'
+            ),
+            models.UniqueConstraint(
+                fields=['subcategory'], condition=Q(level='subcategory'), name='unique_subcategory_group_stats'
+            ),
+        ]
+        indexes = [models.Index(fields=['level', 'demand_ratio'])]
+        verbose_name_plural = "Skill Group Stats"
+
+    def __str__(self):
+        return f"{self.level} {self.group} - {self.teach_count} teach / {self.learn_count} learn"
+
+    @property
+    def group(self):
+        return self.category if self.level == 'category' else self.subcategory
+
+    LEVEL_MODELS = (('subcategory', Subcategory), ('category', Category))
+
+    @classmethod
+    def _totals(cls, level, **filters):
+        """{group id: (teach, learn)} summed from SkillStats"""
+        field = f'skill__{level}'
+        totals = SkillStats.objects.filter(**filters).exclude(**{f'{field}__isnull': True}).values(
+            field
+        ).annotate(teach=Sum('teach_count'), learn=Sum('learn_count'))
+        return {row[field]: (row['teach'], row['learn']) for row in totals}
+
+    @classmethod
+    def create_missing(cls):
+        for level, model in cls.LEVEL_MODELS:
+            existing = cls.objects.filter(level=level).values_list(f'{level}_id', flat=True)
+            cls.objects.bulk_create(
+                [
+                    cls(level=level, **{f'{level}_id': group_id})
+                    for group_id in model.objects.exclude(id__in=existing).values_list('id', flat=True)
+                ],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def rebuild(cls):
+        """Re-derive the rollups from SkillStats, e.g. after skills change category"""
+        rows = []
+        for level, model in cls.LEVEL_MODELS:
+            totals = cls._totals(level)
+            rows.extend(
+                cls(level=level, **{f'{level}_id': group_id}, **_stat_counts(*totals.get(group_id, (0, 0))))
+                for group_id in model.objects.values_list('id', flat=True)
+            )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=500)
+
+    @classmethod
+    def recount(cls, level, group_ids):
+        """Re-derive the rollups of a few groups, e.g. after one skill moves between them"""
+        group_ids = [group_id for group_id in group_ids if group_id]
+        totals = cls._totals(level, **{f'skill__{level}__in': group_ids})
+        with transaction.atomic():
+            for group_id in group_ids:
+                cls.objects.update_or_create(
+                    level=level,
+                    **{f'{level}_id': group_id},
+                    defaults=_stat_counts(*totals.get(group_id, (0, 0))),
+                )
+
+
 class Match(models.Model):
     """Represents a potential learning match between two users"""
     TIER_CHOICES = [
@@ -49,6 +277,7 @@ class Match(models.Model):
         ('subcategory', 'Subcategory Match'),
         ('category', 'Category Match'),
     ]
+    TIER_RANKS = {'exact': 1, 'subcategory': 2, 'category': 3}
     
     learner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='matches_as_learner')
     teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='matches_as_teacher')
@@ -56,15 +285,26 @@ class Match(models.Model):
     teacher_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='teacher_matches', null=True, blank=True)
     match_tier = models.CharField(max_length=12, choices=TIER_CHOICES, default='exact')
     is_mutual = models.BooleanField(default=False)
+    # Match quality, lower is better: mutual first, then by tier. Kept on the
+    # row so match lists can page through an index on (user, rank, id)
+    rank = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         indexes = [
             models.Index(fields=['learner', 'teacher', 'match_tier']),
             models.Index(fields=['match_tier', 'is_mutual']),
+            models.Index(fields=['learner', 'rank', '-id'], name='match_learner_rank_idx'),
+            models.Index(fields=['teacher', 'rank', '-id'], name='match_teacher_rank_idx'),
         ]
         ordering = ['-created_at']
 
+    def save(self, *args, **kwargs):
+        self.rank = self.TIER_RANKS.get(self.match_tier, 99) + (0 if self.is_mutual else 100)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'rank'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         tier_icon = {'exact': 'EXACT', 'subcategory': 'SUBCAT', 'category': 'CAT'}.get(self.match_tier, '')
         return f"[{tier_icon}] {self.learner.username} <-> {self.teacher.username} ({self.skill.name})"
@@ -88,6 +328,7 @@ class Conversation(models.Model):
     class Meta:
         unique_together = ('user1', 'user2')
         ordering = ['-updated_at']
+        indexes = [models.Index(fields=['updated_at'])]
 
     def __str__(self):
         return f"Conversation between {self.user1.username} and {self.user2.username}"
@@ -130,6 +371,7 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['conversation', 'created_at'])]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}..."
@@ -153,6 +395,7 @@ class UserActivity(models.Model):
     class Meta:
         verbose_name_plural = "User Activities"
         ordering = ['-last_seen']
+        indexes = [models.Index(fields=['is_online', 'last_seen'])]
     
     def __str__(self):
         return f"{self.user.username} - {'Online' if self.is_online else 'Offline'}"
@@ -165,10 +408,13 @@ class VideoCall(models.Model):
         ('accepted', 'Accepted'),
         ('declined', 'Declined'),
         ('ended', 'Ended'),
+        ('missed', 'Missed'),
     ]
     
     caller = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='calls_made')
     receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='calls_received')
+    # Call id handed out by the signaling layer before the row is written
+    session_id = models.CharField(max_length=32, unique=True, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
@@ -177,11 +423,90 @@ class VideoCall(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['caller', '-created_at', '-id'], name='videocall_caller_recent_idx'),
+            models.Index(fields=['receiver', '-created_at', '-id'], name='videocall_receiver_recent_idx'),
+        ]
     
     def __str__(self):
         return f"Call from {self.caller.username} to {self.receiver.username} - {self.status}"
 
 
+class CallStats(models.Model):
+    """Running call totals per user, updated as calls finish"""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='call_stats')
+    total_calls = models.PositiveIntegerField(default=0)
+    accepted_calls = models.PositiveIntegerField(default=0)
+    total_duration = models.PositiveIntegerField(default=0)
+    # Seconds talked with each partner, keyed by partner user id
+    partner_seconds = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Call Stats"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_calls} calls"
+
+    @property
+    def accepted_ratio(self):
+        if not self.total_calls:
+            return 0.0
+        return self.accepted_calls / self.total_calls
+
+    @property
+    def average_duration(self):
+        if not self.accepted_calls:
+            return 0
+        return self.total_duration // self.accepted_calls
+
+    @classmethod
+    def record_calls(cls, calls):
+        """
+        Fold finished calls into both participants' totals.
+        Accepts VideoCall rows or anything with caller_id, receiver_id,
+        started_at and duration; one read and one write per batch.
+        Answered calls whose length is unknown (abandoned ones closed by
+        expire_calls) only count towards total_calls, so they don't drag
+        the average duration down.
+        """
+        deltas = {}
+        for call in calls:
+            accepted = call.started_at is not None and call.duration is not None
+            seconds = call.duration or 0
+            for user_id, partner_id in ((call.caller_id, call.receiver_id),
+                                        (call.receiver_id, call.caller_id)):
+                delta = deltas.setdefault(user_id, {'calls': 0, 'accepted': 0, 'seconds': 0, 'partners': {}})
+                delta['calls'] += 1
+                delta['accepted'] += int(accepted)
+                delta['seconds'] += seconds
+                if seconds:
+                    partner_key = str(partner_id)
+                    delta['partners'][partner_key] = delta['partners'].get(partner_key, 0) + seconds
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(user_id=user_id) for user_id in deltas],
+                ignore_conflicts=True,
+            )
+            rows = list(cls.objects.select_for_update().filter(user_id__in=deltas))
+            for stats in rows:
+                delta = deltas[stats.user_id]
+                stats.total_calls += delta['calls']
+                stats.accepted_calls += delta['accepted']
+                stats.total_duration += delta['seconds']
+                for partner_key, seconds in delta['partners'].items():
+                    stats.partner_seconds[partner_key] = stats.partner_seconds.get(partner_key, 0) + seconds
+                stats.updated_at = timezone.now()
+            cls.objects.bulk_update(
+                rows,
+                ['total_calls', 'accepted_calls', 'total_duration', 'partner_seconds', 'updated_at'],
+            )
+
+
 class Feedback(models.Model):
     """User feedback and feature requests"""
     CATEGORY_CHOICES = [
@@ -210,6 +535,7 @@ class Feedback(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Feedback'
+        indexes = [models.Index(fields=['user', 'created_at'])]
     
     def __str__(self):
         return f"{self.name} - {self.category} ({self.rating}★)"
\ No newline at end of file
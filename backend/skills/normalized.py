@@ -0,0 +1,94 @@
+# backend/skills/normalized.py
+"""
+Normalized responses.
+
+With ?format=normalized, match, message and video-call responses render
+related users and skills as ids and list each of them once, keyed by id,
+in an `included` map:
+
+    {"next": ..., "results": [{"id": 1, "learner": 4, "skill": 9, ...}],
+     "included": {"skills": {"9": {...}}, "users": {"4": {...}}}}
+
+Rows are read without joining the related tables and every entity type
+costs one query over its distinct ids, so payload size and serialization
+time grow with the number of distinct users and skills rather than rows.
+A detail response carries its row under "result". ?format=normalized
+takes precedence over ?stream=.
+"""
+from collections import defaultdict
+
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import CustomUser, Skill
+from .renderers import NormalizedJSONRenderer
+from .serializers import CustomUserSerializer, SkillSerializer
+
+# type -> (model, serializer, columns it reads)
+ENTITY_TYPES = {
+    'users': (CustomUser, CustomUserSerializer, CustomUserSerializer.Meta.fields),
+    'skills': (Skill, SkillSerializer, ('id', 'name', 'category', 'subcategory')),
+}
+
+
+def included_entities(entity_type, ids):
+    """id (as a string, like any JSON object key) -> serialized entity"""
+    if not ids:
+        return {}
+    model, serializer_class, columns = ENTITY_TYPES[entity_type]
+    queryset = model.objects.filter(pk__in=ids).only(*columns).order_by('pk')
+    return {str(row['id']): row for row in serializer_class(queryset, many=True).data}
+
+
+class NormalizedResponseMixin:
+    """Adds ?format=normalized to a viewset's list and retrieve actions"""
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NormalizedJSONRenderer]
+    # Row field -> entity type it holds the id of
+    normalized_relations = {}
+
+    def is_normalized(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return getattr(renderer, 'format', None) == NormalizedJSONRenderer.format
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.is_normalized():
+            context['collapse_relations'] = True
+        return context
+
+    def get_included(self, rows):
+        ids = defaultdict(set)
+        for row in rows:
+            for field, entity_type in self.normalized_relations.items():
+                value = row.get(field)
+                if value is not None:
+                    ids[entity_type].add(value)
+        return {
+            entity_type: included_entities(entity_type, ids[entity_type])
+            for entity_type in sorted(set(self.normalized_relations.values()))
+        }
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_normalized():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = self.get_serializer(queryset if page is None else page, many=True).data
+        included = self.get_included(rows)
+        if page is None:
+            return Response({'results': rows, 'included': included})
+
+        response = self.get_paginated_response(rows)
+        if isinstance(response.data, list):
+            # Legacy bare-list pages still need somewhere to put "included"
+            response.data = {'results': response.data}
+        response.data['included'] = included
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_normalized():
+            return super().retrieve(request, *args, **kwargs)
+
+        row = self.get_serializer(self.get_object()).data
+        return Response({'result': row, 'included': self.get_included([row])})
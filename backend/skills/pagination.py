@@ -0,0 +1,130 @@
+# backend/skills/pagination.py
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    Project-wide keyset pagination; views name their ordering in
+    cursor_ordering, matching an index.
+
+    While API_LEGACY_LIST_RESPONSES is on, a request without cursor or
+    page_size gets the old bare list, in the queryset's own order and
+    capped at API_LEGACY_MAX_RESULTS rows.
+
+    DRF seeks on the first ordering key only and steps over ties with
+    OFFSET. With several keys the cursor here carries all of them and
+    seeks past the whole tuple, so orderings should end in a unique key.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-id'
+    legacy = False
+
+    def get_ordering(self, request, queryset, view):
+        # Cursors need a stable key, so ?ordering= only applies to legacy lists
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = settings.API_LEGACY_LIST_RESPONSES and not (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+        if not self.legacy:
+            if len(self.get_ordering(request, queryset, view)) == 1:
+                return super().paginate_queryset(queryset, request, view)
+            return self._paginate_keyset(queryset, request, view)
+
+        limit = settings.API_LEGACY_MAX_RESULTS
+        rows = list(queryset[:limit + 1])
+        self.truncated = len(rows) > limit
+        return rows[:limit]
+
+    def _paginate_keyset(self, queryset, request, view):
+        # Mirrors CursorPagination.paginate_queryset, seeking on every key
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        ordering = _reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None or offset > 0
+            self.has_previous = following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next = following is not None
+            self.has_previous = position is not None or offset > 0
+            self.next_position, self.previous_position = following, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _after(self, ordering, position):
+        """Rows past position in ordering: (a > x) or (a = x and b > y) ..."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        names = [key.lstrip('-') for key in ordering]
+        condition = Q()
+        for i, key in enumerate(ordering):
+            lookup = '__lt' if key.startswith('-') else '__gt'
+            condition |= Q(**dict(zip(names[:i], values[:i])), **{names[i] + lookup: values[i]})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        values = [
+            instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            for name in (key.lstrip('-') for key in ordering)
+        ]
+        return json.dumps(values, default=str)
+
+    def get_paginated_response(self, data):
+        if not self.legacy:
+            return super().get_paginated_response(data)
+        response = Response(data)
+        if self.truncated:
+            response['X-Results-Truncated'] = 'true'
+        return response
+
+
+class UserDirectoryPagination(CursorPagination):
+    """Keyset pages over the user directory, walking the unique username index"""
+    ordering = 'username'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _reverse(ordering):
+    return tuple(key[1:] if key.startswith('-') else '-' + key for key in ordering)
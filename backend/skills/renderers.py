@@ -0,0 +1,74 @@
+# backend/skills/renderers.py
+"""
+orjson-backed JSON renderer and parser.
+
+Both fall back to DRF's stock implementation when orjson is not installed.
+Types orjson does not handle natively (Decimal, timedelta, lazy strings,
+querysets, ...) and datetimes go through DRF's JSONEncoder.default, so the
+output matches the stock renderer. U+2028/U+2029 are escaped the same way,
+so responses stay safe to embed in <script> blocks.
+
+One difference: orjson writes NaN and Infinity as null, where the stock
+renderer (STRICT_JSON) raises. Catching them would mean walking every
+response; fields that can produce them must guard at the source.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_encoder = JSONEncoder()
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+def dumps(data):
+    """Encode to compact UTF-8 JSON bytes, like the stock renderer"""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+    # Valid JSON but line terminators in JavaScript; DRF escapes them too
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact output"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Indented output (e.g. "application/json; indent=4") keeps the stock path
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class NormalizedJSONRenderer(FastJSONRenderer):
+    """Selected with ?format=normalized; views using NormalizedResponseMixin shape the data"""
+    format = 'normalized'
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser using orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,124 @@
+# backend/skills/response_cache.py
+"""
+Per-user versioned response cache.
+
+Every user has a data version in the Django cache. signals.py replaces it
+whenever a Match, Message, Conversation or UserSkill involving the user is
+written, so invalidating a user's cached responses is a single cache write
+and stale entries are never looked up again (they simply expire).
+
+GET list/retrieve responses of views using UserResponseCacheMixin are
+cached under a digest of (user, data version, catalog version, full path,
+renderer format). The same digest is the response's ETag, so a client whose
+data has not changed gets a 304 without any database work. Other users'
+profile edits embedded in a response show up within RESPONSE_CACHE_TTL.
+
+The public user directory is shared by every caller and has a single
+version, replaced whenever any user or user skill is written.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .catalog import get_catalog_version
+
+CACHED_ACTIONS = ('list', 'retrieve')
+DIRECTORY_VERSION_KEY = 'api:directory-version'
+
+
+def data_version_key(user_id):
+    return f"api:data-version:{user_id}"
+
+
+def get_data_versions(user_id):
+    """(user data version, catalog version) for a user's cached responses"""
+    key = data_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so a concurrent bump isn't overwritten
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version, get_catalog_version()
+
+
+def bump_data_versions(*user_ids):
+    """Mark every cached response of these users stale"""
+    cache.set_many(
+        {data_version_key(user_id): uuid.uuid4().hex for user_id in set(user_ids) if user_id},
+        None,
+    )
+
+
+def get_directory_version():
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(DIRECTORY_VERSION_KEY, version, None):
+            version = cache.get(DIRECTORY_VERSION_KEY, version)
+    return version
+
+
+def bump_directory_version():
+    """Mark every cached user directory page stale"""
+    cache.set(DIRECTORY_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+
+
+class UserResponseCacheMixin:
+    """Caches a viewset's GET list/retrieve responses per user and data version"""
+
+    def _response_digest(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        parts = (
+            str(request.user.pk),
+            # Pagination links are absolute
+            request.get_host(),
+            *get_data_versions(request.user.pk),
+            request.get_full_path(),
+            getattr(renderer, 'format', ''),
+        )
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+
+    def _cached(self, handler, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        digest = self._response_digest(request)
+        etag = f'"{digest}"'
+        if _etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"api:response:{request.user.pk}:{digest}"
+            cached = cache.get(cache_key)
+            if cached is None:
+                response = handler(request, *args, **kwargs)
+                # Streamed and error responses aren't cached
+                if not isinstance(response, Response) or response.status_code != status.HTTP_200_OK:
+                    return response
+                headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+                cache.set(cache_key, (response.data, headers), settings.RESPONSE_CACHE_TTL)
+            else:
+                data, headers = cached
+                response = Response(data, headers=headers)
+        response['ETag'] = etag
+        # Let clients keep the body but always revalidate it
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
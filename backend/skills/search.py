@@ -0,0 +1,346 @@
+# backend/skills/search.py
+"""
+In-memory skill search.
+
+Skill names, their words, categories, subcategories and the aliases from the
+frontend alias map are indexed in a prefix trie (every node keeps the best
+weight per skill below it) and a trigram index used for typo tolerance. The
+index is built on first use, patched from signals.py when a single skill is
+saved or deleted, and rebuilt from the table when the catalog version moves
+in another process. A published index is never modified: a rebuild makes a
+new index, and a patch makes a copy that shares everything except the trie
+paths and term/trigram entries the changed skill reaches, applies the change
+to that copy, and swaps the module reference. Concurrent searches therefore
+always read one consistent index.
+"""
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+from .catalog import get_catalog_version
+from .taxonomy import skill_rows
+
+logger = logging.getLogger(__name__)
+
+# Term weights, highest wins when a skill is reached through several terms
+NAME = 100
+ALIAS = 90
+WORD = 80
+SUBCATEGORY = 50
+CATEGORY = 40
+
+PREFIX_PENALTY = 10
+FUZZY_THRESHOLD = 0.35
+MAX_FUZZY_SCORE = 60
+
+_NON_WORD = re.compile(r'[^\w+#.]+')
+
+
+def normalize(text):
+    """Lowercase and collapse punctuation; keeps the symbols in c++, c# and .net"""
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_alias_map(path=None):
+    """Skill name -> list of aliases, or {} if the map is missing or unreadable"""
+    path = Path(path or settings.SKILL_ALIAS_MAP_PATH)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skill alias map not loaded from {path}: {e}")
+        return {}
+    return {
+        normalize(name): [normalize(alias) for alias in aliases if normalize(alias)]
+        for name, aliases in data.items()
+    }
+
+
+class _TrieNode:
+    __slots__ = ('children', 'weights')
+
+    def __init__(self):
+        self.children = {}
+        self.weights = {}
+
+
+class SkillSearchIndex:
+    """Prefix trie plus trigram index over the skill catalog"""
+
+    def __init__(self, aliases=None):
+        self.aliases = aliases if aliases is not None else {}
+        self.version = None
+        self._skills = {}
+        self._skill_terms = {}
+        self._terms = defaultdict(dict)
+        self._term_trigrams = {}
+        self._trigram_terms = defaultdict(set)
+        self._root = _TrieNode()
+
+    @classmethod
+    def build(cls, skills, aliases, version=None):
+        index = cls(aliases)
+        for skill in skills:
+            index.add(skill)
+        index.version = version
+        return index
+
+    def __len__(self):
+        return len(self._skills)
+
+    # ==================== Patching (copy-on-write) ====================
+
+    def patched(self, skill_id, document, version):
+        """Copy of the index with one skill replaced by ``document``, or removed if None"""
+        terms = set(self._skill_terms.get(skill_id, ()))
+        if document is not None:
+            terms.update(self._terms_for(document))
+        index = self._fork(terms)
+        if document is None:
+            index.remove(skill_id)
+        else:
+            index.add(document)
+        index.version = version
+        return index
+
+    def _fork(self, terms):
+        """
+        Copy that can take add/remove for skills reaching only ``terms``.
+        Those terms' owner maps, trigram buckets and trie paths are copied;
+        every other entry is shared with this index.
+        """
+        index = SkillSearchIndex(self.aliases)
+        index._skills = dict(self._skills)
+        index._skill_terms = dict(self._skill_terms)
+        index._terms = defaultdict(dict, self._terms)
+        index._term_trigrams = dict(self._term_trigrams)
+        index._trigram_terms = defaultdict(set, self._trigram_terms)
+        for term in terms:
+            if term in self._terms:
+                index._terms[term] = dict(self._terms[term])
+            for gram in trigrams(term):
+                if gram in self._trigram_terms:
+                    index._trigram_terms[gram] = set(self._trigram_terms[gram])
+
+        copied = set()
+
+        def copy(node):
+            clone = _TrieNode()
+            clone.children = dict(node.children)
+            clone.weights = dict(node.weights)
+            copied.add(id(clone))
+            return clone
+
+        index._root = copy(self._root)
+        for term in terms:
+            node = index._root
+            for char in term:
+                child = node.children.get(char)
+                if child is None:
+                    break
+                if id(child) not in copied:
+                    child = node.children[char] = copy(child)
+                node = child
+        return index
+
+    # ==================== Building (before the index is published) ====================
+
+    def _terms_for(self, skill):
+        name = normalize(skill['name'])
+        terms = {name: NAME}
+        for alias in self.aliases.get(name, ()):
+            terms.setdefault(alias, ALIAS)
+        for word in name.split():
+            terms.setdefault(word, WORD)
+        for field, weight in (('subcategory', SUBCATEGORY), ('category', CATEGORY)):
+            value = normalize(skill.get(field))
+            if value:
+                terms.setdefault(value, weight)
+        return terms
+
+    def add(self, skill):
+        """Index a skill dict (id, name, category, subcategory), replacing any previous entry"""
+        self.remove(skill['id'])
+        skill_id = skill['id']
+        terms = self._terms_for(skill)
+        self._skills[skill_id] = skill
+        self._skill_terms[skill_id] = terms
+        for term, weight in terms.items():
+            self._terms[term][skill_id] = weight
+            node = self._root
+            for char in term:
+                node = node.children.setdefault(char, _TrieNode())
+                if node.weights.get(skill_id, 0) < weight:
+                    node.weights[skill_id] = weight
+            if term not in self._term_trigrams:
+                grams = trigrams(term)
+                self._term_trigrams[term] = len(grams)
+                for gram in grams:
+                    self._trigram_terms[gram].add(term)
+
+    def remove(self, skill_id):
+        terms = self._skill_terms.pop(skill_id, None)
+        if terms is None:
+            return
+        del self._skills[skill_id]
+        for term in terms:
+            owners = self._terms[term]
+            owners.pop(skill_id, None)
+            self._prune(term, skill_id)
+            if not owners:
+                del self._terms[term]
+                for gram in trigrams(term):
+                    grams = self._trigram_terms[gram]
+                    grams.discard(term)
+                    if not grams:
+                        del self._trigram_terms[gram]
+                del self._term_trigrams[term]
+
+    def _prune(self, term, skill_id):
+        # Drop the skill along the term's path and any nodes left empty
+        path = [self._root]
+        for char in term:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            node.weights.pop(skill_id, None)
+            path.append(node)
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.weights or node.children:
+                break
+            del path[depth - 1].children[term[depth - 1]]
+
+    # ==================== Querying ====================
+
+    def search(self, query, limit=20):
+        """Ranked list of (skill dict, score) for a free-text query"""
+        query = normalize(query)
+        if not query:
+            return []
+        scores = {}
+
+        def offer(skill_id, score):
+            if scores.get(skill_id, 0) < score:
+                scores[skill_id] = score
+
+        for skill_id, weight in self._terms.get(query, {}).items():
+            offer(skill_id, weight)
+
+        node = self._root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            for skill_id, weight in node.weights.items():
+                offer(skill_id, weight - PREFIX_PENALTY)
+
+        if len(query) >= 3 and len(scores) < limit:
+            for term, similarity in self._similar_terms(query):
+                for skill_id, weight in self._terms[term].items():
+                    offer(skill_id, round(MAX_FUZZY_SCORE * similarity * weight / NAME, 1))
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], self._skills[item[0]]['name'].lower()),
+        )
+        return [(self._skills[skill_id], score) for skill_id, score in ranked[:limit]]
+
+    def _similar_terms(self, query):
+        """
+        Indexed terms close to the query: trigram similarity above the
+        threshold, or within a small edit distance for short typos
+        """
+        grams = trigrams(query)
+        max_edits = 1 if len(query) <= 5 else 2
+        shared = defaultdict(int)
+        for gram in grams:
+            for term in self._trigram_terms.get(gram, ()):
+                shared[term] += 1
+        for term, count in shared.items():
+            similarity = count / (len(grams) + self._term_trigrams[term] - count)
+            if similarity >= FUZZY_THRESHOLD:
+                yield term, similarity
+            elif abs(len(term) - len(query)) <= max_edits:
+                edits = edit_distance(query, term, max_edits)
+                if edits <= max_edits:
+                    yield term, 1 - edits / (max_edits + 1)
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is exceeded"""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def skill_document(skill):
+    return {
+        'id': skill.id,
+        'name': skill.name,
+        'category': skill.category.name if skill.category_id else None,
+        'subcategory': skill.subcategory.name if skill.subcategory_id else None,
+    }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Shared index, rebuilt from the table if the catalog changed elsewhere"""
+    global _index
+    version = get_catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            aliases = _index.aliases if _index is not None else load_alias_map()
+            _index = SkillSearchIndex.build(
+                (
+                    {key: row[key] for key in ('id', 'name', 'category', 'subcategory')}
+                    for row in skill_rows()
+                ),
+                aliases,
+                version,
+            )
+        return _index
+
+
+def _patch_index(previous_version, version, skill_id, document):
+    """Swap in a patched copy of the index, if it was current before the write"""
+    global _index
+    with _index_lock:
+        if _index is not None and _index.version == previous_version:
+            _index = _index.patched(skill_id, document, version)
+
+
+def index_skill(skill, previous_version, version):
+    """Patch the index after a single skill save, if it was current before it"""
+    _patch_index(previous_version, version, skill.pk, skill_document(skill))
+
+
+def unindex_skill(skill_id, previous_version, version):
+    _patch_index(previous_version, version, skill_id, None)
@@ -1,11 +1,20 @@
 # backend/skills/serializers.py
+from django.db.models import Prefetch
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import (
     CustomUser, Skill, UserSkill, Match, 
-    Conversation, Message, UserActivity, VideoCall, Feedback
+    Conversation, Message, UserActivity, VideoCall, CallStats, Feedback,
+    SkillStats, SkillGroupStats
 )
 
+from .fieldsets import SparseFieldsetMixin
+from .taxonomy import get_taxonomy
+from .tokens import token_blacklist
+
 User = get_user_model()
 
 
@@ -68,7 +77,32 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class BlacklistingTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer that rejects and revokes rotated refresh tokens"""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+        if token_blacklist.contains(jti):
+            raise InvalidToken("Token is blacklisted")
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # The unique insert decides: a concurrent or replayed refresh of this token loses
+            if api_settings.BLACKLIST_AFTER_ROTATION and not token_blacklist.revoke(jti, refresh['exp']):
+                raise InvalidToken("Token is blacklisted")
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
+
+        return data
+
+
+class CustomUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Basic user information serializer"""
     class Meta:
         model = CustomUser
@@ -106,17 +140,101 @@ class CustomUserDetailSerializer(serializers.ModelSerializer):
         return [{'id': us.skill.id, 'name': us.skill.name} for us in skills]
 
 
+class UserProfileSerializer(CustomUserSerializer):
+    """
+    Public profile with teach/learn skills.
+    Expects the queryset to use prefetch(), so a page costs two queries.
+    """
+    teach_skills = serializers.SerializerMethodField()
+    learn_skills = serializers.SerializerMethodField()
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = CustomUserSerializer.Meta.fields + ['teach_skills', 'learn_skills']
+
+    @staticmethod
+    def prefetch():
+        """All of a page's user skills, with their skill, in one query"""
+        return Prefetch(
+            'user_skills',
+            queryset=UserSkill.objects.select_related('skill').only(
+                'id', 'user_id', 'type', 'skill__id', 'skill__name'
+            ),
+            to_attr='profile_skills',
+        )
+
+    def _skills(self, obj, skill_type):
+        return [
+            {'id': us.skill.id, 'name': us.skill.name}
+            for us in obj.profile_skills if us.type == skill_type
+        ]
+
+    def get_teach_skills(self, obj):
+        return self._skills(obj, 'teach')
+
+    def get_learn_skills(self, obj):
+        return self._skills(obj, 'learn')
+
+
 # ==================== Skill Serializers ====================
 
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for skill information"""
+    category = serializers.SerializerMethodField()
+    subcategory = serializers.SerializerMethodField()
+    fieldset_sources = {'category': ['category'], 'subcategory': ['subcategory']}
+
     class Meta:
         model = Skill
         fields = ['id', 'name', 'category', 'subcategory']
         read_only_fields = ['id']
 
+    def _taxonomy(self):
+        # Read once per serialization and shared by every (nested) skill through the context
+        taxonomy = self.context.get('taxonomy')
+        if taxonomy is None:
+            taxonomy = self.context['taxonomy'] = get_taxonomy()
+        return taxonomy
+
+    def get_category(self, obj):
+        # Names come from the cached taxonomy so nested skills need no join
+        if obj.category_id is None:
+            return None
+        return self._taxonomy().category_name(obj.category_id) or obj.category.name
+
+    def get_subcategory(self, obj):
+        if obj.subcategory_id is None:
+            return None
+        return self._taxonomy().subcategory_name(obj.subcategory_id) or obj.subcategory.name
+
+
+class SkillStatsSerializer(serializers.ModelSerializer):
+    """Supply/demand counters for one skill"""
+    id = serializers.IntegerField(source='skill_id', read_only=True)
+    name = serializers.CharField(source='skill.name', read_only=True)
+    category = serializers.CharField(source='skill.category.name', read_only=True, default=None)
+    subcategory = serializers.CharField(source='skill.subcategory.name', read_only=True, default=None)
+
+    class Meta:
+        model = SkillStats
+        fields = [
+            'id', 'name', 'category', 'subcategory',
+            'teach_count', 'learn_count', 'demand_ratio'
+        ]
+        read_only_fields = fields
+
+
+class SkillGroupStatsSerializer(serializers.ModelSerializer):
+    """Supply/demand counters rolled up to a subcategory or category"""
+    id = serializers.IntegerField(source='group.id', read_only=True)
+    name = serializers.CharField(source='group.name', read_only=True)
+
+    class Meta:
+        model = SkillGroupStats
+        fields = ['level', 'id', 'name', 'teach_count', 'learn_count', 'demand_ratio']
+        read_only_fields = fields
 
-class UserSkillSerializer(serializers.ModelSerializer):
+
+class UserSkillSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for user's teach/learn skills"""
     skill_detail = SkillSerializer(source='skill', read_only=True)
     user_id = serializers.IntegerField(source='user.id', read_only=True)
@@ -149,7 +267,25 @@ class UserSkillSerializer(serializers.ModelSerializer):
 
 # ==================== Match Serializers ====================
 
-class MatchSerializer(serializers.ModelSerializer):
+MATCH_TIER_DISPLAY = {
+    'exact': '⭐ Exact Match',
+    'subcategory': '🎯 Subcategory Match',
+    'category': '📂 Category Match'
+}
+MATCH_TIER_ADJUSTMENTS = {
+    'exact': 0,
+    'subcategory': -15,
+    'category': -30
+}
+
+
+def match_quality(match_tier, is_mutual):
+    """Match quality score (0-100): mutual matches start higher, wider tiers cost points"""
+    base_score = 100 if is_mutual else 70
+    return max(0, base_score + MATCH_TIER_ADJUSTMENTS.get(match_tier, 0))
+
+
+class MatchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for skill matches between users"""
     learner = CustomUserSerializer(read_only=True)
     teacher = CustomUserSerializer(read_only=True)
@@ -157,6 +293,10 @@ class MatchSerializer(serializers.ModelSerializer):
     teacher_skill = SkillSerializer(read_only=True)
     match_tier_display = serializers.SerializerMethodField()
     match_quality = serializers.SerializerMethodField()
+    fieldset_sources = {
+        'match_tier_display': ['match_tier'],
+        'match_quality': ['match_tier', 'is_mutual'],
+    }
 
     class Meta:
         model = Match
@@ -169,33 +309,21 @@ class MatchSerializer(serializers.ModelSerializer):
 
     def get_match_tier_display(self, obj):
         """Get human-readable match tier with emoji"""
-        tier_info = {
-            'exact': '⭐ Exact Match',
-            'subcategory': '🎯 Subcategory Match',
-            'category': '📂 Category Match'
-        }
-        return tier_info.get(obj.match_tier, 'Match')
+        return MATCH_TIER_DISPLAY.get(obj.match_tier, 'Match')
     
     def get_match_quality(self, obj):
         """Calculate match quality score (0-100)"""
-        if obj.is_mutual:
-            base_score = 100
-        else:
-            base_score = 70
-        
-        # Adjust based on tier
-        tier_adjustments = {
-            'exact': 0,
-            'subcategory': -15,
-            'category': -30
-        }
-        
-        return max(0, base_score + tier_adjustments.get(obj.match_tier, 0))
+        return match_quality(obj.match_tier, obj.is_mutual)
 
 
 # ==================== Messaging Serializers ====================
 
-class MessageSerializer(serializers.ModelSerializer):
+def message_preview(content):
+    """First 50 characters of a message for conversation lists"""
+    return content[:50] + '...' if len(content) > 50 else content
+
+
+class MessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for individual messages"""
     sender = CustomUserSerializer(read_only=True)
     sender_id = serializers.IntegerField(source='sender.id', read_only=True)
@@ -216,7 +344,7 @@ class MessageSerializer(serializers.ModelSerializer):
         return value.strip()
 
 
-class ConversationListSerializer(serializers.ModelSerializer):
+class ConversationListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Lightweight serializer for conversation list view"""
     other_user = serializers.SerializerMethodField()
     last_message_preview = serializers.SerializerMethodField()
@@ -247,11 +375,9 @@ class ConversationListSerializer(serializers.ModelSerializer):
         try:
             last_message = obj.messages.order_by('-created_at').first()
             if last_message:
-                content = last_message.content
-                preview = content[:50] + '...' if len(content) > 50 else content
                 return {
                     'id': last_message.id,
-                    'preview': preview,
+                    'preview': message_preview(last_message.content),
                     'sender_id': last_message.sender.id,
                     'created_at': last_message.created_at,
                     'is_read': last_message.is_read
@@ -275,7 +401,7 @@ class ConversationListSerializer(serializers.ModelSerializer):
             return 0
 
 
-class ConversationDetailSerializer(serializers.ModelSerializer):
+class ConversationDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Detailed serializer for conversation with all messages"""
     user1 = CustomUserSerializer(read_only=True)
     user2 = CustomUserSerializer(read_only=True)
@@ -316,7 +442,7 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
 
 # ==================== Activity & Call Serializers ====================
 
-class UserActivitySerializer(serializers.ModelSerializer):
+class UserActivitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for user online/activity status"""
     user = CustomUserSerializer(read_only=True)
     user_id = serializers.IntegerField(source='user.id', read_only=True)
@@ -331,13 +457,14 @@ class UserActivitySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'user_id', 'username', 'last_seen', 'created_at', 'updated_at']
 
 
-class VideoCallSerializer(serializers.ModelSerializer):
+class VideoCallSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for video call records"""
     caller = CustomUserSerializer(read_only=True)
     receiver = CustomUserSerializer(read_only=True)
     caller_id = serializers.IntegerField(source='caller.id', read_only=True)
     receiver_id = serializers.IntegerField(source='receiver.id', read_only=True)
     duration_formatted = serializers.SerializerMethodField()
+    fieldset_sources = {'duration_formatted': ['duration']}
     
     class Meta:
         model = VideoCall
@@ -361,9 +488,34 @@ class VideoCallSerializer(serializers.ModelSerializer):
         return f"{seconds}s"
 
 
+class CallStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a user's precomputed call totals"""
+    accepted_ratio = serializers.SerializerMethodField()
+    average_duration = serializers.IntegerField(read_only=True)
+    partner_minutes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CallStats
+        fields = [
+            'total_calls', 'accepted_calls', 'accepted_ratio',
+            'total_duration', 'average_duration', 'partner_minutes', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_accepted_ratio(self, obj):
+        return round(obj.accepted_ratio, 3)
+
+    def get_partner_minutes(self, obj):
+        """Minutes talked per partner, keyed by partner user id"""
+        return {
+            partner_id: round(seconds / 60, 1)
+            for partner_id, seconds in obj.partner_seconds.items()
+        }
+
+
 # ==================== Feedback Serializer ====================
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for user feedback submissions"""
     user_username = serializers.CharField(source='user.username', read_only=True)
     category_display = serializers.CharField(source='get_category_display', read_only=True)
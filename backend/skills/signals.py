@@ -0,0 +1,148 @@
+# backend/skills/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .caching import invalidate_user
+from .catalog import bump_catalog_version, get_catalog_version
+from .models import (
+    Category, Conversation, Match, Message, Skill, SkillGroupStats, SkillStats, Subcategory, UserSkill
+)
+from .response_cache import bump_data_versions, bump_directory_version
+from .search import index_skill, unindex_skill
+
+User = get_user_model()
+
+
+# ==================== User Cache Invalidation ====================
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    invalidate_user(instance.pk)
+    bump_data_versions(instance.pk)
+    # Logins only touch last_login, which the directory doesn't show
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_directory_version()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    from .calls import call_registry
+    invalidate_user(instance.pk)
+    bump_directory_version()
+    call_registry.forget_user(instance.pk)
+
+
+# ==================== Skill Catalog Versioning ====================
+
+@receiver(post_save, sender=Skill)
+def skill_saved(sender, instance, **kwargs):
+    previous = get_catalog_version()
+    index_skill(instance, previous, bump_catalog_version())
+
+
+@receiver(post_delete, sender=Skill)
+def skill_deleted(sender, instance, **kwargs):
+    previous = get_catalog_version()
+    unindex_skill(instance.pk, previous, bump_catalog_version())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def skill_group_changed(sender, instance, **kwargs):
+    # Renames show up in every serialized skill; a delete takes its skills out of the rollups
+    if 'created' not in kwargs:
+        SkillGroupStats.rebuild()
+    elif kwargs['created']:
+        level = sender._meta.model_name
+        SkillGroupStats.objects.get_or_create(level=level, **{level: instance})
+    bump_catalog_version()
+
+
+# ==================== Skill Supply/Demand Counters ====================
+
+def _skill_delta(instance, step):
+    return {instance.skill_id: (step, 0) if instance.type == 'teach' else (0, step)}
+
+
+def _is_skill_delete(origin):
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) is Skill
+
+
+@receiver(pre_save, sender=Skill)
+def skill_saving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._previous_groups = Skill.objects.filter(pk=instance.pk).values_list(
+            'category_id', 'subcategory_id'
+        ).first()
+
+
+@receiver(post_save, sender=Skill)
+def skill_stats_saved(sender, instance, created, **kwargs):
+    if created:
+        SkillStats.objects.get_or_create(skill=instance)
+        return
+    previous = getattr(instance, '_previous_groups', None)
+    if previous and previous != (instance.category_id, instance.subcategory_id):
+        # The skill's counts moved to other groups
+        SkillGroupStats.recount('category', {previous[0], instance.category_id})
+        SkillGroupStats.recount('subcategory', {previous[1], instance.subcategory_id})
+
+
+@receiver(pre_delete, sender=Skill)
+def skill_deleting(sender, instance, **kwargs):
+    # Take the whole skill out of its rollups at once; its user skills are
+    # deleted in the same cascade and skip the counters (user_skill_deleted)
+    counts = SkillStats.objects.filter(skill=instance).values_list('teach_count', 'learn_count').first()
+    if counts:
+        SkillStats.apply({instance.pk: (-counts[0], -counts[1])})
+
+
+@receiver(post_save, sender=UserSkill)
+def user_skill_saved(sender, instance, created, **kwargs):
+    if created:
+        SkillStats.apply(_skill_delta(instance, 1))
+
+
+@receiver(post_delete, sender=UserSkill)
+def user_skill_deleted(sender, instance, origin=None, **kwargs):
+    if _is_skill_delete(origin):
+        return
+    SkillStats.apply(_skill_delta(instance, -1))
+
+
+# ==================== Per-user Response Versions ====================
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def match_changed(sender, instance, **kwargs):
+    bump_data_versions(instance.learner_id, instance.teacher_id)
+
+
+@receiver(post_save, sender=Conversation)
+@receiver(post_delete, sender=Conversation)
+def conversation_changed(sender, instance, **kwargs):
+    bump_data_versions(instance.user1_id, instance.user2_id)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def message_changed(sender, instance, **kwargs):
+    if Message.conversation.is_cached(instance):
+        users = (instance.conversation.user1_id, instance.conversation.user2_id)
+    else:
+        users = Conversation.objects.filter(
+            pk=instance.conversation_id
+        ).values_list('user1_id', 'user2_id').first() or ()
+    bump_data_versions(*users)
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+def user_skill_changed(sender, instance, **kwargs):
+    bump_data_versions(instance.user_id)
+    # The directory's ?skill= filter
+    bump_directory_version()
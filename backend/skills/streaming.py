@@ -0,0 +1,77 @@
+# backend/skills/streaming.py
+"""
+Streaming list responses.
+
+With ?stream=1 (or ?stream=json) a list endpoint returns its whole
+filtered queryset as one JSON array; ?stream=ndjson returns one object per
+line. Rows are read with .iterator() and serialized a chunk at a time, so
+memory stays flat however long the list is. Pagination does not apply.
+
+Under ASGI the body is an async iterator that fetches each chunk with
+sync_to_async; handing Django a sync iterator there makes it read the whole
+body into a list before sending anything.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+STREAM_CONTENT_TYPES = {
+    '1': 'application/json',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class StreamingListMixin:
+    """Adds ?stream= to a viewset's list action"""
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        mode = request.query_params.get('stream')
+        if mode not in STREAM_CONTENT_TYPES:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        chunks = self._stream_chunks(queryset)
+        body = self._ndjson(chunks) if mode == 'ndjson' else self._json_array(chunks)
+        if isinstance(request._request, ASGIRequest):
+            body = self._async_body(body)
+        response = StreamingHttpResponse(body, content_type=STREAM_CONTENT_TYPES[mode])
+        # Let proxies pass chunks through instead of buffering the whole body
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _stream_chunks(self, queryset):
+        """Lists of encoded rows, serializing one chunk of model instances at a time"""
+        instances = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(instances, self.stream_chunk_size))
+            if not chunk:
+                return
+            yield [dumps(row) for row in self.get_serializer(chunk, many=True).data]
+
+    def _json_array(self, chunks):
+        yield b'['
+        first = True
+        for rows in chunks:
+            body = b','.join(rows)
+            yield body if first else b',' + body
+            first = False
+        yield b']'
+
+    def _ndjson(self, chunks):
+        for rows in chunks:
+            yield b''.join(row + b'\n' for row in rows)
+
+    async def _async_body(self, body):
+        # Each step runs the query/serializer work in the request's sync thread
+        step = sync_to_async(next)
+        while True:
+            part = await step(body, None)
+            if part is None:
+                return
+            yield part
@@ -0,0 +1,120 @@
+# backend/skills/taxonomy.py
+"""
+Skill taxonomy.
+
+The category -> subcategory -> skill hierarchy and, for every skill, the ids
+of its subcategory and category siblings are built once per catalog version
+and kept in process. The tree backs /api/skills/tree/, the sibling sets
+back tier 2/3 matching in UserSkillViewSet and the id -> name maps let
+SkillSerializer render category names without joining.
+"""
+import threading
+from collections import defaultdict
+
+from .catalog import get_catalog_version
+
+EMPTY = frozenset()
+
+
+class SkillTaxonomy:
+    """Hierarchy and sibling sets for one catalog version"""
+
+    def __init__(self, skills, version=None):
+        self.version = version
+        self.category_names = {}
+        self.subcategory_names = {}
+        by_category = defaultdict(lambda: defaultdict(list))
+        subcategory_ids = defaultdict(set)
+        category_ids = defaultdict(set)
+        subcategory_of = {}
+        category_of = {}
+
+        for skill in skills:
+            skill_id = skill['id']
+            category_id = skill['category_id']
+            subcategory_id = skill['subcategory_id']
+            if category_id:
+                self.category_names[category_id] = skill['category']
+                category_ids[category_id].add(skill_id)
+            if subcategory_id:
+                self.subcategory_names[subcategory_id] = skill['subcategory']
+                subcategory_ids[subcategory_id].add(skill_id)
+            by_category[skill['category'] or ''][skill['subcategory'] or ''].append(
+                {'id': skill_id, 'name': skill['name']}
+            )
+            subcategory_of[skill_id] = subcategory_id
+            category_of[skill_id] = category_id
+
+        self.tree = [
+            {
+                'name': category,
+                'subcategories': [
+                    {
+                        'name': subcategory,
+                        'skills': sorted(members, key=lambda s: s['name'].lower()),
+                    }
+                    for subcategory, members in sorted(subcategories.items())
+                ],
+            }
+            for category, subcategories in sorted(by_category.items())
+        ]
+
+        # Subcategory siblings share the subcategory; category siblings share
+        # the category but not the skill's own subcategory
+        self._subcategory_siblings = {}
+        self._category_siblings = {}
+        for skill_id, subcategory_id in subcategory_of.items():
+            if subcategory_id:
+                self._subcategory_siblings[skill_id] = frozenset(
+                    subcategory_ids[subcategory_id] - {skill_id}
+                )
+            category_id = category_of[skill_id]
+            if category_id:
+                self._category_siblings[skill_id] = frozenset(
+                    other for other in category_ids[category_id]
+                    if other != skill_id and not (subcategory_id and subcategory_of[other] == subcategory_id)
+                )
+
+    def subcategory_siblings(self, skill_id):
+        """Ids of other skills in the same subcategory (tier 2)"""
+        return self._subcategory_siblings.get(skill_id, EMPTY)
+
+    def category_siblings(self, skill_id):
+        """Ids of other skills in the same category but another subcategory (tier 3)"""
+        return self._category_siblings.get(skill_id, EMPTY)
+
+    def category_name(self, category_id):
+        return self.category_names.get(category_id)
+
+    def subcategory_name(self, subcategory_id):
+        return self.subcategory_names.get(subcategory_id)
+
+
+def skill_rows():
+    """Skill dicts with category/subcategory ids and names, in one joined query"""
+    from .models import Skill
+
+    fields = ('id', 'name', 'category_id', 'category', 'subcategory_id', 'subcategory')
+    return [
+        dict(zip(fields, row))
+        for row in Skill.objects.values_list(
+            'id', 'name', 'category_id', 'category__name', 'subcategory_id', 'subcategory__name'
+        )
+    ]
+
+
+_taxonomy = None
+_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """Current taxonomy, rebuilt only when the catalog version has moved"""
+    global _taxonomy
+    version = get_catalog_version()
+    taxonomy = _taxonomy
+    if taxonomy is not None and taxonomy.version == version:
+        return taxonomy
+    with _lock:
+        if _taxonomy is None or _taxonomy.version != version:
+            _taxonomy = SkillTaxonomy(skill_rows(), version)
+        return _taxonomy
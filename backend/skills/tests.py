@@ -1,7 +1,1280 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
+from . import serializers as skill_serializers
+from .cache_backends import SQLiteCache, TwoTierCache
+from .calls import (
+    CallRegistry, CallWriter, InvalidTransition, LocalBusyRegistry, TimerWheel, UserBusy
+)
+from .catalog import accepts_gzip
+from .caching import (
+    get_cached_token_user_id, get_cached_user, resolve_user, token_cache, user_cache,
+    user_version_key
+)
+from .consumers import VideoCallConsumer
+from .middleware import get_user_from_token
+from .models import (
+    CallStats, Category, Conversation, CustomUser, Match, Message, RevokedToken, Skill,
+    SkillGroupStats, SkillStats, Subcategory, UserSkill, VideoCall
+)
+from .renderers import FastJSONParser, dumps
+from .search import SkillSearchIndex
+from .tokens import BloomFilter, TokenBlacklist
+from .views import MatchViewSet
 
 
+class UserProfileQueryCountTests(TestCase):
+    """Profile pages load skills with one prefetch, whatever the page size"""
 
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Technology')
+        skills = [Skill.objects.create(name=f'Skill {i}', category=category) for i in range(4)]
+        for i in range(12):
+            user = CustomUser.objects.create(username=f'user{i:02}', email=f'user{i}@example.com')
+            for skill in skills[:2]:
+                UserSkill.objects.create(user=user, skill=skill, type='teach')
+            UserSkill.objects.create(user=user, skill=skills[3], type='learn')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_profiles_page_query_count_is_constant(self):
+        # One query for the users, one for their skills
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/profiles/', {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/profiles/', {'page_size': 12})
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_profiles_split_teach_and_learn(self):
+        response = self.client.get('/api/users/profiles/', {'page_size': 1})
+        profile = response.data['results'][0]
+        self.assertEqual(profile['username'], 'user00')
+        self.assertEqual([s['name'] for s in profile['teach_skills']], ['Skill 0', 'Skill 1'])
+        self.assertEqual([s['name'] for s in profile['learn_skills']], ['Skill 3'])
+
+    def test_single_profile(self):
+        user = CustomUser.objects.get(username='user03')
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/users/{user.id}/profile/')
+        self.assertEqual(len(response.data['teach_skills']), 2)
+
+
+class FastSerializerEquivalenceTests(TestCase):
+    """The plain-dict list serializers render byte-for-byte what DRF renders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Music')
+        strings = Subcategory.objects.create(category=category, name='Strings')
+        guitar = Skill.objects.create(name='Guitar', category=category, subcategory=strings)
+        violin = Skill.objects.create(name='Violin', category=category, subcategory=strings)
+        singing = Skill.objects.create(name='Singing', category=category)
+        loose = Skill.objects.create(name='Juggling')
+
+        cls.user = CustomUser.objects.create(username='alice', email='alice@example.com', bio='Hi')
+        others = [
+            CustomUser.objects.create(username=f'user{i}', email=f'user{i}@example.com', location='Pune')
+            for i in range(3)
+        ]
+        for i, (tier, teacher_skill) in enumerate([
+            ('exact', guitar), ('subcategory', violin), ('category', singing), ('exact', None),
+        ]):
+            Match.objects.create(
+                learner=cls.user, teacher=others[i % 3], skill=guitar if teacher_skill else loose,
+                teacher_skill=teacher_skill, match_tier=tier, is_mutual=i % 2 == 0,
+            )
+        Match.objects.create(learner=others[0], teacher=cls.user, skill=singing,
+                             teacher_skill=singing, match_tier='exact')
+
+        first = Conversation.objects.create(user1=cls.user, user2=others[0])
+        second = Conversation.objects.create(user1=others[1], user2=cls.user)
+        Conversation.objects.create(user1=cls.user, user2=others[2])
+        Message.objects.create(conversation=first, sender=cls.user, content='Short hello')
+        Message.objects.create(conversation=first, sender=others[0], content='x' * 80)
+        Message.objects.create(conversation=second, sender=others[1], content='Read one', is_read=True)
+        Message.objects.create(conversation=second, sender=others[1], content='Unread one')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def assertSameOutput(self, url):
+        fast = self._get(url)
+        cache.clear()
+        with override_settings(API_FAST_SERIALIZERS=False):
+            stock = self._get(url)
+        self.assertEqual(fast, stock)
+        return fast
+
+    def test_matches(self):
+        self.assertSameOutput('/api/matches/')
+        self.assertSameOutput('/api/matches/?stream=ndjson')
+        page = self.client.get('/api/matches/', {'page_size': 2}).data
+        self.assertSameOutput(page['next'])
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_matches_outside_utc(self):
+        body = self.assertSameOutput('/api/matches/')
+        self.assertIn(b'+05:30', body)
+
+    def test_messages(self):
+        self.assertSameOutput('/api/messages/')
+        self.assertSameOutput('/api/messages/?page_size=3')
+        self.assertSameOutput('/api/messages/?stream=1')
+
+    def test_conversations(self):
+        body = self.assertSameOutput('/api/conversations/')
+        self.assertIn(b'"unread_count":1', body)
+        self.assertIn(b'x' * 50 + b'...', body)
+
+    def test_conversation_queries_do_not_grow_with_the_page(self):
+        # Conversations, their last messages, their unread counts
+        with self.assertNumQueries(3):
+            self.client.get('/api/conversations/')
+
+    def test_sparse_requests_use_drf(self):
+        response = self.client.get('/api/matches/', {'fields': 'id,match_quality'})
+        self.assertEqual(set(response.data[0]), {'id', 'match_quality'})
+
+
+class UserResponseCacheTests(TestCase):
+    """Cached GET responses are versioned per user and revalidated with ETags"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Languages')
+        cls.skill = Skill.objects.create(name='Spanish', category=category)
+        cls.user = CustomUser.objects.create(username='bob', email='bob@example.com')
+        cls.other = CustomUser.objects.create(username='carol', email='carol@example.com')
+        cls.conversation = Conversation.objects.create(user1=cls.user, user2=cls.other)
+        Message.objects.create(conversation=cls.conversation, sender=cls.other, content='Hola')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get('/api/conversations/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/conversations/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_unchanged_data_returns_304(self):
+        etag = self.client.get('/api/matches/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/matches/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_bump_the_version(self):
+        etag = self.client.get('/api/matches/')['ETag']
+        Match.objects.create(learner=self.user, teacher=self.other, skill=self.skill, match_tier='exact')
+        response = self.client.get('/api/matches/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_mark_as_read_invalidates_the_conversation_list(self):
+        self.assertEqual(self.client.get('/api/conversations/').data[0]['unread_count'], 1)
+        self.client.post(f'/api/conversations/{self.conversation.id}/mark_as_read/')
+        self.assertEqual(self.client.get('/api/conversations/').data[0]['unread_count'], 0)
+
+    def test_other_users_are_not_affected(self):
+        etag = self.client.get('/api/user-skills/')['ETag']
+        UserSkill.objects.create(user=self.other, skill=self.skill, type='teach')
+        response = self.client.get('/api/user-skills/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class TwoTierCacheTests(TestCase):
+    """Two backends with their own L1 over one sqlite L2 behave like two processes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        options = {
+            'L2': {
+                'BACKEND': 'skills.cache_backends.SQLiteCache',
+                'LOCATION': os.path.join(directory.name, 'cache.sqlite3'),
+            },
+            'POLL_INTERVAL': 0,
+        }
+        self.directory = directory.name
+        self.first = TwoTierCache(f'first-{id(self)}', {'OPTIONS': options})
+        self.second = TwoTierCache(f'second-{id(self)}', {'OPTIONS': options})
+
+    def test_write_evicts_other_process_l1(self):
+        self.first.set('greeting', 'hello')
+        self.assertEqual(self.second.get('greeting'), 'hello')
+        self.assertEqual(self.second.get('greeting'), 'hello')
+
+        self.first.set('greeting', 'goodbye')
+        self.assertEqual(self.second.get('greeting'), 'goodbye')
+        self.first.delete('greeting')
+        self.assertIsNone(self.second.get('greeting'))
+
+        stats = self.second.stats()
+        self.assertEqual(stats['l1']['hits'], 1)
+        self.assertEqual(stats['l2']['hits'], 2)
+        self.assertEqual(stats['l2']['misses'], 1)
+        self.assertEqual(stats['invalidations']['received'], 3)
+
+    def test_add_incr_and_clear(self):
+        self.assertTrue(self.first.add('counter', 1))
+        self.assertFalse(self.second.add('counter', 5))
+        self.assertEqual(self.second.get('counter'), 1)
+        self.assertEqual(self.first.incr('counter', 2), 3)
+        self.assertEqual(self.second.get('counter'), 3)
+
+        self.second.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.first.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        self.second.clear()
+        self.assertEqual(self.first.get_many(['a', 'b', 'counter']), {})
+
+
+    def test_sqlite_file_is_private(self):
+        path = os.path.join(self.directory, 'private', 'cache.sqlite3')
+        l2 = SQLiteCache(path, {})
+        l2.set('key', 'value')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+
+    def test_sqlite_file_of_another_user_is_refused(self):
+        path = os.path.join(self.directory, 'cache.sqlite3')
+        SQLiteCache(path, {}).set('key', 'value')
+        with mock.patch('skills.cache_backends.os.geteuid', return_value=os.geteuid() + 1):
+            with self.assertRaises(ImproperlyConfigured):
+                SQLiteCache(path, {}).get('key')
+
+        link = os.path.join(self.directory, 'link.sqlite3')
+        os.symlink(path, link)
+        with self.assertRaises(ImproperlyConfigured):
+            SQLiteCache(link, {}).get('key')
+
+
+class WebSocketAuthCacheTests(TestCase):
+    """Decoded tokens and users are cached for the WebSocket middleware"""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.user = CustomUser.objects.create(username='socket', email='socket@example.com')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def test_repeat_connections_are_served_from_cache(self):
+        self.assertEqual(async_to_sync(get_user_from_token)(self.token).pk, self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user = async_to_sync(get_user_from_token)(self.token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, 'socket')
+        self.assertEqual(len(queries), 0)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        async_to_sync(get_user_from_token)(self.token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(async_to_sync(get_user_from_token)(self.token).is_active)
+
+    def test_expired_tokens_are_rejected(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=-1))
+        self.assertFalse(async_to_sync(get_user_from_token)(str(token)).is_authenticated)
+
+    def test_cached_token_is_not_used_past_its_expiry(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        encoded = str(token)
+        self.assertEqual(async_to_sync(get_user_from_token)(encoded).pk, self.user.pk)
+        self.assertEqual(get_cached_token_user_id(encoded), self.user.pk)
+        with mock.patch('skills.caching.time.time', return_value=token['exp'] + 1):
+            self.assertIsNone(get_cached_token_user_id(encoded))
+
+
+class RestAuthCacheTests(TestCase):
+    """REST requests resolve their user through the same principal caches"""
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = CustomUser.objects.create(username='rest', email='rest@example.com')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_cached_user_needs_no_query(self):
+        resolve_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = resolve_user(self.user.pk)
+        self.assertEqual(user.email, 'rest@example.com')
+
+    def test_deactivated_user_is_rejected_at_once(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_version_change_from_another_worker_drops_the_local_entry(self):
+        resolve_user(self.user.pk)
+        cache.set(user_version_key(self.user.pk), 'changed-elsewhere', None)
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+
+# ==================== Video Calls ====================
+
+def _registry(busy=None, ring_timeout=45, abandon_grace=30):
+    """A registry with its own writer, timers and busy markers, flushing quickly"""
+    return CallRegistry(
+        CallWriter(flush_interval=0.01),
+        TimerWheel(tick=0.01),
+        busy or LocalBusyRegistry(),
+        ring_timeout=ring_timeout,
+        abandon_grace=abandon_grace,
+    )
+
+
+class CallRegistryTests(TransactionTestCase):
+    """Live calls move through their states and end up in the VideoCall row"""
+
+    def setUp(self):
+        self.caller = CustomUser.objects.create(username='caller', email='caller@example.com')
+        self.receiver = CustomUser.objects.create(username='receiver', email='receiver@example.com')
+
+    async def _row(self, call):
+        return await sync_to_async(VideoCall.objects.get)(pk=call.pk)
+
+    async def test_accepted_call_ends_with_duration(self):
+        registry = _registry()
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        self.assertEqual((await self._row(call)).status, 'pending')
+
+        await registry.transition(call, 'accepted')
+        self.assertEqual((await self._row(call)).status, 'accepted')
+        await registry.transition(call, 'ended')
+        # Hangups are written behind
+        await registry.writer.flush()
+
+        row = await self._row(call)
+        self.assertEqual(row.status, 'ended')
+        self.assertIsNotNone(row.duration)
+        self.assertIsNone(registry.get(call.call_id))
+
+    async def test_invalid_transition(self):
+        registry = _registry()
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        await registry.transition(call, 'declined')
+        with self.assertRaises(InvalidTransition):
+            await registry.transition(call, 'accepted')
+
+    async def test_lookup_falls_back_to_the_row(self):
+        call = await _registry().create(self.caller.pk, self.receiver.pk)
+        other = _registry()
+        copy = await other.lookup(call.call_id)
+        self.assertEqual((copy.pk, copy.status), (call.pk, 'pending'))
+        # Legacy clients send the numeric row id
+        self.assertEqual((await other.lookup(str(call.pk))).call_id, call.call_id)
+
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class CallExpiryTests(TransactionTestCase):
+    """Unanswered rings and abandoned calls are closed by the timer wheel or expire_calls"""
+
+    def setUp(self):
+        self.caller = CustomUser.objects.create(username='caller', email='caller@example.com')
+        self.receiver = CustomUser.objects.create(username='receiver', email='receiver@example.com')
+
+    async def _row(self, call):
+        return await sync_to_async(VideoCall.objects.get)(pk=call.pk)
+
+    async def test_unanswered_ring_expires_as_missed(self):
+        registry = _registry(ring_timeout=0.05)
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        await asyncio.sleep(0.2)
+
+        self.assertEqual((await self._row(call)).status, 'missed')
+        self.assertIsNone(registry.get(call.call_id))
+        self.assertEqual(len(registry.timers), 0)
+
+    async def test_answered_ring_does_not_expire(self):
+        registry = _registry(ring_timeout=0.05)
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        await registry.transition(call, 'accepted')
+        await asyncio.sleep(0.2)
+        self.assertEqual((await self._row(call)).status, 'accepted')
+
+    async def test_abandoned_call_ends_after_the_grace_period(self):
+        registry = _registry(abandon_grace=0.05)
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        await registry.transition(call, 'accepted')
+        registry.user_connected(self.caller.pk)
+        registry.user_disconnected(self.caller.pk)
+        await asyncio.sleep(0.2)
+        await registry.writer.flush()
+        self.assertEqual((await self._row(call)).status, 'ended')
+
+    async def test_reconnecting_within_the_grace_period_keeps_the_call(self):
+        registry = _registry(abandon_grace=0.05)
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        await registry.transition(call, 'accepted')
+        registry.user_connected(self.caller.pk)
+        registry.user_disconnected(self.caller.pk)
+        registry.user_connected(self.caller.pk)
+        await asyncio.sleep(0.2)
+        self.assertEqual(registry.get(call.call_id).status, 'accepted')
+
+    def test_expire_calls_closes_stale_calls_once(self):
+        stale = timezone.now() - timedelta(hours=7)
+        pending = VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        accepted = VideoCall.objects.create(
+            caller=self.caller, receiver=self.receiver, status='accepted', started_at=stale
+        )
+        fresh = VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        VideoCall.objects.filter(pk=pending.pk).update(created_at=stale)
+
+        out = StringIO()
+        call_command('expire_calls', stdout=out)
+        self.assertIn('Marked 1 calls missed and ended 1 abandoned calls', out.getvalue())
+        out = StringIO()
+        call_command('expire_calls', stdout=out)
+        self.assertIn('Marked 0 calls missed and ended 0 abandoned calls', out.getvalue())
+
+        for call in (pending, accepted, fresh):
+            call.refresh_from_db()
+        self.assertEqual((pending.status, accepted.status, fresh.status), ('missed', 'ended', 'pending'))
+        self.assertIsNone(accepted.duration)
+
+
+
+class CallStatsTests(TransactionTestCase):
+    """Per-user call totals count every finished call exactly once"""
+
+    def setUp(self):
+        self.caller = CustomUser.objects.create(username='caller', email='caller@example.com')
+        self.receiver = CustomUser.objects.create(username='receiver', email='receiver@example.com')
+        self.client = APIClient()
+
+    def _stats(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/video-calls/stats/').data
+
+    def test_user_without_calls(self):
+        stats = self._stats(self.caller)
+        self.assertEqual(
+            (stats['total_calls'], stats['accepted_calls'], stats['average_duration']), (0, 0, 0)
+        )
+
+    def test_calls_settled_through_the_api(self):
+        answered = VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        declined = VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        self.client.force_authenticate(self.receiver)
+        self.client.post(f'/api/video-calls/{answered.pk}/accept_call/')
+        self.client.post(f'/api/video-calls/{declined.pk}/decline_call/')
+        VideoCall.objects.filter(pk=answered.pk).update(started_at=timezone.now() - timedelta(seconds=90))
+        self.client.force_authenticate(self.caller)
+        self.client.post(f'/api/video-calls/{answered.pk}/end_call/')
+
+        for user in (self.caller, self.receiver):
+            stats = self._stats(user)
+            self.assertEqual((stats['total_calls'], stats['accepted_calls']), (2, 1))
+            self.assertEqual(stats['accepted_ratio'], 0.5)
+            self.assertEqual(stats['average_duration'], 90)
+        self.assertEqual(self._stats(self.caller)['partner_minutes'], {str(self.receiver.pk): 1.5})
+
+    def test_rest_actions_only_settle_ringing_calls(self):
+        call = VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        self.client.force_authenticate(self.receiver)
+        self.assertEqual(self.client.post(f'/api/video-calls/{call.pk}/decline_call/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/video-calls/{call.pk}/accept_call/').status_code, 409)
+        self.assertEqual(self._stats(self.caller)['total_calls'], 1)
+
+    def test_abandoned_calls_do_not_lower_the_average(self):
+        VideoCall.objects.create(
+            caller=self.caller, receiver=self.receiver, status='ended',
+            started_at=timezone.now(), ended_at=timezone.now(), duration=60,
+        )
+        CallStats.record_calls(VideoCall.objects.all())
+        VideoCall.objects.create(
+            caller=self.caller, receiver=self.receiver, status='accepted',
+            started_at=timezone.now() - timedelta(hours=7),
+        )
+        call_command('expire_calls', stdout=StringIO())
+
+        stats = self._stats(self.caller)
+        self.assertEqual((stats['total_calls'], stats['accepted_calls']), (2, 1))
+        self.assertEqual(stats['average_duration'], 60)
+
+    async def test_racing_decline_and_hangup_count_once(self):
+        busy = LocalBusyRegistry()
+        first = _registry(busy)
+        second = _registry(busy)
+        call = await first.create(self.caller.pk, self.receiver.pk)
+        await second.transition(await second.lookup(call.call_id), 'declined')
+        with self.assertRaises(InvalidTransition):
+            await first.transition(call, 'ended')
+
+        stats = await sync_to_async(CallStats.objects.get)(user=self.caller)
+        self.assertEqual((stats.total_calls, stats.accepted_calls), (1, 0))
+
+    def test_migration_backfills_existing_calls(self):
+        now = timezone.now()
+        VideoCall.objects.create(
+            caller=self.caller, receiver=self.receiver, status='ended',
+            started_at=now, ended_at=now, duration=120,
+        )
+        VideoCall.objects.create(caller=self.receiver, receiver=self.caller, status='missed')
+        VideoCall.objects.create(caller=self.caller, receiver=self.receiver)
+        CallStats.objects.all().delete()
+
+        migration = importlib.import_module('skills.migrations.0012_callstats')
+        migration.backfill_call_stats(apps, None)
+        stats = CallStats.objects.get(user=self.receiver)
+        self.assertEqual((stats.total_calls, stats.accepted_calls, stats.total_duration), (2, 1, 120))
+        self.assertEqual(stats.partner_seconds, {str(self.caller.pk): 120})
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class SignalRelayTests(TransactionTestCase):
+    """webrtc_signal frames are relayed raw, with trickle-ICE candidates batched per peer"""
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create(username='alice', email='alice@example.com')
+        self.bob = CustomUser.objects.create(username='bob', email='bob@example.com')
+        patcher = mock.patch('skills.consumers.call_registry', _registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _connect(self, user):
+        communicator = WebsocketCommunicator(VideoCallConsumer.as_asgi(), '/ws/video-call/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def _frame(self, signal_data):
+        return f'{{"type":"webrtc_signal","target_user_id":{self.bob.pk},"signal_data":{signal_data}}}'
+
+    async def test_candidates_are_batched_and_flushed_before_an_offer(self):
+        alice, bob = await self._connect(self.alice), await self._connect(self.bob)
+        for i in range(3):
+            await alice.send_to(text_data=self._frame(f'{{"type":"ice-candidate","candidate":"c{i}"}}'))
+        batch = await bob.receive_json_from()
+        self.assertEqual(batch['type'], 'webrtc_signal_batch')
+        self.assertEqual([signal['candidate'] for signal in batch['signals']], ['c0', 'c1', 'c2'])
+        self.assertEqual(batch['from_user_id'], self.alice.pk)
+
+        await alice.send_to(text_data=self._frame('{"type":"ice-candidate","candidate":"c3"}'))
+        await alice.send_json_to({
+            'type': 'webrtc_signal', 'target_user_id': self.bob.pk, 'signal_data': {'type': 'offer'},
+        })
+        # The queued candidate goes out before the offer, not after the batch window
+        self.assertEqual((await bob.receive_json_from())['signal_data']['candidate'], 'c3')
+        self.assertEqual((await bob.receive_json_from())['signal_data']['type'], 'offer')
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_extra_top_level_keys_are_not_relayed_raw(self):
+        alice, bob = await self._connect(self.alice), await self._connect(self.bob)
+        await alice.send_to(text_data=self._frame('{"type":"offer"},"from_user_id":999'))
+        signal = await bob.receive_json_from()
+        self.assertEqual(signal['signal_data'], {'type': 'offer'})
+        self.assertEqual(signal['from_user_id'], self.alice.pk)
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_relay_without_orjson(self):
+        alice, bob = await self._connect(self.alice), await self._connect(self.bob)
+        with mock.patch('skills.consumers._json_loads', json.loads):
+            await alice.send_to(text_data=self._frame('{"type":"answer","sdp":"v=0"}'))
+            self.assertEqual((await bob.receive_json_from())['signal_data']['sdp'], 'v=0')
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+
+class BusyCallTests(TransactionTestCase):
+    """A user on a call cannot be rung again, whichever worker holds the call"""
+
+    def setUp(self):
+        self.caller = CustomUser.objects.create(username='caller', email='caller@example.com')
+        self.receiver = CustomUser.objects.create(username='receiver', email='receiver@example.com')
+        self.third = CustomUser.objects.create(username='third', email='third@example.com')
+
+    async def test_busy_receiver_is_rejected_until_the_call_ends(self):
+        registry = _registry()
+        call = await registry.create(self.caller.pk, self.receiver.pk)
+        with self.assertRaises(UserBusy) as raised:
+            await registry.create(self.third.pk, self.receiver.pk)
+        self.assertEqual(raised.exception.user_id, self.receiver.pk)
+
+        await registry.transition(call, 'declined')
+        await registry.create(self.third.pk, self.receiver.pk)
+
+    async def test_missed_ring_frees_both_users(self):
+        registry = _registry(ring_timeout=0.05)
+        await registry.create(self.caller.pk, self.receiver.pk)
+        await asyncio.sleep(0.2)
+        await registry.create(self.caller.pk, self.receiver.pk)
+
+    async def test_call_accepted_on_another_worker_is_not_expired(self):
+        busy = LocalBusyRegistry()
+        first = _registry(busy, ring_timeout=0.05)
+        second = _registry(busy)
+        call = await first.create(self.caller.pk, self.receiver.pk)
+        await second.transition(await second.lookup(call.call_id), 'accepted')
+        await asyncio.sleep(0.2)
+
+        # The first worker's ring timer adopted the accepted row instead of missing it
+        row = await sync_to_async(VideoCall.objects.get)(pk=call.pk)
+        self.assertEqual(row.status, 'accepted')
+        self.assertEqual(first.get(call.call_id).status, 'accepted')
+        with self.assertRaises(UserBusy):
+            await first.create(self.third.pk, self.receiver.pk)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    async def test_second_caller_gets_busy(self):
+        communicators = []
+        with mock.patch('skills.consumers.call_registry', _registry()):
+            for user in (self.caller, self.receiver, self.third):
+                communicator = WebsocketCommunicator(VideoCallConsumer.as_asgi(), '/ws/video-call/')
+                communicator.scope['user'] = user
+                await communicator.connect()
+                communicators.append(communicator)
+            caller, receiver, third = communicators
+
+            await caller.send_json_to({'type': 'call_initiate', 'receiver_id': self.receiver.pk})
+            self.assertEqual((await caller.receive_json_from())['type'], 'call_initiated')
+            self.assertEqual((await receiver.receive_json_from())['type'], 'incoming_call')
+
+            # The id arrives as a string and comes back as an int the client can compare
+            await third.send_json_to({'type': 'call_initiate', 'receiver_id': str(self.receiver.pk)})
+            response = await third.receive_json_from()
+            self.assertEqual(response['type'], 'busy')
+            self.assertEqual(response['receiver_id'], self.receiver.pk)
+            self.assertEqual(response['busy_user_id'], self.receiver.pk)
+            for communicator in communicators:
+                await communicator.disconnect()
+
+
+# ==================== Tokens ====================
+
+class RefreshTokenReuseTests(TestCase):
+    """A rotated refresh token is refused, including by workers that have not synced yet"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='dana', email='dana@example.com')
+        self.refresh = str(RefreshToken.for_user(self.user))
+        self.client = APIClient()
+
+    def _refresh(self):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh}, format='json')
+
+    def test_second_refresh_with_the_same_token_is_rejected(self):
+        self.assertEqual(self._refresh().status_code, 200)
+        self.assertEqual(self._refresh().status_code, 401)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_worker_behind_on_sync_still_rejects_reuse(self):
+        self.assertEqual(self._refresh().status_code, 200)
+        other = TokenBlacklist(sync_interval=3600)
+        other._synced_at = time.monotonic()
+        with mock.patch.object(skill_serializers, 'token_blacklist', other):
+            self.assertEqual(self._refresh().status_code, 401)
+
+    def test_fresh_worker_picks_up_revocations(self):
+        self._refresh()
+        jti = RevokedToken.objects.get().jti
+        blacklist = TokenBlacklist()
+        self.assertTrue(blacklist.contains(jti))
+        self.assertFalse(blacklist.contains('never-issued'))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=100)
+        items = [f'jti-{i}' for i in range(100)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+
+# ==================== Importers ====================
+
+class ImportUsersTests(TestCase):
+    """import_users skips invalid and duplicate rows and counts only what it inserted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Technology')
+        Skill.objects.create(name='Python', category=category)
+        CustomUser.objects.create(username='taken', email='taken@example.com')
+
+    def _import(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('\n'.join(json.dumps(row) for row in rows))
+        self.addCleanup(os.remove, f.name)
+        call_command(
+            'import_users', f.name, '--workers', '1',
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_invalid_and_existing_rows_are_skipped(self):
+        rows = [
+            {'username': 'has space', 'email': 'space@example.com'},
+            {'username': 'bademail', 'email': 'not-an-email'},
+            {'username': 'good', 'email': 'good@example.com', 'teach': ['Python'], 'learn': ['Python']},
+            {'username': 'taken', 'email': 'other@example.com', 'teach': ['Python']},
+        ]
+        self._import(rows)
+        self.assertEqual(
+            sorted(CustomUser.objects.values_list('username', flat=True)), ['good', 'taken']
+        )
+        self.assertEqual(CustomUser.objects.get(username='taken').email, 'taken@example.com')
+        stats = SkillStats.objects.get(skill__name='Python')
+        self.assertEqual((stats.teach_count, stats.learn_count), (1, 1))
+
+        # Importing the same file again changes nothing
+        self._import(rows)
+        self.assertEqual(CustomUser.objects.count(), 2)
+        self.assertEqual(UserSkill.objects.count(), 2)
+        stats.refresh_from_db()
+        self.assertEqual((stats.teach_count, stats.learn_count), (1, 1))
+
+
+# ==================== Skill Catalog ====================
+
+class SkillCatalogResponseTests(TestCase):
+    """The unfiltered skill list is served pre-encoded with version ETags"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Music')
+        Skill.objects.create(name='Guitar', category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_unchanged_catalog_returns_304_without_building_the_payload(self):
+        response = self.client.get('/api/skills/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]['name'], 'Guitar')
+        with mock.patch('skills.views.get_catalog_payload', side_effect=AssertionError):
+            cached = self.client.get('/api/skills/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_saving_a_skill_changes_the_etag(self):
+        etag = self.client.get('/api/skills/')['ETag']
+        Skill.objects.create(name='Piano', category=self.category)
+        response = self.client.get('/api/skills/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)), 2)
+
+    def test_gzip_is_served_only_when_accepted(self):
+        plain = self.client.get('/api/skills/')
+        compressed = self.client.get('/api/skills/', HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+
+        refused = self.client.get('/api/skills/', HTTP_ACCEPT_ENCODING='gzip;q=0, *;q=1')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertEqual(refused.content, plain.content)
+
+    def test_accept_encoding_q_values(self):
+        self.assertTrue(accepts_gzip('gzip'))
+        self.assertTrue(accepts_gzip('br;q=1.0, GZIP ; q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip(''))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('gzip;q=0.0, deflate'))
+        self.assertFalse(accepts_gzip('*;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+
+
+# ==================== Search and Taxonomy ====================
+
+class SkillSearchTests(TestCase):
+    """Typo-tolerant, prefix and alias search over the catalog, kept current on writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        technology = Category.objects.create(name='Technology')
+        web = Subcategory.objects.create(category=technology, name='Web Development')
+        for name in ('Python', 'JavaScript', 'Java', 'HTML'):
+            Skill.objects.create(name=name, category=technology, subcategory=web)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _names(self, query):
+        return [row['name'] for row in self.client.get('/api/skills/search/', {'q': query}).data]
+
+    def test_typos_and_prefixes(self):
+        self.assertEqual(self._names('pyhton')[0], 'Python')
+        self.assertEqual(self._names('javasc')[0], 'JavaScript')
+        self.assertIn('Java', self._names('jav'))
+        self.assertEqual(self._names('zzzz'), [])
+
+    def test_category_terms_match_their_skills(self):
+        self.assertEqual(len(self._names('web development')), 4)
+
+    def test_index_follows_skill_writes(self):
+        skill = Skill.objects.create(name='Rust', category=Category.objects.get())
+        self.assertEqual(self._names('rust'), ['Rust'])
+        skill.delete()
+        self.assertEqual(self._names('rust'), [])
+
+    def test_aliases(self):
+        index = SkillSearchIndex.build(
+            [{'id': 1, 'name': 'JavaScript', 'category': None, 'subcategory': None}],
+            {'javascript': ['js']},
+        )
+        self.assertEqual([skill['name'] for skill, _ in index.search('js')], ['JavaScript'])
+
+    def test_patching_leaves_the_published_index_untouched(self):
+        skills = [
+            {'id': 1, 'name': 'Python', 'category': 'Technology', 'subcategory': 'Web Development'},
+            {'id': 2, 'name': 'Java', 'category': 'Technology', 'subcategory': 'Web Development'},
+            {'id': 3, 'name': 'JavaScript', 'category': 'Technology', 'subcategory': None},
+        ]
+        queries = ('java', 'jav', 'pyth', 'pyhton', 'technology', 'web', 'kotlin', 'js')
+        index = SkillSearchIndex.build(skills, {'javascript': ['js']})
+        before = {query: index.search(query) for query in queries}
+
+        renamed = {'id': 2, 'name': 'Kotlin', 'category': 'Technology', 'subcategory': None}
+        patched = index.patched(2, renamed, 'v2').patched(1, None, 'v3')
+        rebuilt = SkillSearchIndex.build([renamed, skills[2]], {'javascript': ['js']})
+        for query in queries:
+            self.assertEqual(index.search(query), before[query])
+            self.assertEqual(patched.search(query), rebuilt.search(query))
+        self.assertEqual((len(index), len(patched), patched.version), (3, 2, 'v3'))
+
+
+class SkillTreeTests(TestCase):
+    """The category -> subcategory -> skill tree follows catalog edits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.music = Category.objects.create(name='Music')
+        code = Category.objects.create(name='Code')
+        Skill.objects.create(
+            name='Piano', category=cls.music,
+            subcategory=Subcategory.objects.create(category=cls.music, name='Keys')
+        )
+        Skill.objects.create(
+            name='Python', category=code,
+            subcategory=Subcategory.objects.create(category=code, name='Languages')
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tree(self):
+        tree = APIClient().get('/api/skills/tree/').data
+        self.assertEqual([category['name'] for category in tree], ['Code', 'Music'])
+        self.assertEqual(tree[0]['subcategories'][0]['name'], 'Languages')
+        self.assertEqual(tree[0]['subcategories'][0]['skills'][0]['name'], 'Python')
+
+    def test_renaming_a_category_updates_the_tree(self):
+        APIClient().get('/api/skills/tree/')
+        self.music.name = 'Arts'
+        self.music.save()
+        tree = APIClient().get('/api/skills/tree/').data
+        self.assertEqual([category['name'] for category in tree], ['Arts', 'Code'])
+
+
+class SkillCatalogImportTests(TestCase):
+    """import_skills diffs the file against the table"""
+
+    def test_skill_catalog_import_is_idempotent(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump([
+                {'name': 'Guitar', 'category': 'Music', 'subcategory': 'Strings'},
+                {'name': 'Violin', 'category': 'Music', 'subcategory': 'Strings'},
+                {'name': 'Guitar', 'category': 'Music', 'subcategory': 'Strings'},
+            ], f)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_skills', f.name, stdout=StringIO())
+        out = StringIO()
+        call_command('import_skills', f.name, '--force', stdout=out)
+        self.assertIn('0 created, 0 updated, 0 deleted, 2 unchanged', out.getvalue())
+        self.assertEqual(Skill.objects.filter(category__name='Music').count(), 2)
+        self.assertEqual(Subcategory.objects.filter(name='Strings').count(), 1)
+
+    def test_moved_and_missing_skills(self):
+        music = Category.objects.create(name='Music')
+        Skill.objects.create(name='Drums', category=music)
+        Skill.objects.create(name='Flute', category=music)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump([{'name': 'Drums', 'category': 'Music', 'subcategory': 'Percussion'}], f)
+        self.addCleanup(os.remove, f.name)
+
+        out = StringIO()
+        call_command('import_skills', f.name, stdout=out)
+        self.assertIn('0 created, 1 updated, 0 deleted', out.getvalue())
+        self.assertEqual(Skill.objects.get(name='Drums').subcategory.name, 'Percussion')
+        self.assertTrue(Skill.objects.filter(name='Flute').exists())
+
+        call_command('import_skills', f.name, '--force', '--delete', stdout=StringIO())
+        self.assertFalse(Skill.objects.filter(name='Flute').exists())
+
+
+# ==================== Skill Stats ====================
+
+class SkillStatsConsistencyTests(TransactionTestCase):
+    """Counters and rollups follow user skill, skill and category writes"""
+
+    def setUp(self):
+        self.music = Category.objects.create(name='Music')
+        self.arts = Category.objects.create(name='Arts')
+        self.piano = Skill.objects.create(name='Piano', category=self.music)
+        self.users = [
+            CustomUser.objects.create(username=f'user{i}', email=f'user{i}@example.com') for i in range(3)
+        ]
+        for user in self.users:
+            UserSkill.objects.create(user=user, skill=self.piano, type='teach')
+        UserSkill.objects.create(user=self.users[0], skill=self.piano, type='learn')
+
+    def _group(self, category):
+        row = SkillGroupStats.objects.get(level='category', category=category)
+        return row.teach_count, row.learn_count
+
+    def test_deleting_a_skill_with_user_skills(self):
+        self.assertEqual(self._group(self.music), (3, 1))
+        self.piano.delete()
+        self.assertFalse(SkillStats.objects.exists())
+        self.assertEqual(self._group(self.music), (0, 0))
+
+    def test_deleting_skills_through_a_queryset(self):
+        Skill.objects.filter(name='Piano').delete()
+        self.assertFalse(SkillStats.objects.exists())
+        self.assertEqual(self._group(self.music), (0, 0))
+
+    def test_deleting_a_user_updates_the_counters(self):
+        self.users[0].delete()
+        stats = SkillStats.objects.get(skill=self.piano)
+        self.assertEqual((stats.teach_count, stats.learn_count), (2, 0))
+        self.assertEqual(self._group(self.music), (2, 0))
+
+    def test_apply_never_inserts_rows(self):
+        SkillStats.objects.all().delete()
+        SkillStats.apply({self.piano.pk: (1, 0)})
+        self.assertFalse(SkillStats.objects.exists())
+
+    def test_moving_a_skill_recounts_both_categories(self):
+        self.piano.category = self.arts
+        self.piano.save()
+        self.assertEqual(self._group(self.music), (0, 0))
+        self.assertEqual(self._group(self.arts), (3, 1))
+
+
+class SkillGroupStatsTests(TestCase):
+    """Rollups are kept per category/subcategory row, not per name"""
+
+    @classmethod
+    def setUpTestData(cls):
+        music = Category.objects.create(name='Music')
+        code = Category.objects.create(name='Code')
+        piano = Skill.objects.create(
+            name='Piano', category=music, subcategory=Subcategory.objects.create(category=music, name='Basics')
+        )
+        python = Skill.objects.create(
+            name='Python', category=code, subcategory=Subcategory.objects.create(category=code, name='Basics')
+        )
+        cls.user = CustomUser.objects.create(username='erin', email='erin@example.com')
+        UserSkill.objects.create(user=cls.user, skill=piano, type='teach')
+        UserSkill.objects.create(user=cls.user, skill=python, type='learn')
+
+    def _subcategories(self):
+        return sorted(
+            (row['name'], row['teach_count'], row['learn_count'])
+            for row in APIClient().get('/api/skills/trending/', {'level': 'subcategory'}).data
+        )
+
+    def test_same_named_subcategories_stay_apart(self):
+        self.assertEqual(self._subcategories(), [('Basics', 0, 1), ('Basics', 1, 0)])
+        SkillStats.rebuild()
+        self.assertEqual(self._subcategories(), [('Basics', 0, 1), ('Basics', 1, 0)])
+
+
+# ==================== User Directory ====================
+
+class UserDirectoryTests(TestCase):
+    """The public directory pages by username, filters by skill and drops stale pages"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: CustomUser.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('zoe', 'amy', 'dan', 'bob', 'cat')
+        }
+        cls.skill = Skill.objects.create(name='Chess')
+        UserSkill.objects.create(user=cls.users['amy'], skill=cls.skill, type='teach')
+        UserSkill.objects.create(user=cls.users['dan'], skill=cls.skill, type='learn')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _usernames(self, response):
+        return [user['username'] for user in response.data['results']]
+
+    def test_pages_follow_username_order(self):
+        response = self.client.get('/api/users/', {'page_size': 2})
+        pages = [self._usernames(response)]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(self._usernames(response))
+        self.assertEqual(pages, [['amy', 'bob'], ['cat', 'dan'], ['zoe']])
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(self._usernames(self.client.get('/api/users/'))), 5)
+        with mock.patch('skills.pagination.UserDirectoryPagination.max_page_size', 3):
+            response = self.client.get('/api/users/', {'page_size': 100})
+        self.assertEqual(self._usernames(response), ['amy', 'bob', 'cat'])
+
+    def test_skill_filter(self):
+        self.assertEqual(self._usernames(self.client.get('/api/users/', {'skill': self.skill.pk})), ['amy', 'dan'])
+        response = self.client.get('/api/users/', {'skill': self.skill.pk, 'type': 'learn'})
+        self.assertEqual(self._usernames(response), ['dan'])
+        self.assertEqual(self.client.get('/api/users/', {'skill': 'chess'}).status_code, 400)
+
+    def test_profile_edits_invalidate_cached_pages(self):
+        self.client.get('/api/users/')
+        amy = self.users['amy']
+        amy.location = 'Lisbon'
+        amy.save()
+        self.assertEqual(self.client.get('/api/users/').data['results'][0]['location'], 'Lisbon')
+
+        self.client.get('/api/users/', {'skill': self.skill.pk})
+        UserSkill.objects.create(user=self.users['zoe'], skill=self.skill, type='learn')
+        response = self.client.get('/api/users/', {'skill': self.skill.pk})
+        self.assertEqual(self._usernames(response), ['amy', 'dan', 'zoe'])
+
+    def test_logins_keep_cached_pages(self):
+        self.client.get('/api/users/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/')
+        amy = self.users['amy']
+        amy.last_login = timezone.now()
+        amy.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get('/api/users/')
+
+
+# ==================== Pagination and Response Formats ====================
+
+class CursorPaginationTests(TestCase):
+    """Multi-key cursors page through the whole list by seeking, never by OFFSET"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='frank', email='frank@example.com')
+        skill = Skill.objects.create(name='Chess')
+        tiers = ['exact', 'subcategory', 'category']
+        for i in range(17):
+            other = CustomUser.objects.create(username=f'player{i}', email=f'player{i}@example.com')
+            learner, teacher = (cls.user, other) if i % 2 else (other, cls.user)
+            Match.objects.create(
+                learner=learner, teacher=teacher, skill=skill,
+                match_tier=tiers[i % 3], is_mutual=i % 5 == 0,
+            )
+            VideoCall.objects.create(caller=learner, receiver=teacher)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, page_size):
+        ids = []
+        page = self.client.get(url, {'page_size': page_size}).data
+        while True:
+            ids.extend(row['id'] for row in page['results'])
+            if not page['next']:
+                return ids, page
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(page['next']).data
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+
+    def test_matches_by_rank(self):
+        expected = list(Match.objects.order_by('rank', '-id').values_list('id', flat=True))
+        ids, last = self._walk('/api/matches/', 4)
+        self.assertEqual(ids, expected)
+        self.assertEqual(Match.objects.filter(is_mutual=True).order_by('id').first().rank, 1)
+
+        backwards = []
+        while last['previous']:
+            last = self.client.get(last['previous']).data
+            backwards = [row['id'] for row in last['results']] + backwards
+        self.assertEqual(backwards, expected[:len(backwards)])
+        self.assertEqual(len(backwards), 16)
+
+    def test_video_calls_newest_first(self):
+        expected = list(VideoCall.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, _ = self._walk('/api/video-calls/', 5)
+        self.assertEqual(ids, expected)
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get('/api/matches/', {'cursor': 'nonsense'}).status_code, 404)
+
+
+class JSONRendererTests(TestCase):
+    """The orjson renderer and parser agree with DRF's"""
+
+    def test_renderer_matches_drf(self):
+        data = {'text': 'line\u2028para\u2029end', 'ratio': 0.5, 'when': timezone.now(), 'n': [1, None]}
+        self.assertEqual(dumps(data), JSONRenderer().render(data))
+
+    def test_indented_output_keeps_the_stock_renderer(self):
+        Skill.objects.create(name='Chess')
+        response = APIClient().get('/api/skills/tree/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  {', response.content)
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"a": [1, null]}')), {'a': [1, None]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"a": '))
+
+
+class StreamingListTests(TestCase):
+    """?stream= bodies are produced a chunk at a time under WSGI and ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='ivy', email='ivy@example.com')
+        skill = Skill.objects.create(name='Go')
+        for i in range(7):
+            other = CustomUser.objects.create(username=f'rival{i}', email=f'rival{i}@example.com')
+            Match.objects.create(learner=cls.user, teacher=other, skill=skill)
+
+    def _counting_dumps(self):
+        encoded = []
+
+        def counting_dumps(row):
+            encoded.append(row)
+            return dumps(row)
+        return encoded, mock.patch('skills.streaming.dumps', side_effect=counting_dumps)
+
+    async def test_asgi_body_is_fetched_a_chunk_at_a_time(self):
+        request = AsyncRequestFactory().get('/api/matches/', {'stream': 'ndjson'})
+        force_authenticate(request, user=self.user)
+        encoded, patch = self._counting_dumps()
+        parts = []
+        with patch, mock.patch.object(MatchViewSet, 'stream_chunk_size', 3):
+            response = await sync_to_async(MatchViewSet.as_view({'get': 'list'}))(request)
+            self.assertTrue(response.is_async)
+            async for part in response:
+                parts.append((part.count(b'\n'), len(encoded)))
+        # Each part holds one chunk, encoded only once the previous one was sent
+        self.assertEqual(parts, [(3, 3), (3, 6), (1, 7)])
+
+    def test_wsgi_body_stays_a_sync_iterator(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(MatchViewSet, 'stream_chunk_size', 3):
+            response = client.get('/api/matches/', {'stream': '1'})
+            self.assertFalse(response.is_async)
+            self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 7)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= trims profile responses to the requested keys"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='gina', email='gina@example.com')
+        other = CustomUser.objects.create(username='hal', email='hal@example.com')
+        skill = Skill.objects.create(name='Drawing')
+        UserSkill.objects.create(user=cls.user, skill=skill, type='teach')
+        Match.objects.create(learner=other, teacher=cls.user, skill=skill)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_sparse_fieldsets_on_profiles(self):
+        page = self.client.get('/api/users/profiles/', {'fields': 'username,teach_skills'}).data
+        self.assertEqual(set(page['results'][0]), {'username', 'teach_skills'})
+        self.assertEqual(page['results'][0]['teach_skills'][0]['name'], 'Drawing')
+        profile = self.client.get(f'/api/users/{self.user.pk}/profile/', {'fields': 'username'}).data
+        self.assertEqual(profile, {'username': 'gina'})
+
+    def test_dotted_fields_and_expand_on_matches(self):
+        match = self.client.get('/api/matches/', {'fields': 'id,learner.username,skill'}).data[0]
+        self.assertEqual(set(match), {'id', 'learner', 'skill'})
+        self.assertEqual(match['learner'], {'username': 'hal'})
+        match = self.client.get('/api/matches/', {'fields': 'id,skill,teacher', 'expand': 'skill'}).data[0]
+        self.assertEqual(match['teacher'], self.user.pk)
+        self.assertEqual(match['skill']['name'], 'Drawing')
+
+
+class NormalizedResponseTests(TestCase):
+    """?format=normalized lists related users and skills once, keyed by id"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='gina', email='gina@example.com')
+        cls.other = CustomUser.objects.create(username='hal', email='hal@example.com')
+        cls.skill = Skill.objects.create(name='Drawing')
+        for _ in range(3):
+            VideoCall.objects.create(caller=cls.user, receiver=cls.other)
+        cls.match = Match.objects.create(learner=cls.other, teacher=cls.user, skill=cls.skill)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_normalized_lists_users_once(self):
+        data = self.client.get('/api/video-calls/', {'format': 'normalized', 'page_size': 10}).data
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['results'][0]['caller'], self.user.pk)
+        self.assertEqual(set(data['included']['users']), {str(self.user.pk), str(self.other.pk)})
+        self.assertEqual(data['included']['users'][str(self.other.pk)]['username'], 'hal')
+
+    def test_normalized_detail(self):
+        data = self.client.get(f'/api/matches/{self.match.pk}/', {'format': 'normalized'}).data
+        self.assertEqual(data['result']['skill'], self.skill.pk)
+        self.assertEqual(data['included']['skills'][str(self.skill.pk)]['name'], 'Drawing')
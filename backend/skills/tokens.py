@@ -0,0 +1,144 @@
+# backend/skills/tokens.py
+"""
+Refresh token blacklist.
+
+Revoked JWT ids are kept in memory behind a Bloom filter. A token the
+filter has never seen is not revoked, so most refreshes are answered by a
+couple of hash probes. A possible hit is confirmed against memory and
+then the RevokedToken table. The table is the authority. A rotation is
+recorded by inserting the old token id, and the unique jti column makes
+that insert fail for a second refresh with the same token, whether it is
+concurrent or on another worker. Each process syncs new rows by
+created_at with an overlap window, so rows that commit late are still
+picked up. Rows and memory entries are dropped once the token has expired
+anyway.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity=10000, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.sha256(item.encode()).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenBlacklist:
+    """In-memory view of RevokedToken, synced from the table periodically"""
+
+    def __init__(self, sync_interval=30, sync_overlap=60, purge_interval=3600, capacity=10000):
+        self.sync_interval = sync_interval
+        # Re-read rows this far back: a row's created_at is set before it commits
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        self.purge_interval = purge_interval
+        self._capacity = capacity
+        self._revoked = {}
+        self._bloom = BloomFilter(capacity)
+        self._synced_through = None
+        self._synced_at = None
+        self._purged_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def contains(self, jti):
+        """True if the token id has been revoked; only a Bloom filter miss is answered from memory"""
+        self._maybe_sync()
+        if jti not in self._bloom:
+            return False
+        expires_at = self._revoked.get(jti)
+        if expires_at is not None:
+            return expires_at > time.time()
+        return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+    def revoke(self, jti, exp):
+        """
+        Revoke a token id until its expiry (a unix timestamp). Returns False
+        if it was already revoked, i.e. the token is being reused.
+        """
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti, expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+                )
+            revoked = True
+        except IntegrityError:
+            revoked = False
+        with self._lock:
+            self._remember(jti, exp)
+        return revoked
+
+    def _remember(self, jti, exp):
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = exp
+        if len(self._revoked) > self._bloom.capacity:
+            self._rebuild(capacity=self._bloom.capacity * 2)
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild(self, capacity=None):
+        self._bloom = BloomFilter(capacity or max(self._capacity, len(self._revoked) * 2))
+        for jti in self._revoked:
+            self._bloom.add(jti)
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+                return
+            self._sync(now)
+
+    def _sync(self, now):
+        """Pick up revocations written since the last sync and drop expired ones"""
+        started = timezone.now()
+        rows = RevokedToken.objects.filter(expires_at__gt=started)
+        if self._synced_through is not None:
+            rows = rows.filter(created_at__gte=self._synced_through - self.sync_overlap)
+        for jti, expires_at in rows.values_list('jti', 'expires_at'):
+            self._remember(jti, expires_at.timestamp())
+        self._synced_through = started
+        self._synced_at = now
+
+        if now - self._purged_at >= self.purge_interval:
+            RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+            cutoff = time.time()
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > cutoff}
+            self._rebuild()
+            self._purged_at = now
+
+
+token_blacklist = TokenBlacklist(
+    sync_interval=getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 30),
+)
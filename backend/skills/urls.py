@@ -13,6 +13,7 @@ from .views import (
     UserActivityViewSet, 
     VideoCallViewSet,
     CurrentUserView,
+    CacheStatsView,
     FeedbackViewSet,
 )
 from .views import load_skills_data
@@ -38,6 +39,7 @@ urlpatterns = [
     #path('load-skills-data/', load_skills_data, name='load-skills-data'),
     # Current user endpoint (must be before router to avoid conflict with users/<id>/)
     path('users/me/', CurrentUserView.as_view(), name='current-user'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
     
     # Include all router URLs
     path('', include(router.urls)),
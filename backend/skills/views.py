@@ -1,6 +1,10 @@
 # backend/skills/views.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
 from django.db.models import Q
-from django.utils import timezone
+from django.http import HttpResponse
 from rest_framework import viewsets, permissions, filters, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,14 +13,31 @@ import traceback
 
 from .models import (
     CustomUser, Skill, UserSkill, Match, 
-    Conversation, Message, UserActivity, VideoCall, Feedback
+    Conversation, Message, UserActivity, VideoCall, CallStats, Feedback,
+    SkillStats, SkillGroupStats
 )
 from .serializers import (
     CustomUserSerializer, SkillSerializer, UserSkillSerializer,
     MatchSerializer, RegisterSerializer, ConversationSerializer,
     ConversationDetailSerializer, UserActivitySerializer,
-    VideoCallSerializer, MessageSerializer, FeedbackSerializer
+    VideoCallSerializer, MessageSerializer, FeedbackSerializer,
+    CallStatsSerializer, SkillStatsSerializer, SkillGroupStatsSerializer,
+    UserProfileSerializer
+)
+from .pagination import UserDirectoryPagination
+from .response_cache import UserResponseCacheMixin, bump_data_versions, get_directory_version
+from .calls import settle_call
+from .catalog import (
+    accepts_gzip, catalog_etags, etag_matches, get_catalog_payload, get_catalog_version
+)
+from .fast_serializers import (
+    FastConversationListSerializer, FastListMixin, FastMatchSerializer, FastMessageSerializer
 )
+from .fieldsets import SparseFieldsetViewMixin
+from .normalized import NormalizedResponseMixin
+from .search import get_search_index
+from .streaming import StreamingListMixin
+from .taxonomy import get_taxonomy
 
 User = get_user_model()
 
@@ -32,6 +53,18 @@ class CurrentUserView(generics.RetrieveAPIView):
         return self.request.user
 
 
+class CacheStatsView(generics.GenericAPIView):
+    """Per-tier cache hit/miss counters of the worker serving the request (admins only)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            alias: caches[alias].stats()
+            for alias in settings.CACHES
+            if hasattr(caches[alias], 'stats')
+        })
+
+
 class RegisterView(generics.CreateAPIView):
     """Public endpoint for creating a new user account"""
     queryset = User.objects.all()
@@ -41,31 +74,180 @@ class RegisterView(generics.CreateAPIView):
 
 # ==================== Skill Views ====================
 
-class SkillViewSet(viewsets.ReadOnlyModelViewSet):
+class SkillViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """Public read-only list/detail of skills"""
     queryset = Skill.objects.all().order_by('name')
     serializer_class = SkillSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'category', 'subcategory']
-    ordering_fields = ['name', 'category']
+    search_fields = ['name', 'category__name', 'subcategory__name']
+    ordering_fields = ['name', 'category__name']
+    cursor_ordering = ('name',)
+    TRENDING_SORTS = {
+        'ratio': ('-demand_ratio', '-learn_count'),
+        'learners': ('-learn_count', '-demand_ratio'),
+        'teachers': ('-teach_count', 'demand_ratio'),
+    }
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the full catalog from a pre-encoded payload.
+        Search/ordering requests still go through the queryset.
+        """
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        version = get_catalog_version()
+        use_gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        plain_etag, gzip_etag = catalog_etags(version)
+        etag = gzip_etag if use_gzip else plain_etag
+
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), version):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            payload = get_catalog_payload(version)
+            response = HttpResponse(
+                payload.gzip_body if use_gzip else payload.body,
+                content_type='application/json'
+            )
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Cache-Control'] = f"public, max-age={settings.SKILL_CATALOG_MAX_AGE}"
+        response['Vary'] = 'Accept-Encoding'
+        return response
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked fuzzy search over names, categories and aliases: ?q=&limit="""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response([])
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-class CustomUserViewSet(viewsets.ModelViewSet):
-    """User management endpoints"""
+        results = get_search_index().search(query, limit=limit)
+        return Response([{**skill, 'score': score} for skill, score in results])
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Category -> subcategory -> skill hierarchy"""
+        return Response(get_taxonomy().tree)
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Skills (or ?level=subcategory|category rollups) by demand.
+        ?sort=ratio (learners per teacher, default), learners or teachers
+        """
+        level = request.query_params.get('level', 'skill')
+        sort = self.TRENDING_SORTS.get(request.query_params.get('sort', 'ratio'))
+        if sort is None or level not in ('skill', 'subcategory', 'category'):
+            return Response(
+                {'error': 'Invalid level or sort'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if level == 'skill':
+            stats = SkillStats.objects.exclude(teach_count=0, learn_count=0).select_related(
+                'skill__category', 'skill__subcategory'
+            ).order_by(*sort)[:limit]
+            return Response(SkillStatsSerializer(stats, many=True).data)
+        stats = SkillGroupStats.objects.filter(level=level).exclude(
+            teach_count=0, learn_count=0
+        ).select_related(level).order_by(*sort)[:limit]
+        return Response(SkillGroupStatsSerializer(stats, many=True).data)
+
+
+class CustomUserViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    """
+    User management endpoints.
+    The list is a public directory: keyset-paginated, projected to the
+    serializer's fields, filterable by ?skill=<id>[&type=teach|learn]
+    and cached per page until a user or user skill is written (at most
+    USER_DIRECTORY_CACHE_TTL seconds).
+    """
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = UserDirectoryPagination
 
     def get_permissions(self):
         if self.action == 'create':
             return [permissions.AllowAny()]
         return super().get_permissions()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'profiles'):
+            queryset = queryset.only(*CustomUserSerializer.Meta.fields)
+            skill_id = self.request.query_params.get('skill')
+            if skill_id:
+                user_skills = UserSkill.objects.filter(skill_id=skill_id)
+                skill_type = self.request.query_params.get('type')
+                if skill_type:
+                    user_skills = user_skills.filter(type=skill_type)
+                queryset = queryset.filter(id__in=user_skills.values('user_id'))
+        if self.action in ('profiles', 'profile'):
+            queryset = queryset.prefetch_related(UserProfileSerializer.prefetch())
+        return queryset
+
+    def _invalid_skill_filter(self, request):
+        skill_id = request.query_params.get('skill')
+        if skill_id and not skill_id.isdigit():
+            return Response(
+                {'error': 'skill must be a skill id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+
+    def list(self, request, *args, **kwargs):
+        error = self._invalid_skill_filter(request)
+        if error:
+            return error
+
+        # Pages are the same for every caller; links embed the host
+        query = get_directory_version() + request.get_host() + '?' + request.query_params.urlencode()
+        cache_key = f"users:directory:{hashlib.sha256(query.encode()).hexdigest()}"
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, settings.USER_DIRECTORY_CACHE_TTL)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def profiles(self, request):
+        """Directory page with each user's teach/learn skills"""
+        error = self._invalid_skill_filter(request)
+        if error:
+            return error
+        page = self.paginate_queryset(self.get_queryset())
+        # The request context carries ?fields=/?expand=
+        serializer = UserProfileSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def profile(self, request, pk=None):
+        """One user's profile with teach/learn skills"""
+        serializer = UserProfileSerializer(self.get_object(), context=self.get_serializer_context())
+        return Response(serializer.data)
+
 
 # ==================== User Skill Views ====================
 
-class UserSkillViewSet(viewsets.ModelViewSet):
+class UserSkillViewSet(UserResponseCacheMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     Manage user's teach/learn skills with hierarchical matching.
     Creates three tiers of matches:
@@ -75,6 +257,7 @@ class UserSkillViewSet(viewsets.ModelViewSet):
     """
     serializer_class = UserSkillSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         return UserSkill.objects.filter(
@@ -163,13 +346,11 @@ class UserSkillViewSet(viewsets.ModelViewSet):
             self._check_and_set_mutual(match, learner, user)
         
         # TIER 2: Subcategory matches (if skill has subcategory)
-        if skill.subcategory:
-            subcategory_skills = Skill.objects.filter(
-                subcategory=skill.subcategory
-            ).exclude(id=skill.id)
-            
+        taxonomy = get_taxonomy()
+        subcategory_skill_ids = taxonomy.subcategory_siblings(skill.id)
+        if subcategory_skill_ids:
             subcategory_learners = UserSkill.objects.filter(
-                skill__in=subcategory_skills,
+                skill_id__in=subcategory_skill_ids,
                 type='learn'
             ).exclude(user=user).select_related('user', 'skill')
             
@@ -186,17 +367,11 @@ class UserSkillViewSet(viewsets.ModelViewSet):
                 self._check_and_set_mutual(match, learner, user)
         
         # TIER 3: Category matches
-        if skill.category:
-            category_skills = Skill.objects.filter(
-                category=skill.category
-            ).exclude(id=skill.id)
-            
-            # Exclude subcategory matches we already created
-            if skill.subcategory:
-                category_skills = category_skills.exclude(subcategory=skill.subcategory)
-            
+        # Excludes the subcategory matches we already created
+        category_skill_ids = taxonomy.category_siblings(skill.id)
+        if category_skill_ids:
             category_learners = UserSkill.objects.filter(
-                skill__in=category_skills,
+                skill_id__in=category_skill_ids,
                 type='learn'
             ).exclude(user=user).select_related('user', 'skill')
             
@@ -233,13 +408,11 @@ class UserSkillViewSet(viewsets.ModelViewSet):
             self._check_and_set_mutual(match, user, teacher)
         
         # TIER 2: Subcategory matches
-        if skill.subcategory:
-            subcategory_skills = Skill.objects.filter(
-                subcategory=skill.subcategory
-            ).exclude(id=skill.id)
-            
+        taxonomy = get_taxonomy()
+        subcategory_skill_ids = taxonomy.subcategory_siblings(skill.id)
+        if subcategory_skill_ids:
             subcategory_teachers = UserSkill.objects.filter(
-                skill__in=subcategory_skills,
+                skill_id__in=subcategory_skill_ids,
                 type='teach'
             ).exclude(user=user).select_related('user', 'skill')
             
@@ -256,16 +429,10 @@ class UserSkillViewSet(viewsets.ModelViewSet):
                 self._check_and_set_mutual(match, user, teacher)
         
         # TIER 3: Category matches
-        if skill.category:
-            category_skills = Skill.objects.filter(
-                category=skill.category
-            ).exclude(id=skill.id)
-            
-            if skill.subcategory:
-                category_skills = category_skills.exclude(subcategory=skill.subcategory)
-            
+        category_skill_ids = taxonomy.category_siblings(skill.id)
+        if category_skill_ids:
             category_teachers = UserSkill.objects.filter(
-                skill__in=category_skills,
+                skill_id__in=category_skill_ids,
                 type='teach'
             ).exclude(user=user).select_related('user', 'skill')
             
@@ -315,35 +482,31 @@ class UserSkillViewSet(viewsets.ModelViewSet):
 
 # ==================== Match Views ====================
 
-class MatchViewSet(viewsets.ReadOnlyModelViewSet):
-    """Return matches for the logged-in user, ordered by match quality"""
+class MatchViewSet(UserResponseCacheMixin, SparseFieldsetViewMixin, NormalizedResponseMixin,
+                   FastListMixin, StreamingListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Return matches for the logged-in user, ordered by match quality.
+    ?stream=1|ndjson streams the full list; ?format=normalized lists
+    users and skills once under "included".
+    """
     serializer_class = MatchSerializer
+    fast_serializer_class = FastMatchSerializer
     permission_classes = [permissions.IsAuthenticated]
+    normalized_relations = {
+        'learner': 'users', 'teacher': 'users',
+        'skill': 'skills', 'teacher_skill': 'skills',
+    }
+    # Match quality: mutual first, then by tier, then newest (ids follow creation)
+    cursor_ordering = ('rank', '-id')
 
     def get_queryset(self):
-        """Get all matches for the current user"""
+        """Get all matches for the current user, best first"""
         user = self.request.user
         return Match.objects.filter(
             Q(learner=user) | Q(teacher=user)
-        ).select_related('learner', 'teacher', 'skill', 'teacher_skill')
-
-    def list(self, request, *args, **kwargs):
-        """Override list to provide custom sorting"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Sort by match quality: mutual first, then by tier, then by date
-        tier_order = {'exact': 1, 'subcategory': 2, 'category': 3}
-        matches_list = list(queryset)
-        matches_list.sort(
-            key=lambda m: (
-                not m.is_mutual,
-                tier_order.get(m.match_tier, 99),
-                -m.created_at.timestamp()
-            )
-        )
-        
-        serializer = self.get_serializer(matches_list, many=True)
-        return Response(serializer.data)
+        ).select_related(
+            'learner', 'teacher', 'skill', 'teacher_skill'
+        ).order_by(*self.cursor_ordering)
 
     @action(detail=True, methods=['post'], url_path='start_conversation')
     def start_conversation(self, request, pk=None):
@@ -391,9 +554,12 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ==================== Messaging Views ====================
 
-class ConversationViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(UserResponseCacheMixin, SparseFieldsetViewMixin, FastListMixin,
+                          viewsets.ModelViewSet):
     """Manage conversations between users"""
+    fast_serializer_class = FastConversationListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-updated_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -460,14 +626,23 @@ class ConversationViewSet(viewsets.ModelViewSet):
         ).exclude(
             sender=request.user
         ).update(is_read=True)
+        # update() skips the signals that version cached responses
+        bump_data_versions(conversation.user1_id, conversation.user2_id)
         
         return Response({'message': 'Messages marked as read'})
 
 
-class MessageViewSet(viewsets.ModelViewSet):
-    """Manage messages within conversations"""
+class MessageViewSet(SparseFieldsetViewMixin, NormalizedResponseMixin, FastListMixin,
+                     StreamingListMixin, viewsets.ModelViewSet):
+    """
+    Manage messages within conversations; ?stream=1|ndjson streams the
+    full list and ?format=normalized lists senders once under "included"
+    """
     serializer_class = MessageSerializer
+    fast_serializer_class = FastMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    normalized_relations = {'sender': 'users'}
+    cursor_ordering = ('created_at', 'id')
 
     def get_queryset(self):
         user = self.request.user
@@ -505,10 +680,11 @@ class MessageViewSet(viewsets.ModelViewSet):
 
 # ==================== Activity & Video Call Views ====================
 
-class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
+class UserActivityViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """Get online users and activity status"""
     serializer_class = UserActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-last_seen', '-id')
     
     def get_queryset(self):
         return UserActivity.objects.filter(
@@ -550,16 +726,29 @@ class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
-class VideoCallViewSet(viewsets.ModelViewSet):
-    """Manage video calls between users"""
+class VideoCallViewSet(SparseFieldsetViewMixin, NormalizedResponseMixin, viewsets.ModelViewSet):
+    """Manage video calls between users; ?format=normalized lists users once"""
     serializer_class = VideoCallSerializer
     permission_classes = [permissions.IsAuthenticated]
+    normalized_relations = {'caller': 'users', 'receiver': 'users'}
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         user = self.request.user
         return VideoCall.objects.filter(
             Q(caller=user) | Q(receiver=user)
-        ).select_related('caller', 'receiver').order_by('-created_at')
+        ).select_related('caller', 'receiver').order_by(*self.cursor_ordering)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Precomputed call totals for the current user
+        GET /api/video-calls/stats/
+        """
+        stats = CallStats.objects.filter(user=request.user).first()
+        if stats is None:
+            stats = CallStats(user=request.user)
+        return Response(CallStatsSerializer(stats).data)
     
     @action(detail=True, methods=['post'])
     def accept_call(self, request, pk=None):
@@ -572,9 +761,11 @@ class VideoCallViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        call.status = 'accepted'
-        call.started_at = timezone.now()
-        call.save()
+        if not settle_call(call, 'accepted'):
+            return Response(
+                {'error': 'Call is no longer ringing'},
+                status=status.HTTP_409_CONFLICT
+            )
         
         serializer = self.get_serializer(call)
         return Response({
@@ -593,8 +784,11 @@ class VideoCallViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        call.status = 'declined'
-        call.save()
+        if not settle_call(call, 'declined'):
+            return Response(
+                {'error': 'Call is no longer ringing'},
+                status=status.HTTP_409_CONFLICT
+            )
         
         serializer = self.get_serializer(call)
         return Response({
@@ -613,15 +807,14 @@ class VideoCallViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        call.status = 'ended'
-        call.ended_at = timezone.now()
-        
-        # Calculate duration if call was started
-        if call.started_at:
-            duration = (call.ended_at - call.started_at).total_seconds()
-            call.duration = int(duration)
-        
-        call.save()
+        # Conditional write: a call finished elsewhere is neither rewritten nor counted twice
+        if not settle_call(call, 'ended'):
+            call.refresh_from_db()
+            serializer = self.get_serializer(call)
+            return Response({
+                'message': 'Call already finished',
+                'call': serializer.data
+            })
         
         serializer = self.get_serializer(call)
         return Response({
@@ -632,10 +825,11 @@ class VideoCallViewSet(viewsets.ModelViewSet):
 
 # ==================== Feedback Views ====================
 
-class FeedbackViewSet(viewsets.ModelViewSet):
+class FeedbackViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """Manage user feedback submissions"""
     serializer_class = FeedbackSerializer
     permission_classes = [permissions.AllowAny]  # Allow anonymous feedback
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         # Admin users can see all feedback
@@ -661,41 +855,22 @@ class FeedbackViewSet(viewsets.ModelViewSet):
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from pathlib import Path
-import json
+from .catalog_import import CatalogImportError, import_skill_catalog
 
 # Add this view at the bottom
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def load_skills_data(request):
     """One-time endpoint to load skills - DELETE AFTER USE"""
-    json_path = Path(__file__).resolve().parent / 'skills.json'
-    
-    if not json_path.exists():
-        return Response({'error': f'File not found at {json_path}'}, status=404)
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        skills_data = json.load(f)
-    
-    created = 0
-    skipped = 0
-    
-    for skill in skills_data:
-        obj, created_now = Skill.objects.get_or_create(
-            name=skill['name'],
-            defaults={
-                'category': skill.get('category', ''),
-                'subcategory': skill.get('subcategory', '')
-            }
-        )
-        if created_now:
-            created += 1
-        else:
-            skipped += 1
-    
+    try:
+        result = import_skill_catalog()
+    except CatalogImportError as e:
+        return Response({'error': str(e)}, status=404)
+
     return Response({
-        'status': 'success',
-        'created': created,
-        'skipped': skipped,
+        'status': 'skipped' if result.skipped else 'success',
+        'created': result.created,
+        'updated': result.updated,
+        'skipped': result.unchanged,
         'total': Skill.objects.count()
-    })
\ No newline at end of file
+    })
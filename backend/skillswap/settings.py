@@ -102,21 +102,32 @@ CORS_ALLOW_HEADERS = [
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'skills.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # orjson-backed, falling back to the stock classes without orjson;
+    # the browsable API is only served in development
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+        'skills.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'skills.renderers.FastJSONParser',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'skills.pagination.ApiCursorPagination',
 }
 
+# List pagination (skills.pagination.ApiCursorPagination)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '200'))
+# Bare-list responses for clients that send neither cursor nor page_size
+API_LEGACY_LIST_RESPONSES = os.environ.get('API_LEGACY_LIST_RESPONSES', 'True') == 'True'
+API_LEGACY_MAX_RESULTS = int(os.environ.get('API_LEGACY_MAX_RESULTS', '1000'))
+# Plain-dict serializers for match/message/conversation lists (skills.fast_serializers)
+API_FAST_SERIALIZERS = os.environ.get('API_FAST_SERIALIZERS', 'True') == 'True'
+
 # Simple JWT configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=2),
@@ -141,8 +152,20 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    
+    # Rotated refresh tokens are revoked through skills.tokens.TokenBlacklist
+    'TOKEN_REFRESH_SERIALIZER': 'skills.serializers.BlacklistingTokenRefreshSerializer',
 }
 
+# How often each process picks up refresh tokens revoked by other processes
+TOKEN_BLACKLIST_SYNC_INTERVAL = int(os.environ.get('TOKEN_BLACKLIST_SYNC_INTERVAL', '30'))  # seconds
+
+# Authenticated principal caches (WebSocket and REST authentication).
+# Process-local entries fall back to the shared Django cache before the DB
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', '10000'))
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', '60'))  # seconds
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', '30'))  # seconds
+
 # Database
 # FIXED: Use psycopg (v3) which works with Python 3.13
 if os.environ.get('DATABASE_URL'):
@@ -218,6 +241,21 @@ if os.environ.get('REDIS_URL'):
         },
     }
 
+# Video call signaling: live call state is kept in memory. The VideoCall row
+# is inserted when a call is created and settling a ring updates it at once;
+# later changes (e.g. hangups) are written behind in batches
+VIDEO_CALL_FLUSH_INTERVAL = float(os.environ.get('VIDEO_CALL_FLUSH_INTERVAL', '0.5'))  # seconds
+VIDEO_CALL_FLUSH_BATCH_SIZE = int(os.environ.get('VIDEO_CALL_FLUSH_BATCH_SIZE', '100'))
+# Trickle-ICE candidates arriving within this window are relayed as one frame
+VIDEO_CALL_ICE_BATCH_WINDOW = float(os.environ.get('VIDEO_CALL_ICE_BATCH_WINDOW', '0.05'))  # seconds
+# Unanswered rings are marked missed after this long
+VIDEO_CALL_RING_TIMEOUT = int(os.environ.get('VIDEO_CALL_RING_TIMEOUT', '45'))  # seconds
+# Live calls of a user who disconnected and did not come back are closed after this long
+VIDEO_CALL_ABANDON_GRACE = int(os.environ.get('VIDEO_CALL_ABANDON_GRACE', '30'))  # seconds
+# Busy markers are shared through Redis when REDIS_URL is set; live calls
+# refresh them well before this TTL so a crashed worker cannot leave users busy
+VIDEO_CALL_BUSY_TTL = int(os.environ.get('VIDEO_CALL_BUSY_TTL', '120'))  # seconds
+
 # Site ID for django.contrib.sites
 SITE_ID = 1
 
@@ -275,14 +313,55 @@ LOGGING = {
     },
 }
 
-# Cache configuration
+# Cache configuration: a small per-process LRU (L1) in front of a cache shared
+# by every worker (L2). L2 is Redis when REDIS_URL is set, otherwise a sqlite
+# file shared by the processes on this host. Writes evict the key from the
+# other processes' L1 (see skills/cache_backends.py).
+if os.environ.get('REDIS_URL'):
+    CACHE_L2 = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+    }
+else:
+    CACHE_L2 = {
+        'BACKEND': 'skills.cache_backends.SQLiteCache',
+        # Not the shared temp dir: entries are pickled, so the file must stay private
+        'LOCATION': os.environ.get('CACHE_SQLITE_PATH', str(BASE_DIR / 'cache' / 'skillswap-cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_SQLITE_MAX_ENTRIES', '50000'))},
+    }
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'skills.cache_backends.TwoTierCache',
         'LOCATION': 'skillswap-cache',
+        'OPTIONS': {
+            'L2': CACHE_L2,
+            'L1_MAX_ENTRIES': int(os.environ.get('CACHE_L1_MAX_ENTRIES', '1000')),
+            # Upper bound on how long a missed invalidation can serve stale data
+            'L1_TIMEOUT': float(os.environ.get('CACHE_L1_TIMEOUT', '10')),  # seconds
+        },
     }
 }
 
+# Tests run against their own L2 file instead of the one shared above
+TEST_RUNNER = 'skillswap.test_runner.IsolatedCacheTestRunner'
+
+# Browser/proxy cache lifetime of the pre-encoded skill catalog (GET /api/skills/)
+SKILL_CATALOG_MAX_AGE = int(os.environ.get('SKILL_CATALOG_MAX_AGE', '60'))  # seconds
+
+# Lifetime of a cached page of the public user directory (GET /api/users/);
+# pages are also dropped as soon as any user or user skill is written
+USER_DIRECTORY_CACHE_TTL = int(os.environ.get('USER_DIRECTORY_CACHE_TTL', '30'))  # seconds
+
+# Lifetime of a cached per-user GET response (matches, conversations, user skills);
+# writes to the user's own data invalidate it immediately
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '300'))  # seconds
+
+# Alias map shared with the frontend, indexed by /api/skills/search/
+SKILL_ALIAS_MAP_PATH = os.environ.get(
+    'SKILL_ALIAS_MAP_PATH', str(BASE_DIR.parent / 'src' / 'data' / 'alias-map.json')
+)
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 86400  # 24 hours
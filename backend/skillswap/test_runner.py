@@ -0,0 +1,44 @@
+# backend/skillswap/test_runner.py
+"""
+Test runner that gives each run a private cache.
+
+The default L2 is a sqlite file in the temp directory shared with any dev
+server on the host (or Redis), so tests clearing or reading it would
+affect, and be affected by, other processes.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class IsolatedCacheTestRunner(DiscoverRunner):
+    """DiscoverRunner with the default cache's L2 in a per-run temporary file"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory(prefix='skillswap-test-cache-')
+        default = settings.CACHES['default']
+        self._cache_settings = override_settings(CACHES={
+            **settings.CACHES,
+            'default': {
+                **default,
+                # A new name, so the process-wide tiers are built afresh
+                'LOCATION': 'skillswap-test-cache',
+                'OPTIONS': {
+                    **default.get('OPTIONS', {}),
+                    'L2': {
+                        'BACKEND': 'skills.cache_backends.SQLiteCache',
+                        'LOCATION': os.path.join(self._cache_dir.name, 'cache.sqlite3'),
+                    },
+                },
+            },
+        })
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
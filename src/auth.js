@@ -208,8 +208,9 @@ export const getOnlineMatches = async () => {
 
 export const getVideoCalls = async () => {
   try {
-    const response = await api.get("video-calls/");
-    return response.data || [];
+    // Newest calls first, one cursor page: { next, previous, results }
+    const response = await api.get("video-calls/", { params: { page_size: 20 } });
+    return response.data?.results || [];
   } catch (error) {
     console.error("Fetching video calls failed:", error.response?.data || error.message);
     return [];
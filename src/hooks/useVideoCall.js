@@ -45,6 +45,17 @@ export default function useVideoCall() {
       }
     });
 
+    // Listen for calls rejected because someone is already in a call
+    const unsubscribeBusy = websocketService.onCallBusy((data) => {
+      console.log('useVideoCall: Call rejected, user busy:', data);
+      if (mountedRef.current && !isCleaningUp.current && currentCall) {
+        alert(data.busy_user_id === data.receiver_id
+          ? 'That user is already in another call'
+          : 'You are already in a call');
+        cleanupCall();
+      }
+    });
+
     // Listen for incoming calls
     const unsubscribeIncoming = websocketService.onIncomingCall((callData) => {
       console.log('useVideoCall: Incoming call:', callData);
@@ -75,6 +86,7 @@ export default function useVideoCall() {
       mountedRef.current = false;
       unsubscribeInitiated();
       unsubscribeResponse();
+      unsubscribeBusy();
       unsubscribeIncoming();
       unsubscribeEnded();
     };
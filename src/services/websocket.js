@@ -12,7 +12,8 @@ class WebSocketService {
       callResponse: [],
       callEnded: [],
       webrtcSignal: [],
-      callInitiated: []
+      callInitiated: [],
+      callBusy: []
     };
     this.reconnectAttempts = {
       activity: 0,
@@ -343,6 +344,22 @@ class WebSocketService {
         console.log('WebRTC signal received:', data);
         this.listeners.webrtcSignal.forEach(callback => callback(data));
         break;
+      case 'webrtc_signal_batch':
+        // Trickle-ICE candidates coalesced by the server into one frame
+        console.log('WebRTC signal batch received:', data.signals.length);
+        data.signals.forEach(signalData => {
+          const signal = {
+            type: 'webrtc_signal',
+            signal_data: signalData,
+            from_user_id: data.from_user_id
+          };
+          this.listeners.webrtcSignal.forEach(callback => callback(signal));
+        });
+        break;
+      case 'busy':
+        console.log('Call rejected, user busy:', data);
+        this.listeners.callBusy.forEach(callback => callback(data));
+        break;
       case 'error':
         console.error('WebSocket error:', data.message);
         break;
@@ -399,6 +416,13 @@ class WebSocketService {
     };
   }
 
+  onCallBusy(callback) {
+    this.listeners.callBusy.push(callback);
+    return () => {
+      this.listeners.callBusy = this.listeners.callBusy.filter(cb => cb !== callback);
+    };
+  }
+
   onWebRTCSignal(callback) {
     this.listeners.webrtcSignal.push(callback);
     return () => {